@@ -0,0 +1,290 @@
+# benchmarks/check_parity.py
+
+"""
+Consistency checks between code paths that must give the same data.
+
+Each check prints one line per comparison and the script exits with status 1 if any
+of them found a difference, so it can run next to run_benchmarks.py.
+
+    synthetic_layouts   the flat and nested GA layouts of src/synthetic_data.py hold
+                        the same sessions (field by field, row by row)
+    polars_backend      aggregate_user_data gives the same users, values and dtypes
+                        with backend="polars" as with pandas, for every strategy
+                        on columns of every dtype (skipped without Polars)
+    duckdb_sql          the GROUP BY query of src/aggregation_sql.py, run by
+                        LocalSessionsClient.get_user_level_data on a synthetic GA
+                        mirror, gives the aggregate_user_data result of the same
+                        sessions (skipped without DuckDB)
+
+Usage Example:
+-------------
+python benchmarks/check_parity.py                          # all checks
+python benchmarks/check_parity.py --filter synthetic_layouts --sessions 20000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import warnings
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Make the repository root importable when run as a script
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.synthetic_data import iter_session_tables, write_sessions_parquet  # noqa: E402
+from src.user_aggregation import aggregate_user_data  # noqa: E402
+
+# Strategies compared between the backends, per kind of column
+NAMED_REDUCERS = ["last", "mode", "nunique", "quantile:0.9", "topk:2", "unique"]
+STRATEGIES = {
+    "numeric": ["sum", "mean", "median", "max", "min", "count", "std", "var", "first"]
+    + NAMED_REDUCERS,
+    "datetime": ["min", "max", "first", "count", "count_distinct_days"]
+    + NAMED_REDUCERS,
+    "categorical": ["majority", "unique", "first", "min", "max", "count"]
+    + NAMED_REDUCERS
+    + ["count_distinct_days"],
+}
+
+
+def _report(name: str, problem: Optional[str]) -> bool:
+    """Print the outcome of one comparison; True if it passed."""
+    print(
+        f"{'ok  ' if problem is None else 'FAIL'} {name}"
+        + (f": {problem}" if problem else "")
+    )
+    return problem is None
+
+
+def _frame_difference(left: pd.DataFrame, right: pd.DataFrame) -> Optional[str]:
+    """None if the frames are equal (floats up to rounding), else the mismatch."""
+    try:
+        pd.testing.assert_frame_equal(left, right, check_exact=False)
+    except AssertionError as exc:
+        return " ".join(str(exc).split())[:300]
+    return None
+
+
+# ------------------------------------------------------------------
+# Checks
+# ------------------------------------------------------------------
+
+
+def check_synthetic_layouts(n_sessions: int) -> bool:
+    """The GA layout, flattened, holds exactly the sessions of the flat layout."""
+    ok = True
+    for seed in (0, 2):
+        flat = pd.concat(
+            t.to_pandas()
+            for t in iter_session_tables(n_sessions, seed=seed, layout="flat")
+        )
+        ga = pd.concat(
+            t.flatten().to_pandas()
+            for t in iter_session_tables(n_sessions, seed=seed, layout="ga")
+        )
+        ga = pd.DataFrame(
+            {
+                "fullVisitorId": ga["fullVisitorId"],
+                "visitId": ga["visitId"].astype(str),
+                "visitNumber": ga["visitNumber"],
+                "date": pd.to_datetime(ga["date"], format="%Y%m%d").astype(
+                    "datetime64[ns]"
+                ),
+                "pageviews": ga["totals.pageviews"],
+                "timeOnSite": ga["totals.timeOnSite"],
+                "transactions": ga["totals.transactions"],
+                "totalTransactionRevenue": ga["totals.totalTransactionRevenue"],
+                "trafficSource": ga["trafficSource.source"],
+                "trafficMedium": ga["trafficSource.medium"],
+                "trafficCampaign": ga["trafficSource.campaign"],
+                "country": ga["geoNetwork.country"],
+                "city": ga["geoNetwork.city"],
+            }
+        )
+        # The GA layout orders rows by day; compare both by session
+        key = ["fullVisitorId", "visitNumber"]
+        flat, ga = (df.sort_values(key, ignore_index=True) for df in (flat, ga))
+        problem = _frame_difference(flat, ga)
+        if problem is None and ga.duplicated(key).any():
+            problem = (
+                f"{ga.duplicated(key).sum()} duplicate (fullVisitorId, visitNumber)"
+            )
+        ok &= _report(f"synthetic_layouts seed={seed} n={n_sessions}", problem)
+    return ok
+
+
+def _typed_sessions(n_sessions: int) -> pd.DataFrame:
+    """
+    Synthetic sessions with one column per dtype: a fifth of the values are missing,
+    and the first 50 users have no values at all.
+    """
+    flat = pd.concat(
+        t.to_pandas() for t in iter_session_tables(n_sessions, seed=1, layout="flat")
+    )
+    rng = np.random.default_rng(1)
+    users = flat["fullVisitorId"].to_numpy()
+    missing = (rng.random(len(flat)) < 0.2) | np.isin(users, users[:50])
+    values = rng.integers(0, 5, len(flat))
+    letters = np.array(list("abcde"), dtype=object)[values]
+    columns = {
+        "int64": pd.Series(values),
+        "Int64": pd.Series(values, dtype="Int64"),
+        "float64": pd.Series(values * 1.5),
+        "Float64": pd.Series(values * 1.5, dtype="Float64"),
+        "bool": pd.Series(values > 2),
+        "boolean": pd.Series(values > 2, dtype="boolean"),
+        "string": pd.Series(letters, dtype="string"),
+        "object": pd.Series(letters),
+        "datetime64": pd.Series(flat["date"].to_numpy()),
+    }
+    sessions = pd.DataFrame({"fullVisitorId": users})
+    for name, column in columns.items():
+        # int64 and bool columns cannot hold missing values
+        sessions[name] = column if name in ("int64", "bool") else column.mask(missing)
+    return sessions
+
+
+def check_polars_backend(n_sessions: int) -> bool:
+    """The Polars backend aggregates every column dtype like the pandas backend."""
+    try:
+        import polars as pl
+    except ImportError:
+        print("skip polars_backend: polars is not installed")
+        return True
+
+    sessions = _typed_sessions(n_sessions)
+    ok = True
+    for col in sessions.columns[1:]:
+        if pd.api.types.is_numeric_dtype(sessions[col]):
+            kind, option = "numeric", "numeric_strategy"
+        elif pd.api.types.is_datetime64_any_dtype(sessions[col]):
+            kind, option = "datetime", "date_strategy"
+        else:
+            kind, option = "categorical", "categorical_strategy"
+        failed = {}
+        compared = 0
+        for strategy in STRATEGIES[kind]:
+            # As the default strategy of the column's kind, and as a custom strategy
+            for kwargs in ({option: strategy}, {"custom_strategies": {col: strategy}}):
+                args = (sessions[["fullVisitorId", col]], "fullVisitorId")
+                with warnings.catch_warnings():
+                    # e.g. date parsing of the letters for count_distinct_days
+                    warnings.simplefilter("ignore")
+                    try:
+                        expected = aggregate_user_data(*args, **kwargs)
+                    except (TypeError, ValueError):
+                        # Not supported by pandas for this dtype (e.g. min of objects)
+                        continue
+                    compared += 1
+                    try:
+                        result = aggregate_user_data(*args, **kwargs, backend="polars")
+                    except (TypeError, ValueError, pl.exceptions.PolarsError) as exc:
+                        failed[f"{strategy} {kwargs}"] = f"raises {exc!r}"
+                        continue
+                    problem = _frame_difference(expected, result)
+                if problem is not None:
+                    failed[f"{strategy} {kwargs}"] = problem
+        problem = (
+            f"{len(failed)}/{compared} differ, first {next(iter(failed.items()))}"
+            if failed
+            else None
+        )
+        ok &= _report(f"polars_backend {col} ({compared} comparisons)", problem)
+    return ok
+
+
+# Aggregation settings compared between SQL and pandas (all strategies with a SQL
+# translation, see src/aggregation_sql.py)
+SQL_CONFIGS = [
+    {},
+    {
+        "numeric_strategy": "mean",
+        "date_strategy": "max",
+        "categorical_strategy": "unique",
+    },
+    {"numeric_strategy": "median", "categorical_strategy": "first"},
+    {"numeric_strategy": "max"},
+    {"numeric_strategy": "min"},
+    {"numeric_strategy": "count"},
+    {
+        "custom_strategies": {
+            "visitNumber": "max",
+            "pageviews": "first",
+            "transactions": "last",
+            "date": "max",
+            "visitId": "nunique",
+            "trafficSource": "count",
+            "country": "last",
+        }
+    },
+    {"group_col": "trafficMedium", "handle_multi_group": "exclude"},
+    {"group_col": "trafficMedium", "handle_multi_group": "first"},
+    {"group_col": "trafficMedium", "handle_multi_group": "all"},
+]
+
+
+def check_duckdb_sql(n_sessions: int) -> bool:
+    """SQL aggregation (run by DuckDB) matches aggregate_user_data, dtypes included."""
+    try:
+        from src.local_sessions import LocalSessionsClient
+    except ImportError as exc:
+        print(f"skip duckdb_sql: {exc}")
+        return True
+
+    ok = True
+    with tempfile.TemporaryDirectory() as root:
+        # The writer and the client print progress and queries
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_sessions_parquet(root, n_sessions, seed=3, layout="ga", n_days=20)
+            client = LocalSessionsClient(root)
+            # SQL takes "first"/"last" in visitNumber order, pandas in row order
+            sessions = client.get_sessions_data().sort_values(
+                ["fullVisitorId", "visitNumber"], ignore_index=True
+            )
+        for kwargs in SQL_CONFIGS:
+            expected = aggregate_user_data(sessions, "fullVisitorId", **kwargs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = client.get_user_level_data(**kwargs)
+            ok &= _report(
+                f"duckdb_sql {kwargs or 'defaults'}",
+                _frame_difference(expected, result),
+            )
+        client.connection.close()
+    return ok
+
+
+CHECKS: Dict[str, Callable[[int], bool]] = {
+    "synthetic_layouts": check_synthetic_layouts,
+    "polars_backend": check_polars_backend,
+    "duckdb_sql": check_duckdb_sql,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sessions", type=int, default=5000, help="Synthetic sessions per check."
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run checks whose name contains this."
+    )
+    args = parser.parse_args(argv)
+
+    results = [
+        check(args.sessions) for name, check in CHECKS.items() if args.filter in name
+    ]
+    failed = results.count(False)
+    print(f"{len(results) - failed}/{len(results)} checks passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
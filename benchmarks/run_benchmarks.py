@@ -0,0 +1,333 @@
+# benchmarks/run_benchmarks.py
+
+"""
+End-to-end benchmarks for the extract -> clean -> aggregate -> test pipeline.
+
+Every case runs on synthetic sessions (src/synthetic_data.py) at several sizes and
+records wall time (best of --repeat runs) and peak traced memory (one extra run under
+tracemalloc). Results are written as JSON; when a baseline is given, the script exits
+with status 1 if any case got slower or used more memory than the allowed threshold.
+
+Usage Example:
+-------------
+# Record a baseline
+python benchmarks/run_benchmarks.py --sizes 2000 20000 --output benchmarks/baseline.json
+
+# Compare a later run against it (fails on >25% regressions)
+python benchmarks/run_benchmarks.py --sizes 2000 20000 --baseline benchmarks/baseline.json
+
+# Only aggregation cases, 3 repeats
+python benchmarks/run_benchmarks.py --filter aggregate --repeat 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+# Make the repository root importable when run as a script
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src import transforms  # noqa: E402
+from src.ab_testing import ABTest  # noqa: E402
+from src.data_cleaning import clean_sessions_data, profile_data  # noqa: E402
+from src.hypothesis_cross_selling import run_cross_sell_test  # noqa: E402
+from src.hypothesis_pricing import run_pricing_test  # noqa: E402
+from src.hypothesis_recommendation import run_recommendation_test  # noqa: E402
+from src.synthetic_data import generate_sessions  # noqa: E402
+from src.user_aggregation import aggregate_user_data  # noqa: E402
+
+DEFAULT_SIZES = [2_000, 20_000]
+CLEANING_OPTIONS = {
+    "revenue_adjustment": True,
+    "fill_missing_transactions": True,
+    "fill_missing_pageviews": True,
+    "fill_missing_timeOnSite": True,
+    "timeOnSite_zero_floor": True,
+}
+# Times below this (seconds) are too noisy to flag as regressions
+MIN_COMPARABLE_TIME = 0.01
+
+
+class Case(NamedTuple):
+    """
+    A benchmark case. `prepare(fixtures)` returns the zero-argument callable to time;
+    it runs outside the timed region, once per repeat (e.g. to copy inputs).
+    """
+
+    name: str
+    prepare: Callable[[Dict[str, Any]], Callable[[], Any]]
+    # Skip sizes above this many sessions (for known O(n) Python-loop paths)
+    max_sessions: Optional[int] = None
+
+
+# ------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------
+
+
+def build_fixtures(n_sessions: int, seed: int = 0) -> Dict[str, Any]:
+    """Synthetic sessions, their cleaned version and a user-level table."""
+    sessions = generate_sessions(n_sessions, seed=seed, n_days=30)
+    rng = np.random.default_rng(seed)
+
+    # An experiment group per visitor, with ~2% of visitors seen in both groups
+    visitor_codes, _ = pd.factorize(sessions["fullVisitorId"])
+    visitor_group = rng.random(visitor_codes.max() + 1) < 0.5
+    flip = rng.random(len(sessions)) < 0.02
+    sessions["experimentGroup"] = np.where(
+        visitor_group[visitor_codes] ^ flip, "test", "control"
+    )
+
+    cleaned = clean_sessions_data(sessions.copy(), cleaning_options=CLEANING_OPTIONS)
+    user_df = aggregate_user_data(
+        cleaned,
+        user_id_col="fullVisitorId",
+        numeric_strategy="sum",
+        exclude_columns=["visitId", "experimentGroup"],
+    )
+    user_df["bought_item_x"] = (rng.random(len(user_df)) < 0.1).astype(int)
+    return {
+        "n_sessions": n_sessions,
+        "sessions": sessions,
+        "cleaned": cleaned,
+        "user_df": user_df,
+    }
+
+
+# ------------------------------------------------------------------
+# Cases
+# ------------------------------------------------------------------
+
+
+def _clean_case(fx: Dict[str, Any]) -> Callable[[], Any]:
+    # clean_sessions_data modifies its input, so every run gets a fresh copy
+    df = fx["sessions"].copy()
+    return lambda: clean_sessions_data(df, cleaning_options=CLEANING_OPTIONS)
+
+
+def _aggregate_case(**kwargs) -> Callable[[Dict[str, Any]], Callable[[], Any]]:
+    def prepare(fx):
+        return lambda: aggregate_user_data(
+            fx["cleaned"],
+            user_id_col="fullVisitorId",
+            exclude_columns=["visitId"],
+            **kwargs,
+        )
+
+    return prepare
+
+
+def _ab_case(column: str, test_type: str, transform: str, zero_inflation: bool):
+    def prepare(fx):
+        # Fitted Box-Cox parameters are cached across runs; time the cold path
+        transforms._BOXCOX_CACHE.clear()
+        ab = ABTest(
+            fx["cleaned"],
+            control_filter={"experimentGroup": "control"},
+            test_filter={"experimentGroup": "test"},
+        )
+        return lambda: ab.run_test(
+            column=column,
+            test_type=test_type,
+            transform=transform,
+            zero_inflation=zero_inflation,
+        )
+
+    return prepare
+
+
+def build_cases() -> List[Case]:
+    cases = [
+        Case("clean_sessions_data", _clean_case),
+        Case("profile_data", lambda fx: lambda: profile_data(fx["cleaned"])),
+    ]
+
+    # aggregate_user_data: vary one option at a time around the defaults
+    for strategy in ["sum", "mean", "max", "min", "count"]:
+        cases.append(
+            Case(
+                f"aggregate_user_data[numeric={strategy}]",
+                _aggregate_case(numeric_strategy=strategy),
+            )
+        )
+    for strategy in ["min", "max"]:
+        cases.append(
+            Case(
+                f"aggregate_user_data[date={strategy}]",
+                _aggregate_case(date_strategy=strategy),
+            )
+        )
+    for strategy in ["majority", "unique", "first"]:
+        cases.append(
+            Case(
+                f"aggregate_user_data[categorical={strategy}]",
+                _aggregate_case(categorical_strategy=strategy),
+            )
+        )
+    for mode in ["exclude", "first", "all"]:
+        cases.append(
+            Case(
+                f"aggregate_user_data[multi_group={mode}]",
+                _aggregate_case(group_col="experimentGroup", handle_multi_group=mode),
+                # "first" walks the rows with iterrows
+                max_sessions=200_000 if mode == "first" else None,
+            )
+        )
+
+    # ABTest.run_test: every test type and transform
+    for test_type in ["t_test", "mannwhitney", "bayesian_means"]:
+        for transform in ["none", "log", "winsor", "trim", "boxcox"]:
+            cases.append(
+                Case(
+                    f"run_test[{test_type},{transform}]",
+                    _ab_case("timeOnSite", test_type, transform, False),
+                )
+            )
+    cases.append(
+        Case(
+            "run_test[mannwhitney,none,zero_inflation]",
+            _ab_case("totalTransactionRevenue", "mannwhitney", "none", True),
+        )
+    )
+    cases.append(
+        Case(
+            "run_test[bayesian_conversions,none]",
+            _ab_case("transactions", "bayesian_conversions", "none", False),
+        )
+    )
+
+    # Hypothesis runners on user-level data
+    cases += [
+        Case(
+            "run_recommendation_test",
+            lambda fx: lambda: run_recommendation_test(fx["user_df"]),
+        ),
+        Case("run_pricing_test", lambda fx: lambda: run_pricing_test(fx["user_df"])),
+        Case(
+            "run_cross_sell_test",
+            lambda fx: lambda: run_cross_sell_test(fx["user_df"]),
+        ),
+    ]
+    return cases
+
+
+# ------------------------------------------------------------------
+# Measurement and comparison
+# ------------------------------------------------------------------
+
+
+def measure(case: Case, fixtures: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    """Best and median wall time over `repeat` runs, plus peak traced memory."""
+    times = []
+    for _ in range(repeat):
+        func = case.prepare(fixtures)
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    func = case.prepare(fixtures)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_s": min(times),
+        "median_time_s": float(np.median(times)),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    time_threshold: float,
+    memory_threshold: float,
+) -> List[str]:
+    """Return a description of every case that regressed beyond the thresholds."""
+    regressions = []
+    for key, current in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        if current["time_s"] > MIN_COMPARABLE_TIME and current["time_s"] > base[
+            "time_s"
+        ] * (1 + time_threshold):
+            regressions.append(
+                f"{key}: time {base['time_s']:.4f}s -> {current['time_s']:.4f}s"
+            )
+        if current["peak_mb"] > base["peak_mb"] * (1 + memory_threshold):
+            regressions.append(
+                f"{key}: peak memory {base['peak_mb']:.1f}MB -> {current['peak_mb']:.1f}MB"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--filter", default=None, help="Only run cases whose name contains this."
+    )
+    parser.add_argument("--output", default=None, help="Write results JSON here.")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare.")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases() if not args.filter or args.filter in c.name]
+    results: Dict[str, Dict[str, float]] = {}
+
+    for size in args.sizes:
+        print(f"Building fixtures for {size} sessions ...")
+        fixtures = build_fixtures(size, seed=args.seed)
+        for case in cases:
+            if case.max_sessions is not None and size > case.max_sessions:
+                continue
+            key = f"{case.name}@{size}"
+            results[key] = measure(case, fixtures, args.repeat)
+            r = results[key]
+            print(f"  {key:<60} {r['time_s']:9.4f}s {r['peak_mb']:9.1f}MB")
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print("Regressions beyond threshold:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("No regressions beyond threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
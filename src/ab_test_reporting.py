@@ -77,3 +77,62 @@ def interpret_ab_results(results: Dict) -> str:
         text.append(f"Unsupported or unknown test type: {test_type}")
 
     return "\n".join(text)
+
+
+def interpret_multi_arm_results(results: Dict) -> str:
+    """
+    Provide a user-friendly explanation for the A/B/n results returned by
+    MultiArmABTest: the omnibus test across all arms, then each arm vs. control with
+    raw and corrected p-values.
+    """
+    column = results.get("column", "unknown_metric")
+    test_type = results.get("test_type", "unknown_test")
+    alpha = results.get("alpha", 0.05)
+    correction = results.get("correction", "none")
+    sizes = results.get("arm_sizes", {})
+
+    text = [
+        f"A/B/n Test on '{column}' using '{test_type}' test across "
+        f"{len(results.get('arms', []))} arms (control='{results.get('control')}').",
+        "Arm sizes: " + ", ".join(f"{arm}={n}" for arm, n in sizes.items()),
+        f"Applied transform='{results.get('transform', 'none')}', "
+        f"zero_inflation={results.get('zero_inflation', False)}. (alpha={alpha})",
+    ]
+
+    if "zero_test" in results:
+        zt = results["zero_test"]
+        rates = ", ".join(f"{arm}={r:.2%}" for arm, r in zt["zero_rates"].items())
+        text.append(f"Zero-proportion test: {rates}, p-value={zt['p_value']:.3f}")
+
+    omnibus = results.get("omnibus", {})
+    if "error" in omnibus:
+        text.append(f"Omnibus Test Error: {omnibus['error']}")
+    else:
+        text.append(
+            f"Omnibus {omnibus['test']} test: statistic={omnibus['test_statistic']:.3f}, "
+            f"p-value={omnibus['p_value']:.4f}"
+        )
+
+    for arm, comparison in results.get("comparisons", {}).items():
+        if "error" in comparison:
+            text.append(f"{arm} vs control: {comparison['error']}")
+        elif "adjusted_p_value" in comparison:
+            verdict = "significant" if comparison["significant"] else "not significant"
+            text.append(
+                f"{arm} vs control: p-value={comparison['p_value']:.4f}, "
+                f"{correction}-adjusted={comparison['adjusted_p_value']:.4f} ({verdict})"
+            )
+        elif test_type == "bayesian_conversions":
+            text.append(
+                f"{arm} vs control: control_mean="
+                f"{comparison.get('control_posterior_mean', float('nan')):.3f}, "
+                f"test_mean={comparison.get('test_posterior_mean', float('nan')):.3f}"
+            )
+        else:
+            text.append(
+                f"{arm} vs control: control_mean="
+                f"{comparison.get('control_mean', float('nan')):.2f}, "
+                f"test_mean={comparison.get('test_mean', float('nan')):.2f}"
+            )
+
+    return "\n".join(text)
@@ -24,12 +24,18 @@ result = ab.run_test(
 print(result)
 """
 
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from scipy import stats
 
+from src.fingerprint import fingerprint_array
+from src.instrumentation import stage
+from src.result_cache import ResultCache
+from src.transforms import apply_transform, transform_arms, transform_groups
+from src.vectorized_stats import adjust_p_values, chi2_2x2_test
+
 
 class ABTest:
     """
@@ -42,9 +48,12 @@ class ABTest:
     df : pd.DataFrame
         The input DataFrame containing metrics to analyze.
     control_df : pd.DataFrame
-        Subset of df corresponding to the control group.
+        Subset of df corresponding to the control group. Groups are held as boolean
+        row masks; this property materializes the subset only when accessed.
     test_df : pd.DataFrame
-        Subset of df corresponding to the test group.
+        Subset of df corresponding to the test group (materialized on access).
+    cache : ResultCache or None
+        Optional cache of run_test results, keyed on the tested data and parameters.
     """
 
     def __init__(
@@ -53,10 +62,12 @@ class ABTest:
         control_filter: Dict[str, Any],
         test_filter: Dict[str, Any],
         user_id_col: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
     ):
         """
-        Initialize the ABTest class by splitting the df into control_df and test_df
-        based on simple filter logic.
+        Initialize the ABTest class by splitting the df into control and test row
+        masks based on simple filter logic. df is not copied; run_test only reads the
+        tested column. See from_labels to pass the group labels as an array instead.
 
         Parameters
         ----------
@@ -69,18 +80,72 @@ class ABTest:
         user_id_col : str, optional
             Column name identifying unique users. If provided, you can group or deduplicate
             by user before performing the test. Not used by default.
+        cache : ResultCache, optional
+            If provided, run_test results are memoized in this cache, keyed by a content
+            hash of the tested column in each group plus all test parameters. Repeated
+            calls with the same data and configuration return the cached result.
         """
         self.df = df
-        self.control_df = self._filter_df(control_filter)
-        self.test_df = self._filter_df(test_filter)
+        self._control_mask = self._filter_mask(control_filter)
+        self._test_mask = self._filter_mask(test_filter)
         self.user_id_col = user_id_col
+        self.cache = cache
+
+    @classmethod
+    def from_labels(
+        cls,
+        df: pd.DataFrame,
+        labels: np.ndarray,
+        control: Any = 0,
+        test: Any = 1,
+        user_id_col: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
+    ) -> "ABTest":
+        """
+        Build an ABTest from a group label per row of df (e.g. the int8 codes of an
+        assignment) instead of filters on df's columns, so df needs no group column.
 
-    def _filter_df(self, filter_dict: Dict[str, Any]) -> pd.DataFrame:
-        """Return a subset of self.df where each col == val in filter_dict."""
-        subset = self.df.copy()
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The data; it is not copied.
+        labels : array-like
+            Group label of each row of df.
+        control, test : label, default 0 and 1
+            Labels of the control and test rows; any other label is ignored.
+        """
+        labels = np.asarray(labels)
+        if len(labels) != len(df):
+            raise ValueError("labels must have one entry per row of df.")
+        ab = cls.__new__(cls)
+        ab.df = df
+        ab._control_mask = labels == control
+        ab._test_mask = labels == test
+        ab.user_id_col = user_id_col
+        ab.cache = cache
+        return ab
+
+    def _filter_mask(self, filter_dict: Dict[str, Any]) -> np.ndarray:
+        """Boolean mask of the rows of self.df where each col == val in filter_dict."""
+        mask = np.ones(len(self.df), dtype=bool)
         for col, val in filter_dict.items():
-            subset = subset[subset[col] == val]
-        return subset
+            mask &= (self.df[col] == val).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+    @property
+    def control_df(self) -> pd.DataFrame:
+        """Rows of df in the control group (materialized on access)."""
+        return self.df[self._control_mask]
+
+    @property
+    def test_df(self) -> pd.DataFrame:
+        """Rows of df in the test group (materialized on access)."""
+        return self.df[self._test_mask]
+
+    def _group_values(self, column: str) -> Tuple[pd.Series, pd.Series]:
+        """The control and test values of one column, without copying other columns."""
+        values = self.df[column]
+        return values[self._control_mask], values[self._test_mask]
 
     def run_test(
         self,
@@ -92,6 +157,9 @@ class ABTest:
         add_constant: float = 1.0,
         winsor_percentile: float = 95.0,
         trim_percentile: float = 95.0,
+        pooled_thresholds: bool = False,
+        boxcox_pooled: bool = True,
+        boxcox_sample_size: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Run an A/B test on the specified column using the chosen test (parametric or non-parametric),
@@ -126,12 +194,74 @@ class ABTest:
             The percentile at which values are winsorized if transform="winsor".
         trim_percentile : float, default 95.0
             The percentile above which values are removed if transform="trim".
+        pooled_thresholds : bool, default False
+            If True, "winsor"/"trim" cut points are computed once on the pooled
+            control + test data, so both groups are clipped at the same values.
+            Otherwise each group is clipped at its own percentiles.
+        boxcox_pooled : bool, default True
+            If True, the Box-Cox lambda is fitted once on the pooled control + test data
+            and applied to both groups, so the transformed scales are comparable. The fit
+            is cached per column and data content, so reruns reuse it.
+            If False, each group is fitted separately (the historical behaviour).
+        boxcox_sample_size : int, optional
+            Fit the pooled Box-Cox lambda on a random subsample of this many values.
 
         Returns
         -------
         results : dict
             A dictionary with test details and results (p-value, test statistic, effect sizes).
         """
+        params = {
+            "column": column,
+            "test_type": test_type,
+            "transform": transform,
+            "zero_inflation": zero_inflation,
+            "alpha": alpha,
+            "add_constant": add_constant,
+            "winsor_percentile": winsor_percentile,
+            "trim_percentile": trim_percentile,
+            "pooled_thresholds": pooled_thresholds,
+            "boxcox_pooled": boxcox_pooled,
+            "boxcox_sample_size": boxcox_sample_size,
+        }
+        with stage(
+            "ABTest.run_test",
+            rows_in=len(self.df),
+            column=column,
+            test_type=test_type,
+            transform=transform,
+        ) as record:
+            if self.cache is None:
+                return self._run_test(**params)
+
+            key = self.cache.make_key(self._data_fingerprint(column), params)
+            results = self.cache.get(key)
+            record["cache_hit"] = results is not None
+            if results is None:
+                results = self._run_test(**params)
+                self.cache.put(key, results)
+            return results
+
+    def _data_fingerprint(self, column: str) -> str:
+        """Content hash of the tested column in the control and test groups."""
+        control_values, test_values = self._group_values(column)
+        return fingerprint_array(control_values) + fingerprint_array(test_values)
+
+    def _run_test(
+        self,
+        column: str,
+        test_type: str,
+        transform: str,
+        zero_inflation: bool,
+        alpha: float,
+        add_constant: float,
+        winsor_percentile: float,
+        trim_percentile: float,
+        pooled_thresholds: bool,
+        boxcox_pooled: bool,
+        boxcox_sample_size: Optional[int],
+    ) -> Dict[str, Any]:
+        """Uncached implementation of run_test (see run_test for parameters)."""
         results = {
             "test_type": test_type,
             "column": column,
@@ -139,6 +269,7 @@ class ABTest:
             "zero_inflation": zero_inflation,
             "alpha": alpha,
         }
+        control_values, test_values = self._group_values(column)
 
         # Possibly run a two-part test if zero_inflation is True
         if zero_inflation:
@@ -147,8 +278,8 @@ class ABTest:
             results["zero_test"] = zero_test_res
 
             # 2) Filter to non-zero rows for the main test
-            control_nonzero = self.control_df[self.control_df[column] > 0]
-            test_nonzero = self.test_df[self.test_df[column] > 0]
+            control_nonzero = control_values[control_values > 0]
+            test_nonzero = test_values[test_values > 0]
 
             # If there's not enough data in non-zero portion, skip main test
             if len(control_nonzero) < 2 or len(test_nonzero) < 2:
@@ -158,40 +289,40 @@ class ABTest:
                 return results
 
             # Transform, then run main test
-            control_vals = self._apply_transform(
-                control_nonzero[column].dropna(),
-                transform,
-                add_constant,
-                winsor_percentile,
-                trim_percentile,
-            )
-            test_vals = self._apply_transform(
-                test_nonzero[column].dropna(),
+            control_vals, test_vals, transform_params = self._transform_groups(
+                control_nonzero.dropna(),
+                test_nonzero.dropna(),
                 transform,
                 add_constant,
                 winsor_percentile,
                 trim_percentile,
+                pooled_thresholds,
+                boxcox_pooled,
+                boxcox_sample_size,
+                column,
             )
+            if transform_params:
+                results["transform_params"] = transform_params
 
             main_test_res = self._run_stat_test(control_vals, test_vals, test_type)
             results["main_test"] = main_test_res
             return results
 
         # If zero_inflation is False, just transform & run the test on the entire data
-        control_vals = self._apply_transform(
-            self.control_df[column].dropna(),
-            transform,
-            add_constant,
-            winsor_percentile,
-            trim_percentile,
-        )
-        test_vals = self._apply_transform(
-            self.test_df[column].dropna(),
+        control_vals, test_vals, transform_params = self._transform_groups(
+            control_values.dropna(),
+            test_values.dropna(),
             transform,
             add_constant,
             winsor_percentile,
             trim_percentile,
+            pooled_thresholds,
+            boxcox_pooled,
+            boxcox_sample_size,
+            column,
         )
+        if transform_params:
+            results["transform_params"] = transform_params
 
         main_test_res = self._run_stat_test(control_vals, test_vals, test_type)
         results["main_test"] = main_test_res
@@ -291,6 +422,37 @@ class ABTest:
         else:
             return {"error": f"Unsupported test_type: {test_type}"}
 
+    def _transform_groups(
+        self,
+        control_values: pd.Series,
+        test_values: pd.Series,
+        transform: str,
+        add_constant: float,
+        winsor_p: float,
+        trim_p: float,
+        pooled_thresholds: bool = False,
+        boxcox_pooled: bool = True,
+        boxcox_sample_size: Optional[int] = None,
+        column: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, Dict[str, float]]]:
+        """
+        Transform the control and test values, sharing fitted parameters (percentile
+        cut points, Box-Cox lambda) where requested.
+        Returns (control_vals, test_vals, transform_params).
+        """
+        pooled = boxcox_pooled if transform == "boxcox" else pooled_thresholds
+        return transform_groups(
+            control_values.values,
+            test_values.values,
+            transform,
+            add_constant,
+            winsor_p,
+            trim_p,
+            pooled_thresholds=pooled,
+            boxcox_sample_size=boxcox_sample_size,
+            cache_key=column,
+        )
+
     def _apply_transform(
         self,
         values: pd.Series,
@@ -303,44 +465,7 @@ class ABTest:
         Apply a chosen transformation to a numeric series to mitigate skewness or outliers.
         transform: "none", "log", "winsor", "trim", or "boxcox".
         """
-        arr = values.values
-
-        if transform == "none":
-            return arr
-
-        elif transform == "log":
-            # Ensure no negative or zero
-            return np.log(arr + add_constant)
-
-        elif transform == "winsor":
-            # Clip outliers above winsor_p
-            high = np.percentile(arr, winsor_p)
-            low = (
-                np.percentile(arr, 100 - winsor_p)
-                if winsor_p < 50
-                else np.percentile(arr, 0)
-            )
-            arr = np.clip(arr, low, high)
-            return arr
-
-        elif transform == "trim":
-            # Remove data above a certain percentile
-            cap = np.percentile(arr, trim_p)
-            trimmed = arr[arr <= cap]
-            return trimmed
-
-        elif transform == "boxcox":
-            # Strictly positive data required
-            # If any zero or negative, you must offset first
-            shift = 0
-            if arr.min() <= 0:
-                shift = abs(arr.min()) + 1e-9
-            from scipy import special
-
-            bc_values, _ = stats.boxcox(arr + shift)
-            return bc_values
-
-        return arr
+        return apply_transform(values.values, transform, add_constant, winsor_p, trim_p)
 
     def _compare_zero_proportions(self, column: str) -> Dict[str, Any]:
         """
@@ -348,10 +473,11 @@ class ABTest:
 
         Returns a dict with 'chi2_stat', 'p_value', 'control_zero_rate', 'test_zero_rate', etc.
         """
-        control_zero_count = (self.control_df[column] == 0).sum()
-        control_n = len(self.control_df)
-        test_zero_count = (self.test_df[column] == 0).sum()
-        test_n = len(self.test_df)
+        control_values, test_values = self._group_values(column)
+        control_zero_count = (control_values == 0).sum()
+        control_n = len(control_values)
+        test_zero_count = (test_values == 0).sum()
+        test_n = len(test_values)
 
         # 2x2 contingency table
         #        Zero   NonZero
@@ -370,3 +496,331 @@ class ABTest:
             "p_value": p_val,
             "table": [[int(A), int(B)], [int(C), int(D)]],
         }
+
+
+class MultiArmABTest(ABTest):
+    """
+    A/B/n test: one control arm compared with any number of variants, using a single
+    group-label column.
+
+    The data is split once into per-arm arrays (a stable sort by arm code), so every
+    run_test call works on array slices instead of filtered DataFrame copies. Each
+    run computes an omnibus test across all arms plus every arm-vs-control comparison,
+    with multiple-comparison correction of the pairwise p-values.
+
+    Usage Example:
+    -------------
+    ab = MultiArmABTest(df, group_col="variant", control="control")
+    result = ab.run_test("totalTransactionRevenue", test_type="mannwhitney")
+    result["omnibus"]["p_value"], result["comparisons"]["b"]["adjusted_p_value"]
+
+    Attributes
+    ----------
+    df : pd.DataFrame
+        The input DataFrame.
+    group_col : str
+        Column holding the arm label of each row.
+    control : str
+        Label of the control arm.
+    arms : list of str
+        All arm labels, control first. Rows with other labels are ignored.
+    arm_sizes : dict
+        Number of rows per arm.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        group_col: str,
+        control: Any = "control",
+        arms: Optional[List[Any]] = None,
+        user_id_col: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        """
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The cleaned data DataFrame.
+        group_col : str
+            Column with the arm label of each row.
+        control : label, default "control"
+            The control arm; every other arm is compared with it.
+        arms : list, optional
+            Arms to include (the control is always included, first). By default all
+            labels found in group_col, in order of first appearance.
+        user_id_col : str, optional
+            Column identifying unique users (not used by default).
+        cache : ResultCache, optional
+            If provided, run_test results are memoized in this cache.
+        """
+        self.df = df
+        self.group_col = group_col
+        self.control = control
+        self.user_id_col = user_id_col
+        self.cache = cache
+
+        codes, labels = pd.factorize(df[group_col])
+        if arms is None:
+            arms = list(labels)
+        self.arms = [control] + [a for a in arms if a != control]
+        if control not in set(labels):
+            raise ValueError(f"Control arm '{control}' not found in '{group_col}'.")
+
+        # Map factorized labels to arm indices (-1 = not part of the test)
+        arm_index = {arm: i for i, arm in enumerate(self.arms)}
+        lookup = np.array([arm_index.get(label, -1) for label in labels], dtype=int)
+        arm_codes = np.where(codes >= 0, lookup[np.maximum(codes, 0)], -1)
+
+        rows = np.flatnonzero(arm_codes >= 0)
+        self._order = rows[np.argsort(arm_codes[rows], kind="stable")]
+        counts = np.bincount(arm_codes[rows], minlength=len(self.arms))
+        self._bounds = np.cumsum(counts)[:-1]
+        self._arm_codes = arm_codes
+        self.arm_sizes = {arm: int(n) for arm, n in zip(self.arms, counts)}
+
+    def arm_values(self, column: str) -> List[np.ndarray]:
+        """Values of column per arm (control first), as float arrays."""
+        values = self.df[column].to_numpy(dtype=float, na_value=np.nan)
+        return np.split(values[self._order], self._bounds)
+
+    def _data_fingerprint(self, column: str) -> str:
+        return fingerprint_array(self.df[column]) + fingerprint_array(self._arm_codes)
+
+    def run_test(
+        self,
+        column: str,
+        test_type: str = "t_test",
+        transform: str = "none",
+        zero_inflation: bool = False,
+        alpha: float = 0.05,
+        add_constant: float = 1.0,
+        winsor_percentile: float = 95.0,
+        trim_percentile: float = 95.0,
+        pooled_thresholds: bool = False,
+        boxcox_pooled: bool = True,
+        boxcox_sample_size: Optional[int] = None,
+        correction: str = "holm",
+    ) -> Dict[str, Any]:
+        """
+        Run an omnibus test across all arms and each arm-vs-control comparison.
+
+        Parameters are those of ABTest.run_test, plus:
+
+        correction : {"holm", "bonferroni", "fdr_bh", "none"}, default "holm"
+            Multiple-comparison correction applied to the pairwise p-values.
+
+        Pooled transform parameters (pooled_thresholds, boxcox_pooled) are fitted
+        once on all arms together, so every arm is on the same scale.
+
+        Returns
+        -------
+        results : dict
+            - "arms", "arm_sizes", "control", "correction" and the test settings.
+            - "omnibus": one-way ANOVA ("t_test", "bayesian_means"), Kruskal-Wallis
+              ("mannwhitney") or a k x 2 chi-square on conversions
+              ("bayesian_conversions").
+            - "comparisons": {arm: ABTest-style main_test dict, plus
+              "adjusted_p_value" and "significant"} for each non-control arm.
+            - "zero_test" (if zero_inflation): k x 2 chi-square on zero vs non-zero,
+              plus pairwise arm-vs-control zero tests.
+        """
+        params = {
+            "column": column,
+            "test_type": test_type,
+            "transform": transform,
+            "zero_inflation": zero_inflation,
+            "alpha": alpha,
+            "add_constant": add_constant,
+            "winsor_percentile": winsor_percentile,
+            "trim_percentile": trim_percentile,
+            "pooled_thresholds": pooled_thresholds,
+            "boxcox_pooled": boxcox_pooled,
+            "boxcox_sample_size": boxcox_sample_size,
+            "correction": correction,
+        }
+        with stage(
+            "MultiArmABTest.run_test",
+            rows_in=len(self.df),
+            column=column,
+            test_type=test_type,
+            transform=transform,
+            arms=len(self.arms),
+        ) as record:
+            if self.cache is None:
+                return self._run_multi_arm_test(**params)
+
+            key = self.cache.make_key(self._data_fingerprint(column), params)
+            results = self.cache.get(key)
+            record["cache_hit"] = results is not None
+            if results is None:
+                results = self._run_multi_arm_test(**params)
+                self.cache.put(key, results)
+            return results
+
+    def _run_multi_arm_test(
+        self,
+        column: str,
+        test_type: str,
+        transform: str,
+        zero_inflation: bool,
+        alpha: float,
+        add_constant: float,
+        winsor_percentile: float,
+        trim_percentile: float,
+        pooled_thresholds: bool,
+        boxcox_pooled: bool,
+        boxcox_sample_size: Optional[int],
+        correction: str,
+    ) -> Dict[str, Any]:
+        """Uncached implementation of run_test (see run_test for parameters)."""
+        results = {
+            "test_type": test_type,
+            "column": column,
+            "transform": transform,
+            "zero_inflation": zero_inflation,
+            "alpha": alpha,
+            "group_col": self.group_col,
+            "control": self.control,
+            "arms": list(self.arms),
+            "arm_sizes": dict(self.arm_sizes),
+            "correction": correction,
+        }
+        arrays = self.arm_values(column)
+
+        if zero_inflation:
+            results["zero_test"] = self._compare_zero_proportions_arms(arrays)
+            arrays = [arr[arr > 0] for arr in arrays]
+        else:
+            arrays = [arr[~np.isnan(arr)] for arr in arrays]
+
+        pooled = boxcox_pooled if transform == "boxcox" else pooled_thresholds
+        arrays, pooled_params, arm_params = transform_arms(
+            arrays,
+            transform,
+            add_constant,
+            winsor_percentile,
+            trim_percentile,
+            pooled_thresholds=pooled,
+            boxcox_sample_size=boxcox_sample_size,
+            cache_key=column,
+        )
+        if pooled_params is not None:
+            results["transform_params"] = {"pooled": pooled_params}
+        elif any(arm_params):
+            results["transform_params"] = {
+                str(arm): p for arm, p in zip(self.arms, arm_params)
+            }
+
+        results["omnibus"] = self._omnibus_test(arrays, test_type)
+
+        comparisons = {
+            arm: self._run_stat_test(arrays[0], arr, test_type)
+            for arm, arr in zip(self.arms[1:], arrays[1:])
+        }
+        p_values = np.array(
+            [
+                c.get("p_value", np.nan) if c.get("p_value") is not None else np.nan
+                for c in comparisons.values()
+            ],
+            dtype=float,
+        )
+        adjusted = adjust_p_values(p_values, correction)
+        for comparison, p_adj in zip(comparisons.values(), adjusted):
+            if "p_value" in comparison:
+                comparison["adjusted_p_value"] = float(p_adj)
+                comparison["significant"] = bool(p_adj < alpha)
+        results["comparisons"] = comparisons
+        return results
+
+    def _omnibus_test(self, arrays: List[np.ndarray], test_type: str) -> Dict[str, Any]:
+        """One test across all arms at once."""
+        if len(arrays) < 2 or any(len(arr) < 2 for arr in arrays):
+            return {"error": "Insufficient data in at least one arm for omnibus test."}
+
+        if test_type in ("t_test", "bayesian_means"):
+            statistic, p_val = stats.f_oneway(*arrays)
+            name = "anova"
+        elif test_type == "mannwhitney":
+            statistic, p_val = stats.kruskal(*arrays)
+            name = "kruskal"
+        elif test_type == "bayesian_conversions":
+            conversions = np.array([np.sum(arr) for arr in arrays])
+            totals = np.array([len(arr) for arr in arrays], dtype=float)
+            name = "chi2"
+            try:
+                statistic, p_val, *_ = stats.chi2_contingency(
+                    np.column_stack([conversions, totals - conversions])
+                )
+            except ValueError as exc:
+                # A column of the table is all zeros: no user converted, or every
+                # user did (as with zero_inflation=True, which drops the zeros)
+                return {
+                    "test": name,
+                    "error": f"Chi-square omnibus test not possible: {exc}",
+                    "test_statistic": np.nan,
+                    "p_value": np.nan,
+                }
+        else:
+            return {"error": f"Unsupported test_type: {test_type}"}
+        return {
+            "test": name,
+            "test_statistic": float(statistic),
+            "p_value": float(p_val),
+        }
+
+    def _compare_zero_proportions_arms(
+        self, arrays: List[np.ndarray]
+    ) -> Dict[str, Any]:
+        """
+        Zero vs non-zero counts per arm: a k x 2 chi-square across all arms, plus a
+        2x2 test of each arm against control (as ABTest._compare_zero_proportions).
+        """
+        zeros = np.array([np.sum(arr == 0) for arr in arrays])
+        totals = np.array([len(arr) for arr in arrays])
+        table = np.column_stack([zeros, totals - zeros])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zero_rates = zeros / totals
+
+        try:
+            chi2, p_val, *_ = stats.chi2_contingency(table)
+        except ValueError:
+            chi2, p_val = np.nan, np.nan
+        chi2_pairs, p_pairs = chi2_2x2_test(
+            zeros[0], totals[0] - zeros[0], zeros[1:], totals[1:] - zeros[1:]
+        )
+        return {
+            "zero_rates": {arm: float(r) for arm, r in zip(self.arms, zero_rates)},
+            "chi2_statistic": float(chi2),
+            "p_value": float(p_val),
+            "comparisons": {
+                arm: {
+                    "control_zero_rate": float(zero_rates[0]),
+                    "test_zero_rate": float(zero_rates[i + 1]),
+                    "chi2_statistic": float(chi2_pairs[i]),
+                    "p_value": float(p_pairs[i]),
+                    "table": table[[0, i + 1]].tolist(),
+                }
+                for i, arm in enumerate(self.arms[1:])
+            },
+        }
+
+
+def pairwise_results(results: Dict[str, Any]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Split a MultiArmABTest result into one ABTest-style result per non-control arm,
+    e.g. for interpret_ab_results or ResultsStore.append.
+    """
+    common = {
+        k: results[k]
+        for k in ("test_type", "column", "transform", "zero_inflation", "alpha")
+    }
+    per_arm = {}
+    for arm, comparison in results["comparisons"].items():
+        result = {**common, "arm": arm, "main_test": comparison}
+        if "zero_test" in results:
+            result["zero_test"] = results["zero_test"]["comparisons"][arm]
+        if "transform_params" in results:
+            result["transform_params"] = results["transform_params"]
+        per_arm[arm] = result
+    return per_arm
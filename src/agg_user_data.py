@@ -1,12 +1,15 @@
-import pandas as pd
-
-from user_aggregation import aggregate_user_data
+from src.data_io import find_data_file, load_frame, save_frame
+from src.user_aggregation import aggregate_user_data
 
 # Suppose we have session-level data with columns:
 #  fullVisitorId (user), visitId, date, transactions, totalTransactionRevenue,
 #  deviceCategory, country, city, and so on.
 
-df_sessions = pd.read_csv("data/cleaned_sessions.csv")
+# Reads data/cleaned_sessions.feather, .parquet or .csv (first one found)
+sessions_path = find_data_file("data/cleaned_sessions")
+if sessions_path is None:
+    raise FileNotFoundError("No data/cleaned_sessions.feather, .parquet or .csv found.")
+df_sessions = load_frame(sessions_path)
 
 # We want a user-level table with sum of numeric columns, earliest date, and most frequent category
 user_df = aggregate_user_data(
@@ -26,4 +29,5 @@ user_df = aggregate_user_data(
 
 print(user_df.head(5))
 
-user_df.to_csv("data/user_agg_data.csv")
+path = save_frame(user_df, "data/user_agg_data.parquet")
+print(f"Data saved to {path}.")
@@ -0,0 +1,376 @@
+# src/aggregation_sql.py
+
+"""
+Translate an aggregate_user_data configuration into an equivalent GROUP BY query,
+so aggregation to one row per user can run server-side (BigQuery) and only the
+user-level rows are transferred.
+
+The generated SQL mirrors src/user_aggregation.py:
+  - numeric_strategy    : "sum", "mean", "max", "min", "count", "median"
+  - date_strategy       : "min", "max"
+  - categorical_strategy: "majority", "unique", "first"
+  - custom_strategies   : any of the above, or the pandas reducer names
+                          "first", "last", "nunique" (callables cannot be translated)
+  - handle_multi_group  : "exclude", "first", "all"
+
+Strategies that depend on row order ("first", "last", handle_multi_group="first")
+need an explicit order_col, since SQL tables have no inherent row order.
+
+The same generator can emit DuckDB SQL (dialect="duckdb"), which is how the
+translation is checked offline against the pandas implementation:
+
+    sql = build_user_aggregation_sql("SELECT * FROM sessions", kinds, "fullVisitorId",
+                                     dialect="duckdb", order_col="row_nr")
+    execute_with_duckdb(sql, {"sessions": sessions_df})
+
+user_level_dtypes gives the pandas dtypes of the aggregate_user_data result, which
+the query result is cast to (benchmarks/check_parity.py compares both).
+"""
+
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from src.user_aggregation import is_stringified
+
+NUMERIC_STRATEGIES = ("sum", "mean", "max", "min", "count", "median")
+DATE_STRATEGIES = ("min", "max")
+CATEGORICAL_STRATEGIES = ("majority", "unique", "first")
+CUSTOM_ONLY_STRATEGIES = ("first", "last", "nunique")
+
+_STRING_TYPE = {"bigquery": "STRING", "duckdb": "VARCHAR"}
+
+
+def infer_column_kinds(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Classify columns as "numeric", "datetime" or "categorical", using the same
+    rules as aggregate_user_data.
+    """
+    kinds = {}
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            kinds[col] = "numeric"
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            kinds[col] = "datetime"
+        else:
+            kinds[col] = "categorical"
+    return kinds
+
+
+def _quote(name: str, dialect: str) -> str:
+    if dialect == "bigquery":
+        return f"`{name}`"
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _first_value(expr: str, order_col: str, dialect: str, last: bool = False) -> str:
+    """First (or last) non-null value of expr in order_col order."""
+    direction = " DESC" if last else ""
+    if dialect == "bigquery":
+        return (
+            f"ARRAY_AGG({expr} IGNORE NULLS ORDER BY {order_col}{direction} LIMIT 1)"
+            "[SAFE_OFFSET(0)]"
+        )
+    func = "last" if last else "first"
+    return f"{func}({expr} ORDER BY {order_col}) FILTER (WHERE {expr} IS NOT NULL)"
+
+
+def build_user_aggregation_sql(
+    source_sql: str,
+    column_kinds: Dict[str, str],
+    user_id_col: str,
+    group_col: Optional[str] = None,
+    handle_multi_group: str = "exclude",
+    numeric_strategy: Union[str, Callable] = "sum",
+    date_strategy: Union[str, Callable] = "min",
+    categorical_strategy: Union[str, Callable] = "majority",
+    custom_strategies: Optional[Dict[str, Union[str, Callable]]] = None,
+    exclude_columns: Optional[List[str]] = None,
+    order_col: Optional[str] = None,
+    dialect: str = "bigquery",
+) -> str:
+    """
+    Build a SQL query that aggregates session-level rows to one row per user, with
+    the same semantics as aggregate_user_data.
+
+    Parameters
+    ----------
+    source_sql : str
+        A SELECT statement (e.g. from BigQueryClient.build_sessions_query) or
+        "SELECT * FROM <table>" producing the session-level rows.
+    column_kinds : dict
+        {column: "numeric" | "datetime" | "categorical"} for the columns of
+        source_sql (see infer_column_kinds). Only these columns are aggregated.
+    user_id_col, group_col, handle_multi_group, numeric_strategy, date_strategy,
+    categorical_strategy, custom_strategies, exclude_columns :
+        Same meaning as in aggregate_user_data. Strategies must be strings.
+    order_col : str, optional
+        Column defining row order, needed for "first"/"last" strategies and
+        handle_multi_group="first" (pandas uses DataFrame order there).
+    dialect : {"bigquery", "duckdb"}, default "bigquery"
+
+    Returns
+    -------
+    str
+        The SQL query. Output columns follow the pandas implementation: the group
+        keys, then numeric, datetime and categorical columns, then group_col.
+    """
+    if dialect not in _STRING_TYPE:
+        raise ValueError(f"Unsupported dialect: {dialect}")
+    if handle_multi_group not in ("exclude", "first", "all"):
+        raise ValueError(f"Unsupported handle_multi_group: {handle_multi_group}")
+
+    def q(name: str) -> str:
+        return _quote(name, dialect)
+
+    string_type = _STRING_TYPE[dialect]
+    custom_strategies = custom_strategies or {}
+    exclude = set(exclude_columns or [])
+
+    def _require_order(what: str) -> str:
+        if order_col is None:
+            raise ValueError(f"{what} needs order_col to define row order in SQL")
+        return q(order_col)
+
+    # 1) Columns and their strategies, in the same order as aggregate_user_data
+    candidates = [
+        c
+        for c in column_kinds
+        if c not in exclude and c != user_id_col and c != group_col
+    ]
+    ordered = (
+        [c for c in candidates if column_kinds[c] == "numeric"]
+        + [c for c in candidates if column_kinds[c] == "datetime"]
+        + [c for c in candidates if column_kinds[c] == "categorical"]
+    )
+
+    group_keys = [user_id_col]
+    if group_col and handle_multi_group == "all":
+        group_keys.append(group_col)
+    keys_sql = ", ".join(q(k) for k in group_keys)
+
+    # 2) Row filtering (null keys, multi-group users)
+    key_not_null = " AND ".join(f"{q(k)} IS NOT NULL" for k in group_keys)
+    ctes = [f"src AS (\n{source_sql}\n)"]
+
+    if group_col and handle_multi_group == "exclude":
+        ctes.append(
+            f"filtered AS (\n"
+            f"  SELECT * FROM src\n"
+            f"  WHERE {key_not_null} AND {q(user_id_col)} NOT IN (\n"
+            f"    SELECT {q(user_id_col)} FROM src\n"
+            f"    WHERE {q(user_id_col)} IS NOT NULL\n"
+            f"    GROUP BY {q(user_id_col)}\n"
+            f"    HAVING COUNT(DISTINCT {q(group_col)}) > 1\n"
+            f"  )\n)"
+        )
+    elif group_col and handle_multi_group == "first":
+        order = _require_order('handle_multi_group="first"')
+        first_group = _first_value(q(group_col), order, dialect)
+        ctes.append(
+            f"first_groups AS (\n"
+            f"  SELECT {q(user_id_col)} AS _uid, {first_group} AS _first_group\n"
+            f"  FROM src WHERE {key_not_null}\n"
+            f"  GROUP BY {q(user_id_col)}\n)"
+        )
+        ctes.append(
+            f"filtered AS (\n"
+            f"  SELECT src.* FROM src\n"
+            f"  JOIN first_groups ON src.{q(user_id_col)} = first_groups._uid\n"
+            f"  WHERE src.{q(group_col)} = first_groups._first_group\n)"
+        )
+    else:
+        ctes.append(f"filtered AS (\n  SELECT * FROM src WHERE {key_not_null}\n)")
+
+    # 3) Per-column aggregate expressions. Most are inline in one GROUP BY;
+    #    "majority" (and the BigQuery median) need their own CTE joined back on the keys.
+    inline_aggs = []
+    select_exprs = [f"agg.{q(k)}" for k in group_keys]
+    joins = []
+
+    for i, col in enumerate(ordered):
+        kind = column_kinds[col]
+        is_custom = col in custom_strategies
+        strategy = (
+            custom_strategies[col]
+            if is_custom
+            else {
+                "numeric": numeric_strategy,
+                "datetime": date_strategy,
+                "categorical": categorical_strategy,
+            }[kind]
+        )
+        if callable(strategy):
+            raise ValueError(
+                f"Column '{col}': callable strategies cannot be translated to SQL; "
+                "use a named strategy instead."
+            )
+
+        c = q(col)
+        as_string = f"CAST({c} AS {string_type})"
+        # Categorical default strategies return strings ("" when empty), like pandas
+        stringify = is_stringified(kind, strategy, is_custom)
+
+        if strategy == "sum":
+            expr = f"COALESCE(SUM({c}), 0)"
+        elif strategy == "mean":
+            expr = f"AVG({c})"
+        elif strategy in ("max", "min"):
+            expr = f"{strategy.upper()}({c})"
+        elif strategy == "count":
+            expr = f"COUNT({c})"
+        elif strategy == "nunique":
+            expr = f"COUNT(DISTINCT {c})"
+        elif strategy == "median":
+            if dialect == "duckdb":
+                expr = f"quantile_cont({c}, 0.5)"
+            else:
+                cte = f"c{i}"
+                ctes.append(
+                    f"{cte} AS (\n"
+                    f"  SELECT DISTINCT {keys_sql},\n"
+                    f"    PERCENTILE_CONT({c}, 0.5) OVER (PARTITION BY {keys_sql}) AS value\n"
+                    f"  FROM filtered\n)"
+                )
+                joins.append(cte)
+                select_exprs.append(f"{cte}.value AS {c}")
+                continue
+        elif strategy == "unique" and stringify:
+            expr = f"COALESCE(STRING_AGG(DISTINCT {as_string}, '|' ORDER BY {as_string}), '')"
+        elif strategy in ("first", "last"):
+            value = as_string if stringify else c
+            expr = _first_value(
+                value,
+                _require_order(f"Strategy '{strategy}'"),
+                dialect,
+                strategy == "last",
+            )
+            if stringify:
+                expr = f"COALESCE({expr}, '')"
+        elif strategy == "majority" and stringify:
+            # Most frequent non-null value; ties go to the smallest value (as Series.mode)
+            cte = f"c{i}"
+            ctes.append(
+                f"{cte}_counts AS (\n"
+                f"  SELECT {keys_sql}, {c} AS value, COUNT(*) AS cnt\n"
+                f"  FROM filtered WHERE {c} IS NOT NULL\n"
+                f"  GROUP BY {keys_sql}, {c}\n)"
+            )
+            ctes.append(
+                f"{cte} AS (\n"
+                f"  SELECT {keys_sql}, value FROM (\n"
+                f"    SELECT {keys_sql}, value, ROW_NUMBER() OVER (\n"
+                f"      PARTITION BY {keys_sql} ORDER BY cnt DESC, value ASC\n"
+                f"    ) AS rn\n"
+                f"    FROM {cte}_counts\n"
+                f"  ) AS ranked WHERE rn = 1\n)"
+            )
+            joins.append(cte)
+            select_exprs.append(
+                f"COALESCE(CAST({cte}.value AS {string_type}), '') AS {c}"
+            )
+            continue
+        else:
+            raise ValueError(
+                f"Column '{col}' ({kind}): strategy '{strategy}' has no SQL translation."
+            )
+
+        inline_aggs.append(f"{expr} AS {c}")
+        select_exprs.append(f"agg.{c}")
+
+    # 4) Re-attach the (single) group per user, as aggregate_user_data does
+    if group_col and handle_multi_group in ("exclude", "first"):
+        inline_aggs.append(f"MIN({q(group_col)}) AS {q(group_col)}")
+        select_exprs.append(f"agg.{q(group_col)}")
+
+    agg_select = ",\n    ".join([q(k) for k in group_keys] + inline_aggs)
+    ctes.append(
+        f"agg AS (\n  SELECT\n    {agg_select}\n  FROM filtered\n  GROUP BY {keys_sql}\n)"
+    )
+
+    join_sql = "".join(
+        f"\nLEFT JOIN {cte} ON "
+        + " AND ".join(f"agg.{q(k)} = {cte}.{q(k)}" for k in group_keys)
+        for cte in joins
+    )
+    order_by = ", ".join(f"agg.{q(k)}" for k in group_keys)
+
+    return (
+        "WITH "
+        + ",\n".join(ctes)
+        + "\nSELECT\n  "
+        + ",\n  ".join(select_exprs)
+        + "\nFROM agg"
+        + join_sql
+        + f"\nORDER BY {order_by}"
+    )
+
+
+def user_level_dtypes(
+    source_dtypes: Dict[str, str],
+    column_kinds: Dict[str, str],
+    user_id_col: str,
+    group_col: Optional[str] = None,
+    handle_multi_group: str = "exclude",
+    numeric_strategy: str = "sum",
+    date_strategy: str = "min",
+    categorical_strategy: str = "majority",
+    custom_strategies: Optional[Dict[str, str]] = None,
+    exclude_columns: Optional[List[str]] = None,
+) -> Dict[str, str]:
+    """
+    {column: pandas dtype} that aggregate_user_data gives the columns of the query
+    built with the same arguments, for sessions with source_dtypes (e.g. Int64 for
+    "sum"/"max"/"count", Float64 for "mean"/"median" of Int64 columns, string for
+    the categorical strategies of string columns). Cast the query result with it to
+    get the pandas result.
+    """
+    custom_strategies = custom_strategies or {}
+    exclude = set(exclude_columns or [])
+    defaults = {
+        "numeric": numeric_strategy,
+        "datetime": date_strategy,
+        "categorical": categorical_strategy,
+    }
+
+    dtypes = {user_id_col: source_dtypes[user_id_col]}
+    if group_col and group_col in source_dtypes:
+        dtypes[group_col] = source_dtypes[group_col]
+    for col, kind in column_kinds.items():
+        if col in exclude or col in dtypes:
+            continue
+        dtype = pd.api.types.pandas_dtype(source_dtypes[col])
+        # Nullable Int64/Float64 columns give nullable results
+        nullable = isinstance(dtype, pd.api.extensions.ExtensionDtype) and (
+            dtype.kind in "biuf"
+        )
+        is_custom = col in custom_strategies
+        strategy = custom_strategies[col] if is_custom else defaults[kind]
+        if is_stringified(kind, strategy, is_custom):
+            if isinstance(dtype, pd.StringDtype):
+                dtypes[col] = source_dtypes[col]
+        elif strategy in ("sum", "max", "min", "first", "last"):
+            dtypes[col] = source_dtypes[col]
+        elif strategy in ("mean", "median"):
+            dtypes[col] = "Float64" if nullable else "float64"
+        elif strategy == "count":
+            dtypes[col] = "Int64" if nullable else "int64"
+        elif strategy == "nunique":
+            dtypes[col] = "int64"
+    return dtypes
+
+
+def execute_with_duckdb(sql: str, tables: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Run a (duckdb-dialect) query locally against in-memory DataFrames, registered
+    under the given table names. Requires the optional `duckdb` package.
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        for name, frame in tables.items():
+            con.register(name, frame)
+        return con.execute(sql).df()
+    finally:
+        con.close()
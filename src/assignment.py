@@ -0,0 +1,120 @@
+# src/assignment.py
+
+"""
+Deterministic hash-based assignment of users to experiment arms.
+
+Each user ID is hashed together with an experiment-specific salt into one of
+n_buckets buckets, and contiguous bucket ranges are mapped to arms according to the
+split weights. A user's arm therefore depends only on (salt, user ID): it is stable
+across runs, machines and data refreshes, and adding or removing other users never
+moves anyone. Different salts give independent assignments for different experiments.
+
+Usage Example:
+-------------
+from src.assignment import assign_arms
+
+user_df["rec_group"] = assign_arms(
+    user_df["fullVisitorId"], arms=["control", "test"], salt="recommendation-2017-q1"
+)
+# A/B/C with a 50/25/25 split
+user_df["variant"] = assign_arms(
+    user_df["fullVisitorId"], arms=["control", "b", "c"], weights=[2, 1, 1], salt="x"
+)
+"""
+
+import hashlib
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Bucket resolution: split ratios are honoured to 1 / DEFAULT_BUCKETS
+DEFAULT_BUCKETS = 10_000
+
+
+def salt_to_hash_key(salt: str) -> str:
+    """Derive the 16-character key pd.util.hash_array expects from any salt string."""
+    return hashlib.blake2b(str(salt).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def hash_buckets(
+    ids: Sequence, salt: str = "", n_buckets: int = DEFAULT_BUCKETS
+) -> np.ndarray:
+    """
+    Map each ID to a bucket in [0, n_buckets) with a salted, keyed hash (SipHash via
+    pd.util.hash_array). IDs are hashed as strings, so 123 and "123" share a bucket.
+    Repeated IDs are hashed once.
+    """
+    codes, uniques = pd.factorize(pd.Series(ids), use_na_sentinel=False)
+    hashes = pd.util.hash_array(
+        np.asarray(uniques.astype(str), dtype=object),
+        hash_key=salt_to_hash_key(salt),
+        categorize=False,
+    )
+    return (hashes % np.uint64(n_buckets)).astype(np.int64)[codes]
+
+
+def arm_codes_from_buckets(
+    buckets: np.ndarray, weights: Sequence[float], n_buckets: int = DEFAULT_BUCKETS
+) -> np.ndarray:
+    """
+    Convert bucket numbers into arm indices, giving arm i a contiguous share of the
+    buckets proportional to weights[i].
+    """
+    weights = np.asarray(weights, dtype=float)
+    if len(weights) == 0 or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("weights must be non-negative and sum to a positive value.")
+    bounds = np.round(np.cumsum(weights) / weights.sum() * n_buckets)
+    return np.searchsorted(bounds, buckets, side="right").astype(np.int8)
+
+
+def assign_arm_codes(
+    ids: Sequence,
+    weights: Sequence[float] = (1.0, 1.0),
+    salt: str = "",
+    n_buckets: int = DEFAULT_BUCKETS,
+) -> np.ndarray:
+    """
+    Like assign_arms, but return the int8 arm index per ID (position in weights)
+    instead of a Categorical of labels.
+    """
+    buckets = hash_buckets(ids, salt=salt, n_buckets=n_buckets)
+    return arm_codes_from_buckets(buckets, weights, n_buckets)
+
+
+def assign_arms(
+    ids: Sequence,
+    arms: Sequence[str] = ("control", "test"),
+    weights: Optional[Sequence[float]] = None,
+    salt: str = "",
+    n_buckets: int = DEFAULT_BUCKETS,
+) -> pd.Categorical:
+    """
+    Assign every ID to an arm by salted hash bucketing.
+
+    Parameters
+    ----------
+    ids : array-like
+        User IDs (one per row; repeated IDs always get the same arm).
+    arms : sequence of str, default ("control", "test")
+        Arm labels.
+    weights : sequence of float, optional
+        Relative size of each arm (equal split by default).
+    salt : str
+        Experiment-specific salt. Reusing a salt reproduces an assignment exactly;
+        a new salt re-randomizes.
+    n_buckets : int
+        Number of hash buckets (resolution of the split).
+
+    Returns
+    -------
+    pd.Categorical
+        Arm label per ID, with categories in the order of `arms`.
+    """
+    arms = list(arms)
+    if weights is None:
+        weights = [1.0] * len(arms)
+    if len(weights) != len(arms):
+        raise ValueError("weights must have one entry per arm.")
+    codes = assign_arm_codes(ids, weights, salt=salt, n_buckets=n_buckets)
+    return pd.Categorical.from_codes(codes, categories=arms)
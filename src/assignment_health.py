@@ -0,0 +1,291 @@
+# src/assignment_health.py
+
+"""
+Assignment-health checks to run before any metric test.
+
+check_assignment_health validates an experiment split in one pass over integer codes:
+  - Sample ratio mismatch (SRM): chi-square goodness-of-fit of the arm counts against
+    the designed split, overall and within every segment (country, trafficSource,
+    date, ...). Segment p-values are Holm-corrected across all segments. This needs
+    the designed split (expected_weights), i.e. a randomized or hash assignment:
+    threshold or behavioral splits (pricing, cross-sell) legitimately differ
+    between segments, so their segments are counted but not tested.
+  - Multi-group users: users that appear in more than one arm (which
+    aggregate_user_data can only handle post hoc).
+
+An SRM usually means the assignment or the logging is broken, and metric results of
+such an experiment should not be trusted.
+
+Usage Example:
+-------------
+from src.assignment_health import check_assignment_health, format_health_report
+
+assigned = assign_recommendation_groups(user_df, method="hash")
+health = check_assignment_health(
+    assigned, group_col="rec_group", user_id_col="fullVisitorId"
+)
+if not health["healthy"]:
+    print(format_health_report(health))
+health["segments"].query("srm")   # segments with a sample ratio mismatch
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import stage
+from src.vectorized_stats import adjust_p_values, chi2_goodness_of_fit
+
+DEFAULT_SEGMENT_COLS = ("country", "trafficSource", "date")
+# Conventional SRM threshold: strict, since any real mismatch tends to be very large
+SRM_ALPHA = 0.001
+
+
+def _arm_codes(groups: pd.Series, arms: Optional[Sequence]) -> tuple:
+    """Integer arm code per row (-1 for missing or unknown labels) and the arm labels."""
+    if arms is None:
+        if isinstance(groups.dtype, pd.CategoricalDtype):
+            # The categorical codes already are the arm codes
+            return groups.cat.codes.to_numpy().astype(np.int64), list(
+                groups.cat.categories
+            )
+        else:
+            arms = sorted(groups.dropna().unique(), key=str)
+    arms = list(arms)
+    codes, labels = pd.factorize(groups)
+    arm_index = {arm: i for i, arm in enumerate(arms)}
+    lookup = np.array([arm_index.get(label, -1) for label in labels], dtype=np.int64)
+    codes = np.where(codes >= 0, lookup[np.maximum(codes, 0)], -1)
+    return codes, arms
+
+
+def _multi_group_users(
+    user_ids: pd.Series, codes: np.ndarray, n_arms: int, max_examples: int = 10
+) -> Dict[str, Any]:
+    """
+    Count users whose rows carry more than one distinct arm, and the assigned rows
+    without a user ID (unknown users, which cannot be checked).
+    """
+    valid = codes >= 0
+    user_codes, users = pd.factorize(user_ids[valid])
+    known = user_codes >= 0
+    # Distinct (user, arm) pairs, then distinct arms per user
+    pairs = np.unique(user_codes[known].astype(np.int64) * n_arms + codes[valid][known])
+    arms_per_user = np.bincount(pairs // n_arms, minlength=len(users))
+    multi = np.flatnonzero(arms_per_user > 1)
+    return {
+        "n_users": int(len(users)),
+        "n_unknown_user_rows": int((~known).sum()),
+        "n_multi_group_users": int(len(multi)),
+        "rate": float(len(multi) / len(users)) if len(users) else np.nan,
+        "examples": list(users[multi[:max_examples]]),
+    }
+
+
+def check_assignment_health(
+    df: pd.DataFrame,
+    group_col: Optional[str] = None,
+    user_id_col: Optional[str] = None,
+    arms: Optional[Sequence] = None,
+    expected_weights: Optional[Sequence[float]] = None,
+    segment_cols: Optional[Sequence[str]] = DEFAULT_SEGMENT_COLS,
+    srm_alpha: float = SRM_ALPHA,
+    min_segment_size: int = 100,
+    max_multi_group_rate: float = 0.0,
+    labels: Optional[Sequence] = None,
+) -> Dict[str, Any]:
+    """
+    Check an experiment split for sample ratio mismatch and multi-group users.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Assigned data, one row per unit of randomization (usually user-level).
+    group_col : str, optional
+        Column with the arm label of each row (or pass labels).
+    user_id_col : str, optional
+        User ID column. If given, users found in more than one arm are counted.
+    arms : sequence, optional
+        Arm labels, in the order of expected_weights. By default the categories of
+        a categorical group_col, otherwise the sorted labels found.
+    expected_weights : sequence of float, optional
+        Designed relative arm sizes of a randomized (or hash) assignment. Without it
+        there is no SRM test at all: segments are reported with their counts only,
+        as a non-randomized split (e.g. by a revenue threshold) is expected to
+        differ between segments.
+    segment_cols : sequence of str, optional
+        Columns to segment by; columns missing from df are skipped.
+    srm_alpha : float, default 0.001
+        Significance level for flagging SRM (overall, and Holm-adjusted per segment).
+    min_segment_size : int, default 100
+        Segments with fewer rows are reported but not tested.
+    max_multi_group_rate : float, default 0.0
+        Largest tolerated share of users seen in more than one arm.
+    labels : array-like, optional
+        Arm label of each row of df, used instead of group_col (e.g. a Categorical
+        built from assignment codes, so df needs no group column).
+
+    Returns
+    -------
+    dict
+        - "arms", "expected_weights", "n_rows"
+        - "overall": counts per arm, chi2_statistic, p_value and "srm" flag
+        - "segments": DataFrame with one row per (segment_col, segment): the row
+          count, counts per arm, chi2_statistic, p_value, adjusted_p_value, srm
+        - "multi_group" (if user_id_col): n_users, n_multi_group_users, rate,
+          examples, n_unknown_user_rows (assigned rows without a user ID)
+        - "issues": human-readable problems found; "healthy": True if none
+    """
+    if labels is None:
+        if group_col is None:
+            raise ValueError("Pass either group_col or labels.")
+        groups = df[group_col]
+    else:
+        if len(labels) != len(df):
+            raise ValueError("labels must have one entry per row of df.")
+        groups = pd.Series(labels, index=df.index, copy=False)
+        group_col = group_col or "labels"
+
+    with stage("check_assignment_health", rows_in=len(df), group_col=group_col):
+        codes, arms = _arm_codes(groups, arms)
+        k = len(arms)
+        valid = codes >= 0
+        overall_counts = np.bincount(codes[valid], minlength=k)
+
+        if expected_weights is not None:
+            if len(expected_weights) != k:
+                raise ValueError("expected_weights must have one entry per arm.")
+            props = np.asarray(expected_weights, dtype=float)
+        else:
+            props = None
+
+        issues: List[str] = []
+        overall = {
+            "counts": dict(zip(arms, overall_counts.tolist())),
+            "chi2_statistic": np.nan,
+            "p_value": np.nan,
+            "srm": False,
+        }
+        if expected_weights is not None and k > 1:
+            chi2, p_val = chi2_goodness_of_fit(overall_counts, props)
+            overall.update(
+                chi2_statistic=float(chi2[0]),
+                p_value=float(p_val[0]),
+                srm=bool(p_val[0] < srm_alpha),
+            )
+            if overall["srm"]:
+                issues.append(
+                    f"Overall sample ratio mismatch (p={overall['p_value']:.2e}): "
+                    f"observed {overall['counts']}."
+                )
+        unknown = int((~valid).sum())
+        if unknown:
+            issues.append(f"{unknown} rows have a missing or unknown '{group_col}'.")
+
+        # Per-segment counts: one bincount per segment column, tested together
+        blocks = []
+        for col in segment_cols or ():
+            if col not in df.columns or col == group_col:
+                continue
+            seg_codes, segments = pd.factorize(df[col][valid])
+            keep = seg_codes >= 0
+            counts = np.bincount(
+                seg_codes[keep].astype(np.int64) * k + codes[valid][keep],
+                minlength=len(segments) * k,
+            ).reshape(len(segments), k)
+            block = pd.DataFrame(counts, columns=[str(a) for a in arms])
+            block.insert(0, "n", counts.sum(axis=1))
+            block.insert(0, "segment", np.asarray(segments, dtype=object))
+            block.insert(0, "segment_col", col)
+            blocks.append(block)
+
+        if blocks:
+            seg_df = pd.concat(blocks, ignore_index=True)
+            counts = seg_df[[str(a) for a in arms]].to_numpy()
+            testable = (seg_df["n"] >= min_segment_size).to_numpy() & (k > 1)
+            if props is None:
+                testable[:] = False
+            chi2 = np.full(len(seg_df), np.nan)
+            p_val = np.full(len(seg_df), np.nan)
+            if testable.any():
+                chi2[testable], p_val[testable] = chi2_goodness_of_fit(
+                    counts[testable], props
+                )
+            seg_df["chi2_statistic"] = chi2
+            seg_df["p_value"] = p_val
+            seg_df["adjusted_p_value"] = adjust_p_values(p_val, "holm")
+            seg_df["srm"] = seg_df["adjusted_p_value"] < srm_alpha
+            for col, n_srm in (
+                seg_df[seg_df["srm"]].groupby("segment_col").size().items()
+            ):
+                issues.append(f"Sample ratio mismatch in {n_srm} '{col}' segment(s).")
+        else:
+            seg_df = pd.DataFrame(
+                columns=["segment_col", "segment", "n"]
+                + [str(a) for a in arms]
+                + ["chi2_statistic", "p_value", "adjusted_p_value", "srm"]
+            )
+
+        results = {
+            "arms": arms,
+            "expected_weights": (
+                None if expected_weights is None else list(expected_weights)
+            ),
+            "n_rows": int(len(df)),
+            "overall": overall,
+            "segments": seg_df,
+        }
+
+        if user_id_col is not None:
+            multi = _multi_group_users(df[user_id_col], codes, k)
+            results["multi_group"] = multi
+            if multi["n_users"] and multi["rate"] > max_multi_group_rate:
+                issues.append(
+                    f"{multi['n_multi_group_users']} users ({multi['rate']:.2%}) "
+                    "appear in more than one arm."
+                )
+            if multi["n_unknown_user_rows"]:
+                issues.append(
+                    f"{multi['n_unknown_user_rows']} assigned rows have a missing "
+                    f"'{user_id_col}' (unknown users)."
+                )
+
+        results["issues"] = issues
+        results["healthy"] = not issues
+        return results
+
+
+def format_health_report(health: Dict[str, Any]) -> str:
+    """Short text summary of check_assignment_health output."""
+    overall = health["overall"]
+    text = [f"Arm counts: {overall['counts']} ({health['n_rows']} rows)"]
+    if health["expected_weights"] is not None:
+        text.append(
+            f"Overall SRM test: expected weights {health['expected_weights']}, "
+            f"chi2={overall['chi2_statistic']:.3f}, p-value={overall['p_value']:.4g}"
+        )
+    segments = health["segments"]
+    if health["expected_weights"] is None:
+        text.append("No designed split given: sample ratio mismatch not tested.")
+    else:
+        tested = segments["p_value"].notna().sum()
+        text.append(
+            f"Segments tested: {tested} of {len(segments)}, "
+            f"with SRM: {int(segments['srm'].sum())}"
+        )
+    if "multi_group" in health:
+        mg = health["multi_group"]
+        text.append(
+            f"Multi-group users: {mg['n_multi_group_users']} of {mg['n_users']}"
+            + (
+                f" ({mg['n_unknown_user_rows']} rows of unknown users)"
+                if mg["n_unknown_user_rows"]
+                else ""
+            )
+        )
+    if health["healthy"]:
+        text.append("No assignment problems found.")
+    else:
+        text += ["Problems:"] + [f"  - {issue}" for issue in health["issues"]]
+    return "\n".join(text)
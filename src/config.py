@@ -4,5 +4,31 @@ import os
 BIGQUERY_PROJECT = os.getenv("BIGQUERY_PROJECT", "googanalyics-staging-project")
 # BIGQUERY_DATASET = os.getenv("BIGQUERY_DATASET", "your_dataset_name")
 
+# Where session data comes from: "bigquery", or "local" to query a local mirror of the
+# ga_sessions_YYYYMMDD tables stored as Parquet files (see src/local_sessions.py)
+SESSIONS_BACKEND = os.getenv("SESSIONS_BACKEND", "bigquery")
+LOCAL_SESSIONS_PATH = os.getenv("GA_SESSIONS_PATH", "data/ga_sessions")
+
 # Other configuration variables (e.g., Streamlit settings)
 APP_TITLE = "Google Analytics A/B Testing & Customer Analytics"
+
+# Stage timing/memory instrumentation (see src/instrumentation.py)
+INSTRUMENTATION_ENABLED = os.getenv("AB_INSTRUMENT", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+INSTRUMENTATION_TRACE_PATH = os.getenv("AB_TRACE_PATH") or None
+
+# Parquet dataset where A/B test results are appended (see src/results_store.py)
+RESULTS_STORE_PATH = os.getenv("AB_RESULTS_PATH", "data/ab_results")
+
+# On-disk stage checkpoints of src/pipeline.py
+PIPELINE_CHECKPOINT_PATH = os.getenv("AB_PIPELINE_PATH", "data/pipeline")
+
+# Polars engine for backend="polars" in cleaning/aggregation (see src/polars_backend.py):
+# "auto" (in-memory, multithreaded) or "streaming" (batched, for larger-than-memory data)
+POLARS_ENGINE = os.getenv("AB_POLARS_ENGINE", "auto")
+
+# Persistent, append-only visitor ID -> integer code mapping (see src/visitor_ids.py)
+VISITOR_ID_MAPPING_PATH = os.getenv("AB_VISITOR_ID_PATH", "data/visitor_ids")
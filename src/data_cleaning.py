@@ -3,6 +3,8 @@
 import numpy as np
 import pandas as pd
 
+from src.instrumentation import instrumented
+
 
 def profile_data(df: pd.DataFrame) -> dict:
     """
@@ -50,8 +52,9 @@ def profile_data(df: pd.DataFrame) -> dict:
     return profile
 
 
+@instrumented()
 def clean_sessions_data(
-    df: pd.DataFrame, cleaning_options: dict = None
+    df: pd.DataFrame, cleaning_options: dict = None, backend: str = "pandas"
 ) -> pd.DataFrame:
     """
     Clean and format the sessions DataFrame with the following categorical mappings:
@@ -70,7 +73,17 @@ def clean_sessions_data(
       - 'fill_missing_pageviews': bool. Fill NaN in 'pageviews' with 0.
       - 'fill_missing_timeOnSite': bool. Fill NaN in 'timeOnSite' with 0.
       - 'timeOnSite_zero_floor': bool. If True, negative timeOnSite => 0.
+
+    backend="pandas" cleans df in place (and returns it); backend="polars" runs the
+    same steps as a Polars query (src/polars_backend.py) and returns a new DataFrame.
     """
+    if backend == "polars":
+        from src.polars_backend import clean_sessions_data_polars
+
+        return clean_sessions_data_polars(df, cleaning_options)
+    elif backend != "pandas":
+        raise ValueError(f"Unsupported backend: {backend}")
+
     default_opts = {
         "convert_date": False,
         "revenue_adjustment": False,
@@ -1,26 +1,134 @@
 # src/data_extraction.py
 
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 import pandas as pd
 import pandas_gbq
 
+from src.aggregation_sql import build_user_aggregation_sql, user_level_dtypes
 from src.config import BIGQUERY_PROJECT
+from src.instrumentation import instrumented
+
+# Output column -> SQL expression in the ga_sessions_* tables
+SESSION_COLUMNS = {
+    "fullVisitorId": "fullVisitorId",
+    "visitId": "visitId",
+    "visitNumber": "visitNumber",
+    "date": "date",
+    "pageviews": "totals.pageviews",
+    "timeOnSite": "totals.timeOnSite",
+    "transactions": "totals.transactions",
+    "totalTransactionRevenue": "totals.totalTransactionRevenue",
+    "trafficSource": "trafficSource.source",
+    "trafficMedium": "trafficSource.medium",
+    "trafficCampaign": "trafficSource.campaign",
+    "country": "geoNetwork.country",
+    "city": "geoNetwork.city",
+}
+
+SESSION_DTYPES = {
+    "fullVisitorId": "string",
+    "visitId": "string",
+    "visitNumber": "Int64",
+    "date": "datetime64[ns]",
+    "pageviews": "Int64",
+    "timeOnSite": "Int64",
+    "transactions": "Int64",
+    "totalTransactionRevenue": "Int64",
+    "trafficSource": "string",
+    "trafficMedium": "string",
+    "trafficCampaign": "string",
+    "country": "string",
+    "city": "string",
+}
+
+# Aggregation kind of each session column (see aggregation_sql.infer_column_kinds)
+SESSION_COLUMN_KINDS = {
+    c: (
+        "numeric"
+        if dtype == "Int64"
+        else "datetime"
+        if dtype.startswith("datetime")
+        else "categorical"
+    )
+    for c, dtype in SESSION_DTYPES.items()
+}
+
+# BigQuery types for query parameter values
+_PARAM_TYPES = {bool: "BOOL", int: "INT64", float: "FLOAT64", str: "STRING"}
+
+
+def to_query_parameters(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convert {name: value} into BigQuery REST queryParameters (named mode).
+    Lists/tuples become ARRAY parameters of their element type.
+    """
+    query_parameters = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            elem_type = _PARAM_TYPES[type(value[0])] if value else "STRING"
+            query_parameters.append(
+                {
+                    "name": name,
+                    "parameterType": {
+                        "type": "ARRAY",
+                        "arrayType": {"type": elem_type},
+                    },
+                    "parameterValue": {
+                        "arrayValues": [{"value": str(v)} for v in value]
+                    },
+                }
+            )
+        else:
+            query_parameters.append(
+                {
+                    "name": name,
+                    "parameterType": {"type": _PARAM_TYPES[type(value)]},
+                    "parameterValue": {"value": str(value)},
+                }
+            )
+    return query_parameters
 
 
 class BigQueryClient:
+    # Source of the session-level data, as referenced in generated SQL
+    sessions_table = "`bigquery-public-data.google_analytics_sample.ga_sessions_*`"
+    # SQL dialect of generated queries (see aggregation_sql.build_user_aggregation_sql)
+    sql_dialect = "bigquery"
+
     def __init__(self, project_id: str = BIGQUERY_PROJECT):
         """
         Initialize the BigQuery client using pandas-gbq.
         """
         self.project_id = project_id
 
-    def run_query(self, query: str, dtypes: dict = None) -> pd.DataFrame:
+    @instrumented("run_query")
+    def run_query(
+        self,
+        query: str,
+        dtypes: dict = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
         """
         Execute a SQL query using pandas-gbq and return the result as a Pandas DataFrame.
+        Named query parameters (referenced as @name in the SQL) are passed via `params`.
         """
+        configuration = None
+        if params:
+            configuration = {
+                "query": {
+                    "parameterMode": "NAMED",
+                    "queryParameters": to_query_parameters(params),
+                }
+            }
         try:
             # The dialect is set to 'standard' by default.
             df = pandas_gbq.read_gbq(
-                query, project_id=self.project_id, dialect="standard", dtypes=dtypes
+                query,
+                project_id=self.project_id,
+                dialect="standard",
+                dtypes=dtypes,
+                configuration=configuration,
             )
             print("Query executed successfully using pandas-gbq.")
             return df
@@ -28,8 +136,90 @@ class BigQueryClient:
             print("Error running query using pandas-gbq:", e)
             raise
 
+    def _sessions_source(self, start_date: str = None, end_date: str = None) -> str:
+        """
+        Table reference used in FROM. Subclasses can narrow it to the requested date
+        range; _TABLE_SUFFIX filters are applied in the WHERE clause either way.
+        """
+        return self.sessions_table
+
+    def build_sessions_query(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        start_date: str = None,
+        end_date: str = None,
+        countries: Optional[Sequence[str]] = None,
+        traffic_sources: Optional[Sequence[str]] = None,
+        min_transactions: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build a parameterized sessions query that only selects the requested columns
+        and pushes the filters into the WHERE clause.
+
+        Parameters:
+          - columns: output columns to select (keys of SESSION_COLUMNS); all by default.
+          - start_date / end_date: (optional) 'YYYYMMDD' bounds on the daily table suffix.
+          - countries: (optional) keep only these geoNetwork.country values.
+          - traffic_sources: (optional) keep only these trafficSource.source values.
+          - min_transactions: (optional) keep sessions with at least this many
+            transactions, e.g. 1 for purchasing sessions only.
+          - limit: (optional) maximum number of rows.
+
+        Filter values refer to the raw (uncleaned) values in BigQuery.
+
+        Returns (sql, params); params are referenced as @name in the SQL.
+        """
+        columns = list(columns) if columns is not None else list(SESSION_COLUMNS)
+        unknown = [c for c in columns if c not in SESSION_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown session columns: {unknown}")
+
+        select = ",\n              ".join(
+            SESSION_COLUMNS[c]
+            if SESSION_COLUMNS[c] == c
+            else f"{SESSION_COLUMNS[c]} AS {c}"
+            for c in columns
+        )
+        query = f"""
+            SELECT
+              {select}
+            FROM {self._sessions_source(start_date, end_date)}
+        """
+
+        conditions = []
+        params: Dict[str, Any] = {}
+        if start_date:
+            conditions.append("_TABLE_SUFFIX >= @start_date")
+            params["start_date"] = str(start_date)
+        if end_date:
+            conditions.append("_TABLE_SUFFIX <= @end_date")
+            params["end_date"] = str(end_date)
+        if countries:
+            conditions.append("geoNetwork.country IN UNNEST(@countries)")
+            params["countries"] = [str(c) for c in countries]
+        if traffic_sources:
+            conditions.append("trafficSource.source IN UNNEST(@traffic_sources)")
+            params["traffic_sources"] = [str(s) for s in traffic_sources]
+        if min_transactions is not None:
+            conditions.append("totals.transactions >= @min_transactions")
+            params["min_transactions"] = int(min_transactions)
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return query, params
+
     def get_sessions_data(
-        self, start_date: str = None, end_date: str = None, limit: int = 1000000
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        limit: int = 1000000,
+        columns: Optional[Sequence[str]] = None,
+        countries: Optional[Sequence[str]] = None,
+        traffic_sources: Optional[Sequence[str]] = None,
+        min_transactions: Optional[int] = None,
     ) -> pd.DataFrame:
         """
         Retrieve sessions data from the Google Analytics Sample Store.
@@ -38,50 +228,78 @@ class BigQueryClient:
           - start_date: (optional) string in 'YYYYMMDD' format.
           - end_date: (optional) string in 'YYYYMMDD' format.
           - limit: number of records to return (default 1,000,000).
+          - columns, countries, traffic_sources, min_transactions: optional column
+            projection and filters, see build_sessions_query.
 
         If no dates are provided, the query will not filter by date.
         """
-        base_query = """
-            SELECT
-              fullVisitorId,
-              visitId,
-              visitNumber,
-              date,
-              totals.pageviews AS pageviews,
-              totals.timeOnSite AS timeOnSite,
-              totals.transactions AS transactions,
-              totals.totalTransactionRevenue AS totalTransactionRevenue,
-              trafficSource.source AS trafficSource,
-              trafficSource.medium AS trafficMedium,
-              trafficSource.campaign AS trafficCampaign,
-              geoNetwork.country AS country,
-              geoNetwork.city AS city
-            FROM `bigquery-public-data.google_analytics_sample.ga_sessions_*`
+        query, params = self.build_sessions_query(
+            columns=columns,
+            start_date=start_date,
+            end_date=end_date,
+            countries=countries,
+            traffic_sources=traffic_sources,
+            min_transactions=min_transactions,
+            limit=limit,
+        )
+        print("Final Query:", query, "Parameters:", params)
+
+        columns = list(columns) if columns is not None else list(SESSION_COLUMNS)
+        dtypes = {c: SESSION_DTYPES[c] for c in columns}
+        return self.run_query(query, dtypes=dtypes, params=params)
+
+    def get_user_level_data(
+        self,
+        start_date: str = None,
+        end_date: str = None,
+        columns: Optional[Sequence[str]] = None,
+        countries: Optional[Sequence[str]] = None,
+        traffic_sources: Optional[Sequence[str]] = None,
+        min_transactions: Optional[int] = None,
+        user_id_col: str = "fullVisitorId",
+        order_col: Optional[str] = "visitNumber",
+        **aggregation_kwargs,
+    ) -> pd.DataFrame:
         """
-        conditions = []
-        if start_date and end_date:
-            conditions.append(f"_TABLE_SUFFIX BETWEEN '{start_date}' AND '{end_date}'")
-        if conditions:
-            query = base_query + " WHERE " + " AND ".join(conditions)
-        else:
-            query = base_query
-
-        query += f" LIMIT {limit}"
-        print("Final Query:", query)
-
-        dtypes = {
-            "fullVisitorId": "string",
-            "visitId": "string",
-            "visitNumber": "Int64",
-            "date": "datetime64[ns]",
-            "pageviews": "Int64",
-            "timeOnSite": "Int64",
-            "transactions": "Int64",
-            "totalTransactionRevenue": "Int64",
-            "trafficSource": "string",
-            "trafficMedium": "string",
-            "trafficCampaign": "string",
-            "country": "string",
-            "city": "string",
-        }
-        return self.run_query(query, dtypes=dtypes)
+        Aggregate sessions to one row per user inside BigQuery and return only the
+        user-level rows.
+
+        Parameters:
+          - start_date, end_date, columns, countries, traffic_sources, min_transactions:
+            column projection and filters, see build_sessions_query.
+          - user_id_col: column identifying users (default "fullVisitorId").
+          - order_col: column defining session order for "first"/"last" strategies.
+          - aggregation_kwargs: group_col, handle_multi_group, numeric_strategy,
+            date_strategy, categorical_strategy, custom_strategies, exclude_columns,
+            with the same meaning as in aggregate_user_data (named strategies only).
+
+        Values are aggregated as stored in BigQuery, i.e. before clean_sessions_data.
+        The result has the values and dtypes of aggregate_user_data over the rows of
+        get_sessions_data (ordered by order_col for "first"/"last").
+        """
+        columns = list(columns) if columns is not None else list(SESSION_COLUMNS)
+        source_sql, params = self.build_sessions_query(
+            columns=columns,
+            start_date=start_date,
+            end_date=end_date,
+            countries=countries,
+            traffic_sources=traffic_sources,
+            min_transactions=min_transactions,
+        )
+        if order_col not in columns:
+            order_col = None
+        kinds = {c: SESSION_COLUMN_KINDS[c] for c in columns}
+        query = build_user_aggregation_sql(
+            source_sql,
+            kinds,
+            user_id_col,
+            order_col=order_col,
+            dialect=self.sql_dialect,
+            **aggregation_kwargs,
+        )
+        print("Final Query:", query, "Parameters:", params)
+
+        dtypes = user_level_dtypes(
+            SESSION_DTYPES, kinds, user_id_col, **aggregation_kwargs
+        )
+        return self.run_query(query, dtypes=dtypes, params=params)
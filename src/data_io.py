@@ -0,0 +1,118 @@
+# src/data_io.py
+
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# File extension -> format name
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".feather": "feather"}
+
+# Preferred order when several copies of the same dataset exist
+# (Feather is fastest to reload, Parquet is compact, CSV is the fallback)
+READ_PREFERENCE = ["feather", "parquet", "csv"]
+
+
+def _infer_format(path: str, fmt: Optional[str]) -> str:
+    if fmt is not None:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(
+            f"Cannot infer file format from '{path}'. Use one of {list(FORMATS)}."
+        )
+    return FORMATS[ext]
+
+
+def save_frame(df: pd.DataFrame, path: str, fmt: Optional[str] = None) -> str:
+    """
+    Save a DataFrame as CSV, Parquet or Feather (inferred from the extension unless
+    fmt is given). Parquet and Feather keep dtypes such as Int64, string, category
+    and datetime. Returns the path written.
+    """
+    fmt = _infer_format(path, fmt)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        # Feather requires a default RangeIndex
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    # Scripts report what they saved; library callers stay quiet
+    logger.debug("Data saved to %s.", path)
+    return path
+
+
+def load_frame(
+    path: str,
+    columns: Optional[Iterable[str]] = None,
+    fmt: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Load a DataFrame from CSV, Parquet or Feather.
+
+    Parameters
+    ----------
+    path : str
+        File to read; the format is inferred from the extension unless fmt is given.
+    columns : iterable of str, optional
+        Only read these columns (column projection). For Parquet/Feather the other
+        columns are never decoded.
+    fmt : {"csv", "parquet", "feather"}, optional
+        Explicit format.
+    """
+    fmt = _infer_format(path, fmt)
+    columns = list(columns) if columns is not None else None
+
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    elif fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    elif fmt == "feather":
+        return pd.read_feather(path, columns=columns)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def read_schema(path: str, fmt: Optional[str] = None) -> Dict[str, str]:
+    """
+    Return {column: pandas dtype name} without loading the data. For CSV, dtypes are
+    inferred from the first 1000 rows.
+    """
+    fmt = _infer_format(path, fmt)
+    if fmt == "csv":
+        sample = pd.read_csv(path, nrows=1000)
+    else:
+        if fmt == "parquet":
+            schema = pq.read_schema(path)
+        else:
+            schema = pa.ipc.open_file(path).schema
+        # An empty table carries the pandas metadata, so dtypes match load_frame
+        sample = schema.empty_table().to_pandas()
+    return {col: str(dtype) for col, dtype in sample.dtypes.items()}
+
+
+def find_data_file(
+    base_path: str, preference: List[str] = READ_PREFERENCE
+) -> Optional[str]:
+    """
+    Given a path without extension (e.g. "data/user_agg_cleaned"), return the first
+    existing copy in order of preference (Feather, Parquet, CSV), or None.
+    """
+    ext_by_format = {v: k for k, v in FORMATS.items()}
+    for fmt in preference:
+        candidate = base_path + ext_by_format[fmt]
+        if os.path.exists(candidate):
+            return candidate
+    return None
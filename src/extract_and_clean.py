@@ -1,52 +1,80 @@
-import os
+# src/extract_and_clean.py
 
-import pandas as pd
+"""
+Extract GA sessions, clean them, aggregate them to one row per user and save the
+user-level table for the Streamlit app (data/user_agg_cleaned.parquet / .feather).
 
-# Adjust working directory so that Python sees 'src' as a package
-if not os.path.exists("src"):
-    os.chdir("..")
+The work is done by src/pipeline.py, so every stage is checkpointed under
+data/pipeline (AB_PIPELINE_PATH): rerunning with unchanged settings loads the
+checkpoints, and changing e.g. only the aggregation settings reuses the extracted
+and cleaned data. Visitor IDs are integer-encoded inside the pipeline (mapping under
+data/visitor_ids) and decoded again for the saved table.
 
-print("Updated working directory:", os.getcwd())
+Usage Example:
+-------------
+python -m src.extract_and_clean            # from the repository root
+python src/extract_and_clean.py            # also works
+"""
 
-from src.data_cleaning import clean_sessions_data
-from src.data_extraction import BigQueryClient
-from src.user_aggregation import aggregate_user_data
+import os
+import sys
 
-# 1. Instantiate the BigQuery client
-client = BigQueryClient()
+# Make the repository root importable when run as a script
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
 
-# 2. Extract data (without date filtering, limit to e.g. 50,000 rows)
-raw_data = client.get_sessions_data(limit=1000000)
+from src.config import PIPELINE_CHECKPOINT_PATH, VISITOR_ID_MAPPING_PATH  # noqa: E402
+from src.data_io import save_frame  # noqa: E402
+from src.pipeline import Pipeline  # noqa: E402
 
-# 3. Clean the data
-options = {
-    "convert_date": False,
-    "revenue_adjustment": True,
-    "fill_missing_transactions": True,
-    "fill_missing_pageviews": True,
-    "fill_missing_timeOnSite": True,
-    "timeOnSite_zero_floor": True,
+# Overrides of src.pipeline.DEFAULT_CONFIG. The session source follows
+# SESSIONS_BACKEND (BigQuery, or the local DuckDB mirror with SESSIONS_BACKEND=local).
+CONFIG = {
+    "extract": {"limit": 1000000},
+    # Relative to the repository root, like the checkpoints
+    "encode": {"mapping_path": os.path.join(ROOT, VISITOR_ID_MAPPING_PATH)},
+    "clean": {
+        "cleaning_options": {
+            "convert_date": False,
+            "revenue_adjustment": True,
+            "fill_missing_transactions": True,
+            "fill_missing_pageviews": True,
+            "fill_missing_timeOnSite": True,
+            "timeOnSite_zero_floor": True,
+        }
+    },
+    "aggregate": {
+        "user_id_col": "fullVisitorId",
+        "group_col": None,  # or "experimentGroup"
+        "handle_multi_group": "first",
+        "numeric_strategy": "mean",
+        "date_strategy": "min",  # earliest date
+        "categorical_strategy": "majority",  # most frequent category for each user
+        "custom_strategies": {"visitNumber": "max", "transactions": "sum"},
+        "exclude_columns": ["visitId"],  # no visitId in the user-level table
+    },
 }
 
-cleaned_data = clean_sessions_data(raw_data, cleaning_options=options)
-
-user_df = aggregate_user_data(
-    df=cleaned_data,
-    user_id_col="fullVisitorId",
-    group_col=None,  # or "experimentGroup"
-    handle_multi_group="first",
-    numeric_strategy="mean",  # sum all numeric columns
-    date_strategy="min",  # earliest date
-    categorical_strategy="majority",  # pick the most frequent category for each user
-    custom_strategies={"visitNumber": "max", "transactions": "sum"},
-    exclude_columns=["visitId"],  # maybe we don't want visitId in final user-level
-    datetime_formats=None,  # if needed, define date formats to parse
-)
-
-# 4. Save the cleaned data to disk in the 'data/' folder
-os.makedirs("data", exist_ok=True)  # Ensure the folder exists
-
-# Save as CSV
-csv_path = os.path.join("data", "user_agg_cleaned.csv")
-cleaned_data.to_csv(csv_path, index=False)
-print(f"Data saved to {csv_path}.")
+OUTPUT_BASE = os.path.join(ROOT, "data", "user_agg_cleaned")
+
+
+def main() -> None:
+    # Relative paths are resolved against the repository root
+    checkpoint_dir = os.path.join(ROOT, PIPELINE_CHECKPOINT_PATH)
+    pipeline = Pipeline(CONFIG, checkpoint_dir=checkpoint_dir)
+    user_df = pipeline.get("aggregate")
+    # The app shows and hashes the original IDs
+    user_id_col = CONFIG["aggregate"]["user_id_col"]
+    user_ids = pipeline.decode_visitor_ids(user_df[user_id_col], user_id_col)
+    user_df = user_df.assign(**{user_id_col: user_ids})
+
+    # Parquet keeps dtypes (Int64, string, datetime) and is much faster to read than
+    # CSV; the Feather copy is for fast reloads in the Streamlit app.
+    for ext in (".parquet", ".feather"):
+        path = save_frame(user_df, OUTPUT_BASE + ext)
+        print(f"Data saved to {path}.")
+
+
+if __name__ == "__main__":
+    main()
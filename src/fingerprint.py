@@ -0,0 +1,42 @@
+# src/fingerprint.py
+
+import hashlib
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint_array(arr) -> str:
+    """
+    Return a cheap content hash of a 1-D array or Series.
+
+    Numeric/datetime data is hashed straight from its buffer; object/string data
+    is first reduced to uint64 row hashes with pandas' hash_array.
+    """
+    if isinstance(arr, pd.Series):
+        arr = arr.to_numpy()
+    arr = np.asarray(arr)
+
+    if arr.dtype.kind in "biufcmM":
+        buf = np.ascontiguousarray(arr)
+    else:
+        buf = pd.util.hash_array(arr.astype(object, copy=False))
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{arr.dtype.str}:{arr.shape}".encode())
+    h.update(buf.reshape(-1).view(np.uint8))
+    return h.hexdigest()
+
+
+def fingerprint_frame(df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> str:
+    """
+    Return a content hash of the selected DataFrame columns (all columns by default).
+    Column names are part of the hash, the index is not.
+    """
+    cols = list(df.columns) if columns is None else list(columns)
+    h = hashlib.blake2b(digest_size=16)
+    for col in cols:
+        h.update(str(col).encode())
+        h.update(fingerprint_array(df[col]).encode())
+    return h.hexdigest()
@@ -6,6 +6,25 @@ import numpy as np
 import pandas as pd
 
 from src.ab_testing import ABTest
+from src.assignment_health import check_assignment_health, format_health_report
+from src.result_cache import ResultCache
+
+# Arm labels, in the order of the codes returned by cross_sell_group_codes
+CROSS_SELL_ARMS = ("control", "test")
+
+
+def cross_sell_group_codes(
+    user_df: pd.DataFrame, item_x_col: str = "bought_item_x"
+) -> np.ndarray:
+    """
+    int8 group code per user: 1 ('test') if the user bought item X, else 0
+    ('control'). Reads one column and does not copy user_df.
+    """
+    if item_x_col not in user_df.columns:
+        raise ValueError(
+            f"DataFrame missing '{item_x_col}' column for cross-selling logic"
+        )
+    return (user_df[item_x_col] == 1).to_numpy(dtype=np.int8, na_value=0)
 
 
 def assign_cross_sell_groups(
@@ -16,14 +35,12 @@ def assign_cross_sell_groups(
     """
     If user bought item X => 'test' (cross-sell shown), else 'control'.
     This is a simplistic approach, not random but purely condition-based.
+    Returns a copy of user_df with a 'cross_sell_group' column; run_cross_sell_test
+    uses cross_sell_group_codes directly instead.
     """
+    codes = cross_sell_group_codes(user_df, item_x_col)
     df = user_df.copy()
-    if item_x_col not in df.columns:
-        raise ValueError(
-            f"DataFrame missing '{item_x_col}' column for cross-selling logic"
-        )
-
-    df["cross_sell_group"] = np.where(df[item_x_col] == 1, "test", "control")
+    df["cross_sell_group"] = np.asarray(CROSS_SELL_ARMS)[codes]
     return df
 
 
@@ -35,18 +52,33 @@ def run_cross_sell_test(
     transform: str = "none",
     zero_inflation: bool = True,
     user_id_col: str = "fullVisitorId",
+    cache: Optional[ResultCache] = None,
+    check_assignment: bool = False,
 ) -> dict:
     """
     Test cross-selling hypothesis: users who bought item X => show cross-sell => 'test',
     compare 'metric_col' to 'control' group (not shown cross-sell).
+    Pass a ResultCache to reuse results of identical earlier runs.
+    check_assignment=True runs check_assignment_health on the split first, prints
+    any problems and adds the report to the result as 'assignment_health'.
     """
-    assigned_df = assign_cross_sell_groups(user_df, item_x_col, user_id_col)
+    codes = cross_sell_group_codes(user_df, item_x_col)
 
-    ab = ABTest(
-        df=assigned_df,
-        control_filter={"cross_sell_group": "control"},
-        test_filter={"cross_sell_group": "test"},
-    )
+    health = None
+    if check_assignment:
+        health = check_assignment_health(
+            user_df,
+            group_col="cross_sell_group",
+            user_id_col=user_id_col,
+            labels=pd.Categorical.from_codes(codes, categories=CROSS_SELL_ARMS),
+            # The split follows purchase behavior, not randomization: segments differ
+            # for real, so there is no sample ratio to test
+            segment_cols=None,
+        )
+        if not health["healthy"]:
+            print("Assignment health check failed:\n" + format_health_report(health))
+
+    ab = ABTest.from_labels(user_df, codes, control=0, test=1, cache=cache)
 
     result = ab.run_test(
         column=metric_col,
@@ -54,4 +86,7 @@ def run_cross_sell_test(
         transform=transform,
         zero_inflation=zero_inflation,
     )
+    if health is not None:
+        # A new dict, so a cached result is not modified
+        result = {**result, "assignment_health": health}
     return result
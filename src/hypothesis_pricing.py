@@ -1,11 +1,39 @@
 # src/hypothesis_pricing.py
 
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 import pandas as pd
+from scipy import stats
 
 from src.ab_testing import ABTest
+from src.assignment_health import check_assignment_health, format_health_report
+from src.instrumentation import stage
+from src.result_cache import ResultCache
+from src.transforms import transform_pooled
+from src.vectorized_stats import (
+    chi2_2x2_test,
+    mannwhitney_u_test,
+    student_t_test,
+    tie_correction_term,
+)
+
+# Arm labels, in the order of the codes returned by pricing_group_codes
+PRICING_ARMS = ("control", "test")
+
+
+def pricing_group_codes(user_df: pd.DataFrame, threshold: float = 200.0) -> np.ndarray:
+    """
+    int8 group code per user: 1 ('test') if totalTransactionRevenue >= threshold,
+    else 0 ('control'). Reads one column and does not copy user_df.
+    """
+    if "totalTransactionRevenue" not in user_df.columns:
+        raise ValueError(
+            "DataFrame missing 'totalTransactionRevenue' for pricing logic"
+        )
+    return (user_df["totalTransactionRevenue"] >= threshold).to_numpy(
+        dtype=np.int8, na_value=0
+    )
 
 
 def assign_pricing_groups(
@@ -14,16 +42,12 @@ def assign_pricing_groups(
     """
     Assigns users to 'test' if totalTransactionRevenue >= threshold, else 'control'.
     This is a contrived approach to demonstrate code, not a true random assignment.
+    Returns a copy of user_df with a 'price_group' column; run_pricing_test uses
+    pricing_group_codes directly instead.
     """
+    codes = pricing_group_codes(user_df, threshold=threshold)
     df = user_df.copy()
-    if "totalTransactionRevenue" not in df.columns:
-        raise ValueError(
-            "DataFrame missing 'totalTransactionRevenue' for pricing logic"
-        )
-
-    df["price_group"] = np.where(
-        df["totalTransactionRevenue"] >= threshold, "test", "control"
-    )
+    df["price_group"] = np.asarray(PRICING_ARMS)[codes]
     return df
 
 
@@ -35,21 +59,34 @@ def run_pricing_test(
     transform: str = "none",
     zero_inflation: bool = True,
     user_id_col: str = "fullVisitorId",
+    cache: Optional[ResultCache] = None,
+    check_assignment: bool = False,
 ) -> dict:
     """
     Test whether dynamic pricing (assigned to 'test' if totalRevenue >= threshold)
     leads to higher 'metric_col' than fixed pricing.
     By default, uses Mann-Whitney if data is skewed.
+    Pass a ResultCache to reuse results of identical earlier runs.
+    check_assignment=True runs check_assignment_health on the split first, prints
+    any problems and adds the report to the result as 'assignment_health'.
     """
-    assigned_df = assign_pricing_groups(
-        user_df, threshold=threshold, user_id_col=user_id_col
-    )
+    codes = pricing_group_codes(user_df, threshold=threshold)
 
-    ab = ABTest(
-        df=assigned_df,
-        control_filter={"price_group": "control"},
-        test_filter={"price_group": "test"},
-    )
+    health = None
+    if check_assignment:
+        health = check_assignment_health(
+            user_df,
+            group_col="price_group",
+            user_id_col=user_id_col,
+            labels=pd.Categorical.from_codes(codes, categories=PRICING_ARMS),
+            # The split follows a revenue threshold, not randomization: segments differ
+            # for real, so there is no sample ratio to test
+            segment_cols=None,
+        )
+        if not health["healthy"]:
+            print("Assignment health check failed:\n" + format_health_report(health))
+
+    ab = ABTest.from_labels(user_df, codes, control=0, test=1, cache=cache)
 
     result = ab.run_test(
         column=metric_col,
@@ -57,4 +94,179 @@ def run_pricing_test(
         transform=transform,
         zero_inflation=zero_inflation,
     )
+    if health is not None:
+        # A new dict, so a cached result is not modified
+        result = {**result, "assignment_health": health}
     return result
+
+
+def default_sweep_thresholds(revenue: pd.Series, n_thresholds: int = 200) -> np.ndarray:
+    """
+    Up to n_thresholds distinct thresholds at evenly spaced quantiles (1%-99%) of the
+    positive revenue values.
+    """
+    values = revenue.to_numpy(dtype=float, na_value=np.nan)
+    values = values[values > 0]
+    if values.size == 0:
+        return np.array([])
+    return np.unique(np.quantile(values, np.linspace(0.01, 0.99, n_thresholds)))
+
+
+def sweep_pricing_thresholds(
+    user_df: pd.DataFrame,
+    thresholds: Optional[Sequence[float]] = None,
+    n_thresholds: int = 200,
+    metric_col: str = "transactions",
+    test_type: str = "mannwhitney",
+    transform: str = "none",
+    zero_inflation: bool = True,
+    alpha: float = 0.05,
+    add_constant: float = 1.0,
+    winsor_percentile: float = 95.0,
+    trim_percentile: float = 95.0,
+    boxcox_sample_size: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Evaluate the dynamic pricing test at many revenue thresholds in one pass.
+
+    Users are sorted by totalTransactionRevenue once; at every threshold the test
+    group is a suffix of that order, so group counts, sums, sums of squares and rank
+    sums all come from prefix sums and every threshold is tested at once with
+    src/vectorized_stats.py. Each row matches run_pricing_test at that threshold
+    with pooled transform parameters (pooled_thresholds=True, boxcox_pooled=True):
+    pooled over control + test is the whole population at every threshold.
+
+    Parameters
+    ----------
+    user_df : pd.DataFrame
+        User-level data with 'totalTransactionRevenue' and metric_col.
+    thresholds : sequence of float, optional
+        Thresholds to evaluate. By default n_thresholds revenue quantiles
+        (see default_sweep_thresholds).
+    metric_col, test_type, transform, zero_inflation, alpha, add_constant,
+    winsor_percentile, trim_percentile, boxcox_sample_size
+        As in run_pricing_test / ABTest.run_test.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per threshold: control_n, test_n (main-test sample sizes),
+        control_mean, test_mean, mean_diff, relative_lift, and
+          - t_test / mannwhitney: test_statistic, p_value, significant
+            (mannwhitney also prob_superiority = P(test > control), ties halved);
+          - bayesian_conversions: control/test_posterior_mean;
+          - bayesian_means: control/test_std;
+          - zero_inflation: control/test_zero_rate, zero_test_statistic,
+            zero_test_p_value.
+        Statistics are NaN where a group has fewer than 2 values, as ABTest reports
+        an error there. Mann-Whitney p-values use the normal approximation, which
+        stats.mannwhitneyu replaces by the exact test when both groups have at most
+        8 values and no ties.
+    """
+    revenue = user_df["totalTransactionRevenue"]
+    if thresholds is None:
+        thresholds = default_sweep_thresholds(revenue, n_thresholds)
+    thresholds = np.sort(np.asarray(thresholds, dtype=float))
+
+    with stage(
+        "sweep_pricing_thresholds", rows_in=len(user_df), thresholds=len(thresholds)
+    ):
+        # Missing revenue is never >= threshold, i.e. always control: sort it first
+        score = revenue.to_numpy(dtype=float, na_value=np.nan)
+        score = np.where(np.isnan(score), -np.inf, score)
+        order = np.argsort(score, kind="stable")
+        score = score[order]
+        values = user_df[metric_col].to_numpy(dtype=float, na_value=np.nan)[order]
+
+        # Control = rows[:k], test = rows[k:], for every threshold at once
+        split = np.searchsorted(score, thresholds, side="left")
+        n_rows = len(values)
+
+        def control_and_test(x: np.ndarray):
+            cum = np.concatenate([[0.0], np.cumsum(x, dtype=float)])
+            return cum[split], cum[-1] - cum[split]
+
+        out = pd.DataFrame({"threshold": thresholds})
+
+        if zero_inflation:
+            # Zero rates over all rows of each group, as ABTest._compare_zero_proportions
+            zeros_c, zeros_t = control_and_test(values == 0)
+            rows_c = split.astype(float)
+            rows_t = n_rows - rows_c
+            chi2, p_val = chi2_2x2_test(
+                zeros_c, rows_c - zeros_c, zeros_t, rows_t - zeros_t
+            )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out["control_zero_rate"] = zeros_c / rows_c
+                out["test_zero_rate"] = zeros_t / rows_t
+            out["zero_test_statistic"] = chi2
+            out["zero_test_p_value"] = p_val
+            valid = values > 0
+        else:
+            valid = ~np.isnan(values)
+
+        # Transform the main-test values with parameters pooled over all users
+        valid, y = transform_pooled(
+            values,
+            valid,
+            transform,
+            add_constant,
+            winsor_percentile,
+            trim_percentile,
+            boxcox_sample_size=boxcox_sample_size,
+            cache_key=metric_col,
+        )
+
+        n_c, n_t = control_and_test(valid)
+        sum_c, sum_t = control_and_test(y)
+        sumsq_c, sumsq_t = control_and_test(y**2)
+        enough = (n_c >= 2) & (n_t >= 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_c = np.where(enough, sum_c / n_c, np.nan)
+            mean_t = np.where(enough, sum_t / n_t, np.nan)
+        out["control_n"] = n_c.astype(int)
+        out["test_n"] = n_t.astype(int)
+        out["control_mean"] = mean_c
+        out["test_mean"] = mean_t
+        out["mean_diff"] = mean_t - mean_c
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["relative_lift"] = (mean_t - mean_c) / mean_c
+
+        if test_type == "t_test":
+            t_stat, p_val = student_t_test(n_c, sum_c, sumsq_c, n_t, sum_t, sumsq_t)
+            out["test_statistic"] = np.where(enough, t_stat, np.nan)
+            out["p_value"] = np.where(enough, p_val, np.nan)
+        elif test_type == "mannwhitney":
+            # The pooled sample is the same at every threshold: rank it once
+            ranks = np.zeros(n_rows)
+            x = y[valid]
+            ranks[valid] = stats.rankdata(x)
+            rank_sum_c, _ = control_and_test(ranks)
+            tie_term = tie_correction_term(np.sort(x))[0]
+            u_c, p_val = mannwhitney_u_test(rank_sum_c, n_c, n_t, tie_term)
+            out["test_statistic"] = np.where(enough, u_c, np.nan)
+            out["p_value"] = np.where(enough, p_val, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out["prob_superiority"] = np.where(
+                    enough, 1 - u_c / (n_c * n_t), np.nan
+                )
+        elif test_type == "bayesian_conversions":
+            # Beta(1, 1) prior, as ABTest
+            out["control_posterior_mean"] = np.where(
+                enough, (1 + sum_c) / (2 + n_c), np.nan
+            )
+            out["test_posterior_mean"] = np.where(
+                enough, (1 + sum_t) / (2 + n_t), np.nan
+            )
+        elif test_type == "bayesian_means":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                var_c = (sumsq_c - n_c * mean_c**2) / (n_c - 1)
+                var_t = (sumsq_t - n_t * mean_t**2) / (n_t - 1)
+            out["control_std"] = np.sqrt(np.maximum(var_c, 0.0))
+            out["test_std"] = np.sqrt(np.maximum(var_t, 0.0))
+        else:
+            raise ValueError(f"Unsupported test_type: {test_type}")
+
+        if "p_value" in out:
+            out["significant"] = out["p_value"] < alpha
+        return out
@@ -1,36 +1,68 @@
 # src/hypothesis_recommendation.py
 
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 import pandas as pd
 
 from src.ab_testing import ABTest
+from src.assignment import assign_arm_codes
+from src.assignment_health import check_assignment_health, format_health_report
+from src.result_cache import ResultCache
 
 
-def assign_recommendation_groups(
-    user_df: pd.DataFrame, user_id_col: str = "fullVisitorId", seed: int = 42
-) -> pd.DataFrame:
+def recommendation_group_codes(
+    user_ids: pd.Series,
+    seed: int = 42,
+    method: str = "random",
+    salt: str = "recommendation",
+    weights: Sequence[float] = (1.0, 1.0),
+) -> np.ndarray:
     """
-    Randomly assigns half the users to 'control' (generic recs) and half to 'test' (personalized recs).
-    Appends a new column 'rec_group' with values 'control' or 'test'.
+    int8 arm index per row (position in weights; 0 = control), without copying the
+    user table. See assign_recommendation_groups for the methods.
     """
-    df = user_df.copy()
-    unique_users = df[user_id_col].unique()
+    if method == "hash":
+        return assign_arm_codes(user_ids, weights, salt=salt)
+    if method != "random":
+        raise ValueError(f"Unsupported assignment method: {method}")
+
+    # One draw per unique user (order of first appearance), broadcast to all rows
+    codes, unique_users = pd.factorize(user_ids, use_na_sentinel=False)
     rng = np.random.default_rng(seed)
+    cum_weights = np.cumsum(weights) / np.sum(weights)
+    user_arm = np.searchsorted(cum_weights, rng.random(len(unique_users)), side="right")
+    user_arm = np.minimum(user_arm, len(weights) - 1).astype(np.int8)
+    return user_arm[codes]
 
-    mask = rng.random(len(unique_users)) < 0.5
-    control_users = unique_users[mask]
-    test_users = unique_users[~mask]
 
-    # Create a map user -> group
-    group_map = {}
-    for uid in control_users:
-        group_map[uid] = "control"
-    for uid in test_users:
-        group_map[uid] = "test"
+def assign_recommendation_groups(
+    user_df: pd.DataFrame,
+    user_id_col: str = "fullVisitorId",
+    seed: int = 42,
+    method: str = "random",
+    salt: str = "recommendation",
+    arms: Sequence[str] = ("control", "test"),
+    weights: Optional[Sequence[float]] = None,
+) -> pd.DataFrame:
+    """
+    Assigns users to 'control' (generic recs) and 'test' (personalized recs), half each
+    by default. Returns a copy of user_df with a new column 'rec_group' holding the arm
+    label (run_recommendation_test uses recommendation_group_codes directly instead).
 
-    df["rec_group"] = df[user_id_col].map(group_map)
+    method="random" draws one uniform number per unique user from default_rng(seed), in
+    order of first appearance, so a user's group depends on the rest of the user set.
+    method="hash" buckets a salted hash of each user ID (see src/assignment.py), so the
+    assignment is stable across runs and data refreshes. arms/weights allow other
+    splits and more than two arms with either method.
+    """
+    if weights is None:
+        weights = [1.0] * len(arms)
+    codes = recommendation_group_codes(
+        user_df[user_id_col], seed=seed, method=method, salt=salt, weights=weights
+    )
+    df = user_df.copy()
+    df["rec_group"] = pd.Categorical.from_codes(codes, categories=list(arms))
     return df
 
 
@@ -41,19 +73,35 @@ def run_recommendation_test(
     test_type: str = "t_test",
     transform: str = "none",
     zero_inflation: bool = False,
+    cache: Optional[ResultCache] = None,
+    method: str = "random",
+    salt: str = "recommendation",
+    check_assignment: bool = False,
 ) -> dict:
     """
     Conduct an A/B test on the 'metric_col' to see if personalized recs (test)
     outperform generic recs (control) after random assignment.
+    Pass a ResultCache to reuse results of identical earlier runs.
+    method/salt select the assignment, see assign_recommendation_groups.
+    check_assignment=True runs check_assignment_health on the split first, prints
+    any problems and adds the report to the result as 'assignment_health'.
     """
-    assigned_df = assign_recommendation_groups(user_df, user_id_col=user_id_col)
+    codes = recommendation_group_codes(user_df[user_id_col], method=method, salt=salt)
+
+    health = None
+    if check_assignment:
+        health = check_assignment_health(
+            user_df,
+            group_col="rec_group",
+            user_id_col=user_id_col,
+            expected_weights=[1.0, 1.0],
+            labels=pd.Categorical.from_codes(codes, categories=["control", "test"]),
+        )
+        if not health["healthy"]:
+            print("Assignment health check failed:\n" + format_health_report(health))
 
     # Build ABTest
-    ab = ABTest(
-        df=assigned_df,
-        control_filter={"rec_group": "control"},
-        test_filter={"rec_group": "test"},
-    )
+    ab = ABTest.from_labels(user_df, codes, control=0, test=1, cache=cache)
 
     result = ab.run_test(
         column=metric_col,
@@ -61,4 +109,7 @@ def run_recommendation_test(
         transform=transform,
         zero_inflation=zero_inflation,
     )
+    if health is not None:
+        # A new dict, so a cached result is not modified
+        result = {**result, "assignment_health": health}
     return result
@@ -0,0 +1,223 @@
+# src/instrumentation.py
+
+"""
+Lightweight stage-level instrumentation for the pipeline.
+
+Each instrumented stage records its duration, rows in/out, bytes of the resulting
+DataFrame and the process's resident memory (current and peak). Records are kept in
+memory, logged as one JSON object per stage (logger "src.instrumentation") and, if a
+trace path is set, appended to a JSON-lines file.
+
+Instrumentation is off by default; disabled stages cost a single flag check. Enable it
+with the environment variable AB_INSTRUMENT=1 (optionally AB_TRACE_PATH=trace.jsonl)
+or from code:
+
+Usage Example:
+-------------
+from src import instrumentation
+
+instrumentation.enable(trace_path="data/trace.jsonl")
+raw = client.get_sessions_data(limit=100000)   # "run_query" stage
+cleaned = clean_sessions_data(raw)             # "clean_sessions_data" stage
+
+with instrumentation.stage("my_step", rows_in=len(cleaned)) as record:
+    out = do_something(cleaned)
+    record["rows_out"] = len(out)
+
+print(instrumentation.summary())
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from src.config import INSTRUMENTATION_ENABLED, INSTRUMENTATION_TRACE_PATH
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_ENABLED = INSTRUMENTATION_ENABLED
+_TRACE_PATH: Optional[str] = INSTRUMENTATION_TRACE_PATH
+_TRACE: List[Dict[str, Any]] = []
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+def enable(trace_path: Optional[str] = None) -> None:
+    """Turn instrumentation on, optionally appending records to a JSON-lines file."""
+    global _ENABLED, _TRACE_PATH
+    _ENABLED = True
+    if trace_path is not None:
+        _TRACE_PATH = trace_path
+
+
+def disable() -> None:
+    global _ENABLED
+    _ENABLED = False
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def get_trace() -> List[Dict[str, Any]]:
+    """Records of all stages finished since the last reset_trace(), in end order."""
+    with _LOCK:
+        return list(_TRACE)
+
+
+def reset_trace() -> None:
+    with _LOCK:
+        _TRACE.clear()
+
+
+def summary() -> pd.DataFrame:
+    """The recorded stages as a DataFrame (one row per stage call)."""
+    return pd.DataFrame(get_trace())
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size in MB (Linux /proc; None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the process so far, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _frame_bytes(obj: Any) -> Optional[int]:
+    """Shallow memory footprint of a DataFrame/Series (deep=False keeps it cheap)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    return None
+
+
+def _emit(record: Dict[str, Any]) -> None:
+    with _LOCK:
+        _TRACE.append(record)
+        if _TRACE_PATH:
+            directory = os.path.dirname(_TRACE_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(_TRACE_PATH, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+    logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def stage(name: str, rows_in: Optional[int] = None, **attrs) -> Iterator[dict]:
+    """
+    Record one pipeline stage. Yields the (mutable) record, so the body can add
+    rows_out, bytes_out or any other field. Nested stages record their parent.
+    Does nothing but yield a throwaway dict when instrumentation is disabled.
+    """
+    if not _ENABLED:
+        yield {}
+        return
+
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    record: Dict[str, Any] = {
+        "stage": name,
+        "start": time.time(),
+        "parent": stack[-1] if stack else None,
+        "rows_in": rows_in,
+        "rows_out": None,
+        "bytes_out": None,
+        **attrs,
+    }
+    rss_before = _rss_mb()
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration_s"] = time.perf_counter() - start
+        stack.pop()
+        rss_after = _rss_mb()
+        record["rss_mb"] = rss_after
+        record["rss_delta_mb"] = (
+            rss_after - rss_before
+            if rss_after is not None and rss_before is not None
+            else None
+        )
+        record["peak_rss_mb"] = _peak_rss_mb()
+        _emit(record)
+
+
+def _first_frame(args, kwargs) -> Any:
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value
+    return None
+
+
+def instrumented(
+    name: Optional[str] = None,
+    rows_in: Optional[Callable[..., Optional[int]]] = None,
+) -> Callable:
+    """
+    Decorator recording each call of the function as a stage.
+
+    Parameters
+    ----------
+    name : str, optional
+        Stage name (the function name by default).
+    rows_in : callable, optional
+        Called with the function's arguments to count input rows. By default the
+        length of the first DataFrame/Series argument is used.
+
+    rows_out and bytes_out are taken from the return value when it is a DataFrame or
+    Series.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+
+            if rows_in is not None:
+                n_in = rows_in(*args, **kwargs)
+            else:
+                frame = _first_frame(args, kwargs)
+                n_in = len(frame) if frame is not None else None
+
+            with stage(stage_name, rows_in=n_in) as record:
+                result = func(*args, **kwargs)
+                if isinstance(result, (pd.DataFrame, pd.Series)):
+                    record["rows_out"] = len(result)
+                    record["bytes_out"] = _frame_bytes(result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,142 @@
+# src/local_sessions.py
+
+"""
+Local stand-in for BigQueryClient.
+
+Runs the same ga_sessions_* queries with DuckDB against a local mirror of the daily
+tables, stored as one Parquet file per day with the BigQuery export layout (nested
+`totals`, `trafficSource`, `geoNetwork` structs):
+
+    <root>/ga_sessions_20170101.parquet
+    <root>/ga_sessions_20170102.parquet
+    ...
+
+`_TABLE_SUFFIX` is derived from the file names, and files outside the requested date
+range are not read at all. BigQuery-specific syntax used by the query builders
+(@name parameters, IN UNNEST(@list)) is rewritten for DuckDB.
+
+Usage Example:
+-------------
+client = LocalSessionsClient("data/ga_sessions")
+raw_data = client.get_sessions_data(start_date="20170101", end_date="20170131")
+"""
+
+import glob
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import duckdb
+import pandas as pd
+
+from src.config import LOCAL_SESSIONS_PATH
+from src.data_extraction import BigQueryClient
+from src.instrumentation import instrumented
+
+_FILE_PATTERN = "ga_sessions_*.parquet"
+_SUFFIX_REGEX = r"ga_sessions_(\d{8})\.parquet$"
+
+
+def _to_duckdb_sql(query: str) -> str:
+    """Rewrite BigQuery parameter syntax for DuckDB."""
+    query = re.sub(r"IN\s+UNNEST\(\s*@(\w+)\s*\)", r"IN (SELECT UNNEST($\1))", query)
+    return re.sub(r"@(\w+)", r"$\1", query)
+
+
+def _apply_dtypes(df: pd.DataFrame, dtypes: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """Cast result columns like pandas-gbq does; GA dates are 'YYYYMMDD' strings."""
+    for col, dtype in (dtypes or {}).items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith("datetime") and not pd.api.types.is_datetime64_any_dtype(
+            df[col]
+        ):
+            df[col] = pd.to_datetime(df[col].astype("string"), format="%Y%m%d")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+class LocalSessionsClient(BigQueryClient):
+    """
+    BigQueryClient interface backed by DuckDB over local ga_sessions_*.parquet files.
+    """
+
+    sql_dialect = "duckdb"
+
+    def __init__(self, root: str = LOCAL_SESSIONS_PATH, threads: Optional[int] = None):
+        """
+        Parameters
+        ----------
+        root : str
+            Directory containing ga_sessions_YYYYMMDD.parquet files.
+        threads : int, optional
+            Number of DuckDB worker threads (all cores by default).
+        """
+        super().__init__(project_id=None)
+        self.root = root
+        self.threads = threads
+        self._con = None
+
+    @property
+    def connection(self) -> "duckdb.DuckDBPyConnection":
+        if self._con is None:
+            self._con = duckdb.connect()
+            if self.threads:
+                self._con.execute(f"SET threads TO {int(self.threads)}")
+        return self._con
+
+    def daily_files(self, start_date: str = None, end_date: str = None) -> List[str]:
+        """
+        Sorted daily Parquet files whose 'YYYYMMDD' suffix is within the given
+        (inclusive) bounds.
+        """
+        files = []
+        for path in sorted(glob.glob(os.path.join(self.root, _FILE_PATTERN))):
+            match = re.search(_SUFFIX_REGEX, path)
+            if not match:
+                continue
+            suffix = match.group(1)
+            if start_date and suffix < str(start_date):
+                continue
+            if end_date and suffix > str(end_date):
+                continue
+            files.append(path)
+        return files
+
+    @property
+    def sessions_table(self) -> str:
+        return self._sessions_source()
+
+    def _sessions_source(self, start_date: str = None, end_date: str = None) -> str:
+        all_files = self.daily_files()
+        if not all_files:
+            raise FileNotFoundError(f"No {_FILE_PATTERN} files found in '{self.root}'.")
+        # Keep the full file set when nothing is in range, so the query still has a
+        # schema and simply returns no rows
+        files = self.daily_files(start_date, end_date) or all_files
+        file_list = ", ".join("'" + f.replace("'", "''") + "'" for f in files)
+        return (
+            f"(SELECT *, regexp_extract(filename, '{_SUFFIX_REGEX}', 1) AS _TABLE_SUFFIX"
+            f" FROM read_parquet([{file_list}], filename = true, union_by_name = true))"
+            " AS ga_sessions"
+        )
+
+    @instrumented("run_query")
+    def run_query(
+        self,
+        query: str,
+        dtypes: dict = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        """
+        Execute a (BigQuery-style) query with DuckDB and return a Pandas DataFrame.
+        Named parameters referenced as @name are passed via `params`.
+        """
+        try:
+            df = self.connection.execute(_to_duckdb_sql(query), params or None).df()
+            print("Query executed successfully using DuckDB.")
+        except Exception as e:
+            print("Error running query using DuckDB:", e)
+            raise
+        return _apply_dtypes(df, dtypes)
@@ -0,0 +1,437 @@
+# src/pipeline.py
+
+"""
+Declarative, lazily evaluated analysis pipeline with on-disk checkpoints.
+
+Stages (each with its own block of the config):
+
+    extract -> encode -> clean -> aggregate -> assign -> test -> report
+                               \\-> profile
+
+Nothing runs until an output is requested. pipeline.get(name) loads the stage from
+its checkpoint if one exists, and otherwise computes it from its inputs, which are
+resolved the same way. A stage's checkpoint key hashes its own config block together
+with the keys of its inputs, so changing e.g. the test parameters gives new keys for
+"test" and "report" only: extraction, cleaning and aggregation are loaded from their
+checkpoints instead of re-run. Checkpoints are written to a temporary file and
+renamed into place, so a file that exists is complete.
+
+The encode stage replaces visitor IDs by dense integer codes right after extraction
+(src/visitor_ids.py), so cleaning and aggregation group integers. Hash-based assignment
+still hashes the original IDs (Pipeline.decode_visitor_ids), so groups do not change.
+The mapping is kept under encode.mapping_path. Checkpoints made after encoding are
+only valid together with it, so delete them as well if the mapping is deleted.
+
+DataFrames are checkpointed as Parquet, other outputs (profiles, test results,
+reports) with pickle.
+
+Usage Example:
+-------------
+from src.pipeline import Pipeline
+
+pipeline = Pipeline({"extract": {"limit": 100000}, "test": {"test_type": "mannwhitney"}})
+print(pipeline.get("report"))          # runs (or loads) every stage it needs
+
+# Only "test" and "report" are recomputed
+pipeline = pipeline.with_config(test={"transform": "log"})
+print(pipeline.get("report"))
+pipeline.status()                       # key and checkpoint state of every stage
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from src.ab_test_reporting import interpret_ab_results
+from src.ab_testing import ABTest
+from src.config import (
+    LOCAL_SESSIONS_PATH,
+    PIPELINE_CHECKPOINT_PATH,
+    SESSIONS_BACKEND,
+    VISITOR_ID_MAPPING_PATH,
+)
+from src.data_cleaning import clean_sessions_data, profile_data
+from src.hypothesis_cross_selling import CROSS_SELL_ARMS, cross_sell_group_codes
+from src.hypothesis_pricing import PRICING_ARMS, pricing_group_codes
+from src.hypothesis_recommendation import recommendation_group_codes
+from src.instrumentation import stage as instrumentation_stage
+from src.user_aggregation import aggregate_user_data
+from src.visitor_ids import VisitorIdEncoder
+
+DEFAULT_CONFIG: Dict[str, Dict[str, Any]] = {
+    "extract": {
+        "backend": SESSIONS_BACKEND,
+        "local_path": LOCAL_SESSIONS_PATH,
+        "start_date": None,
+        "end_date": None,
+        "limit": 1000000,
+        "columns": None,
+    },
+    "encode": {
+        "enabled": True,
+        "user_id_col": "fullVisitorId",
+        "mapping_path": VISITOR_ID_MAPPING_PATH,
+    },
+    "clean": {
+        # "pandas" or "polars" (src/polars_backend.py), also for "aggregate"
+        "backend": "pandas",
+        "cleaning_options": {
+            "convert_date": False,
+            "revenue_adjustment": True,
+            "fill_missing_transactions": True,
+            "fill_missing_pageviews": True,
+            "fill_missing_timeOnSite": True,
+            "timeOnSite_zero_floor": True,
+        },
+    },
+    "profile": {},
+    "aggregate": {
+        "user_id_col": "fullVisitorId",
+        "group_col": None,
+        "handle_multi_group": "first",
+        "numeric_strategy": "mean",
+        "date_strategy": "min",
+        "categorical_strategy": "majority",
+        "custom_strategies": {"visitNumber": "max", "transactions": "sum"},
+        "exclude_columns": ["visitId"],
+        "backend": "pandas",
+    },
+    "assign": {
+        # "recommendation", "pricing" or "cross_sell"
+        "hypothesis": "recommendation",
+        "user_id_col": "fullVisitorId",
+        "method": "hash",
+        "salt": "recommendation",
+        "seed": 42,
+        "threshold": 200.0,
+        "item_x_col": "bought_item_x",
+    },
+    "test": {
+        "metric_col": "totalTransactionRevenue",
+        "test_type": "t_test",
+        "transform": "none",
+        "zero_inflation": False,
+        "alpha": 0.05,
+    },
+    "report": {},
+}
+
+
+class Stage(NamedTuple):
+    """A pipeline stage: func(pipeline, inputs, params) computes its output."""
+
+    name: str
+    inputs: List[str]
+    func: Callable[["Pipeline", Dict[str, Any], Dict[str, Any]], Any]
+
+
+# ------------------------------------------------------------------
+# Stage implementations
+# ------------------------------------------------------------------
+
+
+def _extract(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    if params["backend"] == "local":
+        from src.local_sessions import LocalSessionsClient
+
+        client = LocalSessionsClient(params["local_path"])
+    else:
+        from src.data_extraction import BigQueryClient
+
+        client = BigQueryClient()
+    return client.get_sessions_data(
+        start_date=params["start_date"],
+        end_date=params["end_date"],
+        limit=params["limit"],
+        columns=params["columns"],
+    )
+
+
+def _encode(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    """The sessions with user_id_col replaced by integer codes (see src/visitor_ids.py)."""
+    df = inputs["extract"]
+    if not params["enabled"]:
+        return df
+    encoder = VisitorIdEncoder.load(params["mapping_path"])
+    # A shallow copy: only the ID column is replaced, the extract output stays intact
+    df = df.copy(deep=False)
+    df[params["user_id_col"]] = encoder.encode(df[params["user_id_col"]])
+    encoder.save()
+    return df
+
+
+def _clean(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    df = inputs["encode"]
+    if params["backend"] == "pandas":
+        # The pandas backend works in place; keep the (possibly cached) raw data intact
+        df = df.copy()
+    return clean_sessions_data(
+        df, cleaning_options=params["cleaning_options"], backend=params["backend"]
+    )
+
+
+def _profile(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    return profile_data(inputs["clean"])
+
+
+def _aggregate(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    return aggregate_user_data(df=inputs["clean"], **params)
+
+
+def _assign(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    """The group of every user, as a one-column DataFrame of categorical labels."""
+    user_df = inputs["aggregate"]
+    hypothesis = params["hypothesis"]
+    if hypothesis == "recommendation":
+        user_ids = user_df[params["user_id_col"]]
+        if params["method"] == "hash":
+            # Hash the original IDs, so assignments do not depend on the encoding
+            user_ids = pipeline.decode_visitor_ids(user_ids, params["user_id_col"])
+        codes = recommendation_group_codes(
+            user_ids,
+            seed=params["seed"],
+            method=params["method"],
+            salt=params["salt"],
+        )
+        arms = ("control", "test")
+    elif hypothesis == "pricing":
+        codes, arms = pricing_group_codes(user_df, params["threshold"]), PRICING_ARMS
+    elif hypothesis == "cross_sell":
+        codes = cross_sell_group_codes(user_df, params["item_x_col"])
+        arms = CROSS_SELL_ARMS
+    else:
+        raise ValueError(f"Unsupported hypothesis: {hypothesis}")
+    return pd.DataFrame({"group": pd.Categorical.from_codes(codes, categories=arms)})
+
+
+def _test(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    params = dict(params)
+    codes = inputs["assign"]["group"].cat.codes.to_numpy()
+    ab = ABTest.from_labels(inputs["aggregate"], codes, control=0, test=1)
+    return ab.run_test(column=params.pop("metric_col"), **params)
+
+
+def _report(pipeline: "Pipeline", inputs: Dict[str, Any], params: Dict[str, Any]):
+    return interpret_ab_results(inputs["test"])
+
+
+STAGES: Dict[str, Stage] = {
+    s.name: s
+    for s in [
+        Stage("extract", [], _extract),
+        Stage("encode", ["extract"], _encode),
+        Stage("clean", ["encode"], _clean),
+        Stage("profile", ["clean"], _profile),
+        Stage("aggregate", ["clean"], _aggregate),
+        Stage("assign", ["aggregate"], _assign),
+        Stage("test", ["aggregate", "assign"], _test),
+        Stage("report", ["test"], _report),
+    ]
+}
+
+
+def _merge_config(
+    base: Dict[str, Dict[str, Any]], overrides: Optional[Dict[str, Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """Per-stage shallow merge of overrides into a copy of base."""
+    config = copy.deepcopy(base)
+    for name, params in (overrides or {}).items():
+        if name not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {name}")
+        config[name] = {**config.get(name, {}), **params}
+    return config
+
+
+# ------------------------------------------------------------------
+# Pipeline
+# ------------------------------------------------------------------
+
+
+class Pipeline:
+    """
+    Lazily evaluated extract -> encode -> clean -> aggregate -> assign -> test -> report
+    pipeline (plus profile) with per-stage checkpoints keyed by config hash.
+
+    Attributes
+    ----------
+    config : dict
+        {stage name: params}, DEFAULT_CONFIG merged with the overrides.
+    checkpoint_dir : str or None
+        Where checkpoints are kept; None disables them.
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Dict[str, Any]]] = None,
+        checkpoint_dir: Optional[str] = PIPELINE_CHECKPOINT_PATH,
+        keep_in_memory: bool = True,
+    ):
+        """
+        Parameters
+        ----------
+        config : dict, optional
+            Per-stage overrides of DEFAULT_CONFIG, e.g. {"test": {"transform": "log"}}.
+        checkpoint_dir : str, optional
+            Directory for the checkpoints (AB_PIPELINE_PATH, "data/pipeline" by
+            default). None keeps results in memory only.
+        keep_in_memory : bool, default True
+            Also keep computed/loaded outputs in memory for later get() calls.
+        """
+        self.config = _merge_config(DEFAULT_CONFIG, config)
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_in_memory = keep_in_memory
+        # Outputs by checkpoint key, shared with pipelines made by with_config
+        self._memory: Dict[str, Any] = {}
+
+    def with_config(self, **overrides: Dict[str, Any]) -> "Pipeline":
+        """
+        A pipeline with some stage parameters changed, sharing this one's checkpoints
+        and in-memory outputs: pipeline.with_config(test={"transform": "log"}).
+        """
+        other = Pipeline.__new__(Pipeline)
+        other.config = _merge_config(self.config, overrides)
+        other.checkpoint_dir = self.checkpoint_dir
+        other.keep_in_memory = self.keep_in_memory
+        other._memory = self._memory
+        return other
+
+    # Keys and checkpoint files
+
+    def key(self, name: str) -> str:
+        """Hash of the stage's config and (recursively) of its inputs' keys."""
+        spec = {
+            "stage": name,
+            "params": self.config[name],
+            "inputs": {dep: self.key(dep) for dep in STAGES[name].inputs},
+        }
+        payload = json.dumps(spec, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _checkpoint_base(self, name: str) -> Optional[str]:
+        if self.checkpoint_dir is None:
+            return None
+        return os.path.join(self.checkpoint_dir, f"{name}-{self.key(name)}")
+
+    def checkpoint_path(self, name: str) -> Optional[str]:
+        """Existing checkpoint file of the stage for the current config, or None."""
+        base = self._checkpoint_base(name)
+        if base is None:
+            return None
+        for ext in (".parquet", ".pkl"):
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    def _load_checkpoint(self, path: str) -> Any:
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def _save_checkpoint(self, name: str, output: Any) -> None:
+        base = self._checkpoint_base(name)
+        if base is None:
+            return
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        is_frame = isinstance(output, pd.DataFrame)
+        path = base + (".parquet" if is_frame else ".pkl")
+        tmp_path = path + ".tmp"
+        if is_frame:
+            output.to_parquet(tmp_path, index=False)
+        else:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(output, f)
+        # Atomic rename: an existing checkpoint is always complete
+        os.replace(tmp_path, path)
+
+    # Evaluation
+
+    def get(self, name: str) -> Any:
+        """
+        Output of a stage: from memory, else from its checkpoint, else computed from
+        its inputs (which are resolved the same way) and checkpointed.
+        """
+        if name not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {name}")
+        key = self.key(name)
+        if key in self._memory:
+            return self._memory[key]
+
+        with instrumentation_stage(f"pipeline.{name}", key=key) as record:
+            path = self.checkpoint_path(name)
+            if path is not None:
+                record["checkpoint"] = "hit"
+                print(f"[pipeline] {name}: loading checkpoint {key}")
+                output = self._load_checkpoint(path)
+            else:
+                record["checkpoint"] = "miss"
+                spec = STAGES[name]
+                inputs = {dep: self.get(dep) for dep in spec.inputs}
+                print(f"[pipeline] {name}: running")
+                output = spec.func(self, inputs, dict(self.config[name]))
+                self._save_checkpoint(name, output)
+            if isinstance(output, pd.DataFrame):
+                record["rows_out"] = len(output)
+
+        if self.keep_in_memory:
+            self._memory[key] = output
+        return output
+
+    def run(self, until: str = "report") -> Dict[str, Any]:
+        """Evaluate `until` and everything it depends on; return {stage: output}."""
+        needed: List[str] = []
+
+        def visit(name: str) -> None:
+            for dep in STAGES[name].inputs:
+                visit(dep)
+            if name not in needed:
+                needed.append(name)
+
+        visit(until)
+        return {name: self.get(name) for name in needed}
+
+    def decode_visitor_ids(self, ids: pd.Series, column: str) -> pd.Series:
+        """
+        The original visitor IDs of column `column` of a stage output, e.g.
+        pipeline.decode_visitor_ids(user_df["fullVisitorId"], "fullVisitorId").
+        ids are returned unchanged if the encode stage is disabled or encodes
+        another column.
+        """
+        params = self.config["encode"]
+        if not params["enabled"] or column != params["user_id_col"]:
+            return ids
+        return VisitorIdEncoder.load(params["mapping_path"]).decode(ids)
+
+    def invalidate(self, name: str) -> None:
+        """
+        Drop the current checkpoint (and in-memory output) of a stage and of every
+        stage downstream of it, e.g. to re-extract data that changed at the source.
+        """
+        downstream = {name}
+        for stage_name, spec in STAGES.items():  # STAGES is in topological order
+            if downstream.intersection(spec.inputs):
+                downstream.add(stage_name)
+        for stage_name in downstream:
+            self._memory.pop(self.key(stage_name), None)
+            path = self.checkpoint_path(stage_name)
+            if path is not None:
+                os.remove(path)
+
+    def status(self) -> pd.DataFrame:
+        """Key, checkpoint and in-memory state of every stage for the current config."""
+        return pd.DataFrame(
+            [
+                {
+                    "stage": name,
+                    "key": self.key(name),
+                    "checkpoint": self.checkpoint_path(name) is not None,
+                    "in_memory": self.key(name) in self._memory,
+                }
+                for name in STAGES
+            ]
+        )
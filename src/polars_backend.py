@@ -0,0 +1,614 @@
+# src/polars_backend.py
+
+"""
+Polars (lazy API) implementations of clean_sessions_data and aggregate_user_data.
+
+The pandas implementations run the categorical strategies ("majority", "unique",
+"first") as Python callables once per user, which dominates the runtime on large
+session tables. Here every cleaning step and every strategy is a native Polars
+expression, so the whole query is optimized as one plan and executed on all cores,
+and with engine="streaming" it is processed in batches instead of all at once.
+
+Results match the pandas backend (same rows, order, columns and pandas dtypes); it is
+selected with backend="polars":
+
+    clean_sessions_data(df, cleaning_options, backend="polars")
+    aggregate_user_data(df, "fullVisitorId", backend="polars")
+
+clean_sessions_lazy / aggregate_user_lazy build the same queries on a LazyFrame, e.g.
+to stream session files that are larger than memory. Callable strategies are the one
+exception: they cannot be expressed in Polars, so aggregate_user_data_polars applies
+them with pandas on the filtered rows, and aggregate_user_lazy rejects them.
+
+Usage Example:
+-------------
+import polars as pl
+from src.polars_backend import aggregate_user_lazy, clean_sessions_lazy
+
+sessions = pl.scan_parquet("data/sessions/*.parquet")
+user_df = (
+    aggregate_user_lazy(clean_sessions_lazy(sessions), "fullVisitorId")
+    .collect(engine="streaming")
+    .to_pandas()
+)
+"""
+
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+import polars as pl
+
+from src.config import POLARS_ENGINE
+from src.user_aggregation import is_stringified, parse_strategy
+
+
+def _mode(c: pl.Expr) -> pl.Expr:
+    # Most frequent value; ties go to the smallest value, as with Series.mode
+    return c.drop_nulls().mode().min()
+
+
+def _topk(c: pl.Expr, k: int) -> pl.Expr:
+    # Most frequent first, ties in value order; "" for users without values. Nulls
+    # are sorted last and dropped after sorting: sort_by fails on empty groups
+    values = c.unique(maintain_order=True)
+    top = values.sort_by(
+        [values.is_null(), c.unique_counts(), values], descending=[False, True, False]
+    )
+    return top.drop_nulls().head(k).cast(pl.String).str.join("|").fill_null("")
+
+
+def _unique(c: pl.Expr) -> pl.Expr:
+    return c.drop_nulls().unique().sort().cast(pl.String).str.join("|")
+
+
+# Formats of the date strings parsed for count_distinct_days
+_DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y%m%d"]
+
+
+def _parse_dates(c: pl.Expr) -> pl.Expr:
+    """
+    Date strings parsed with the format of the column's first one, other values (and
+    all of them if the first has none of _DATE_FORMATS) missing, as pandas'
+    to_datetime(errors="coerce"). Formats are explicit: without one, Polars raises
+    when no value can be parsed.
+    """
+    first = c.drop_nulls().first()
+    parsed = pl.lit(None, dtype=pl.Datetime("ns"))
+    for fmt in reversed(_DATE_FORMATS):
+        parsed = (
+            pl.when(
+                first.str.strptime(pl.Datetime("ns"), fmt, strict=False).is_not_null()
+            )
+            .then(c.str.strptime(pl.Datetime("ns"), fmt, strict=False))
+            .otherwise(parsed)
+        )
+    return parsed
+
+
+def _count_distinct_days(c: pl.Expr) -> pl.Expr:
+    return c.dt.date().drop_nulls().n_unique().cast(pl.Int64)
+
+
+# Named reducers accepted for any column: pandas' groupby.agg names and the
+# REDUCERS of src/user_aggregation.py, called with the argument of "name:arg"
+# strategies (None if absent). Missing values are skipped, as pandas does.
+_REDUCERS: Dict[str, Callable[[pl.Expr, Optional[str]], pl.Expr]] = {
+    "sum": lambda c, arg: c.sum(),
+    "mean": lambda c, arg: c.mean(),
+    "median": lambda c, arg: c.median(),
+    "max": lambda c, arg: c.max(),
+    "min": lambda c, arg: c.min(),
+    "count": lambda c, arg: c.count().cast(pl.Int64),
+    "nunique": lambda c, arg: c.drop_nulls().n_unique().cast(pl.Int64),
+    "first": lambda c, arg: c.drop_nulls().first(),
+    "last": lambda c, arg: c.drop_nulls().last(),
+    "std": lambda c, arg: c.std(),
+    "var": lambda c, arg: c.var(),
+    "mode": lambda c, arg: _mode(c),
+    "majority": lambda c, arg: _mode(c),
+    "unique": lambda c, arg: _unique(c),
+    "topk": lambda c, arg: _topk(c, int(arg) if arg else 3),
+    "quantile": lambda c, arg: c.quantile(float(arg) if arg else 0.5, "linear"),
+    "count_distinct_days": lambda c, arg: _count_distinct_days(c),
+}
+# Reducers whose result has the column's own type (pandas keeps the column dtype)
+_TYPE_PRESERVING = {"sum", "max", "min", "first", "last", "mode", "majority"}
+# Reducers with float results (pandas returns Float64 for nullable columns)
+_FLOAT_RESULTS = {"mean", "median", "std", "var", "quantile"}
+# Reducers joining the values into one string
+_JOINED = {"topk", "unique"}
+
+CLEANING_DEFAULTS = {
+    "convert_date": False,
+    "revenue_adjustment": False,
+    "fill_missing_transactions": False,
+    "fill_missing_pageviews": False,
+    "fill_missing_timeOnSite": False,
+    "timeOnSite_zero_floor": False,
+}
+_NUMERIC_COLS = ["pageviews", "timeOnSite", "transactions", "totalTransactionRevenue"]
+# Values mapped to "NotSet" per column (missing values always are)
+_NOT_SET_VALUES = {
+    "city": ["not available in demo dataset", "(not set)"],
+    "country": ["not available in demo dataset", "(not set)", "(none)"],
+    "trafficCampaign": ["(not set)"],
+    "trafficMedium": ["(none)", "(not set)"],
+}
+
+
+def _to_lazy(df: Union[pd.DataFrame, pl.DataFrame, pl.LazyFrame]) -> pl.LazyFrame:
+    if isinstance(df, pl.LazyFrame):
+        return df
+    if isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+    return df.lazy()
+
+
+def _is_numeric(dtype: pl.DataType) -> bool:
+    # pandas counts booleans as numeric
+    return dtype.is_numeric() or dtype == pl.Boolean
+
+
+def _is_datetime(dtype: pl.DataType) -> bool:
+    return isinstance(dtype, pl.Datetime) or dtype == pl.Date
+
+
+def _nullable_result_dtype(name: str, dtype) -> Optional[str]:
+    """
+    The nullable dtype pandas gives the result of reducer name over a column of
+    nullable dtype (Int64, Float64, boolean, ...), or None if there is none to restore.
+    """
+    if not (pd.api.types.is_extension_array_dtype(dtype) and dtype.kind in "biuf"):
+        return None
+    if name in _FLOAT_RESULTS:
+        return "Float64"
+    if name == "count" or (name == "sum" and dtype.kind == "b"):
+        return "Int64"
+    return None
+
+
+def _as_text(c: pl.Expr, dtype: pl.DataType) -> pl.Expr:
+    """
+    Booleans and datetimes as str() prints them in pandas: "True"/"False", and dates
+    without the time of day if all of the column's values are at midnight.
+    """
+    if dtype == pl.Boolean:
+        return pl.when(c).then(pl.lit("True")).when(c.not_()).then(pl.lit("False"))
+    midnight = (c.drop_nulls().dt.truncate("1d") == c.drop_nulls()).all()
+    return (
+        pl.when(midnight)
+        .then(c.dt.to_string("%Y-%m-%d"))
+        .otherwise(c.dt.to_string("%Y-%m-%d %H:%M:%S"))
+    )
+
+
+def _restore_dtypes(
+    out: pd.DataFrame, dtypes: pd.Series, columns: List[str]
+) -> pd.DataFrame:
+    """
+    Cast columns back to the pandas dtypes of the input (nullable Int64, string, ...),
+    which the round trip through Polars turns into plain NumPy/object dtypes.
+    """
+    for col in columns:
+        if col in out.columns and col in dtypes and out[col].dtype != dtypes[col]:
+            out[col] = out[col].astype(dtypes[col])
+    return out
+
+
+# ------------------------------------------------------------------
+# Cleaning
+# ------------------------------------------------------------------
+
+
+def clean_sessions_lazy(
+    lf: pl.LazyFrame, cleaning_options: Optional[dict] = None
+) -> pl.LazyFrame:
+    """
+    The cleaning of clean_sessions_data as a lazy query (see its docstring for the
+    steps and options).
+    """
+    options = {**CLEANING_DEFAULTS, **(cleaning_options or {})}
+    schema = lf.collect_schema()
+
+    # 1) Integer (nullable) metrics become floats; NaN and null are both "missing"
+    numeric = [c for c in _NUMERIC_COLS if c in schema]
+    lf = lf.with_columns(
+        [
+            (
+                pl.col(c).cast(pl.Float64)
+                if schema[c].is_integer()
+                else pl.col(c).fill_nan(None)
+                if schema[c].is_float()
+                else pl.col(c)
+            )
+            for c in numeric
+        ]
+    )
+
+    # 2) Map the "not set" variants to "NotSet"
+    lf = lf.with_columns(
+        [
+            pl.col(c)
+            .cast(pl.String)
+            .fill_null("NotSet")
+            .replace(values, ["NotSet"] * len(values))
+            for c, values in _NOT_SET_VALUES.items()
+            if c in schema
+        ]
+    )
+
+    # 3) trafficSource: keep the 5 most frequent sources (ties broken by first
+    #    appearance, as value_counts().nlargest(5)), the rest become "Others"
+    if "trafficSource" in schema:
+        source = pl.col("trafficSource")
+        lf = lf.with_columns(source.cast(pl.String).fill_null("NotSet"))
+        top_sources = (
+            lf.select("trafficSource")
+            .with_row_index("_row")
+            .group_by("trafficSource")
+            .agg(pl.len().alias("_n"), pl.col("_row").min())
+            .sort(["_n", "_row"], descending=[True, False])
+            .head(5)
+            .select("trafficSource", pl.lit(True).alias("_top"))
+        )
+        lf = (
+            lf.join(top_sources, on="trafficSource", how="left", maintain_order="left")
+            .with_columns(
+                pl.when(pl.col("_top"))
+                .then(source)
+                .otherwise(pl.lit("Others"))
+                .alias("trafficSource")
+            )
+            .drop("_top")
+        )
+
+    # 4) Optional steps
+    if (
+        options["convert_date"]
+        and "date" in schema
+        and not _is_datetime(schema["date"])
+    ):
+        lf = lf.with_columns(
+            pl.col("date")
+            .cast(pl.String)
+            .str.strptime(pl.Datetime("ns"), "%Y%m%d", strict=False)
+        )
+
+    steps = []
+    if options["revenue_adjustment"] and "totalTransactionRevenue" in schema:
+        revenue = pl.col("totalTransactionRevenue")
+        # Likely in micros if the largest value exceeds 100000
+        steps.append(
+            pl.when(revenue.max() > 100000)
+            .then(revenue / 1e6)
+            .otherwise(revenue)
+            .fill_null(0)
+            .alias("totalTransactionRevenue")
+        )
+
+    time_on_site = pl.col("timeOnSite")
+    for col, option in [
+        ("transactions", "fill_missing_transactions"),
+        ("pageviews", "fill_missing_pageviews"),
+        ("timeOnSite", "fill_missing_timeOnSite"),
+    ]:
+        if options[option] and col in schema:
+            if col == "timeOnSite":
+                time_on_site = time_on_site.fill_null(0)
+            else:
+                steps.append(pl.col(col).fill_null(0))
+
+    if options["timeOnSite_zero_floor"] and "timeOnSite" in schema:
+        time_on_site = pl.when(time_on_site < 0).then(0.0).otherwise(time_on_site)
+    if "timeOnSite" in schema:
+        steps.append(time_on_site.alias("timeOnSite"))
+
+    return lf.with_columns(steps) if steps else lf
+
+
+def clean_sessions_data_polars(
+    df: Union[pd.DataFrame, pl.DataFrame, pl.LazyFrame],
+    cleaning_options: Optional[dict] = None,
+    engine: str = POLARS_ENGINE,
+) -> pd.DataFrame:
+    """
+    clean_sessions_data on the Polars engine. Unlike the pandas backend, df is not
+    modified; the cleaned data is returned as a new pandas DataFrame.
+    """
+    options = {**CLEANING_DEFAULTS, **(cleaning_options or {})}
+    out = clean_sessions_lazy(_to_lazy(df), options).collect(engine=engine).to_pandas()
+    if isinstance(df, pd.DataFrame):
+        converted = set(_NUMERIC_COLS) | (
+            {"date"} if options["convert_date"] else set()
+        )
+        out = _restore_dtypes(
+            out, df.dtypes, [c for c in df.columns if c not in converted]
+        )
+    return out
+
+
+# ------------------------------------------------------------------
+# Aggregation
+# ------------------------------------------------------------------
+
+
+def _column_strategies(
+    schema: pl.Schema,
+    user_id_col: str,
+    group_col: Optional[str],
+    numeric_strategy,
+    date_strategy,
+    categorical_strategy,
+    custom_strategies: Optional[Dict],
+) -> Dict[str, tuple]:
+    """
+    {column: (kind, strategy, is_custom)} in aggregate_user_data's output order:
+    numeric, then datetime, then categorical columns.
+    """
+    kinds = {}
+    for col, dtype in schema.items():
+        if col in (user_id_col, group_col):
+            continue
+        if _is_numeric(dtype):
+            kinds[col] = "numeric"
+        elif _is_datetime(dtype):
+            kinds[col] = "datetime"
+        else:
+            kinds[col] = "categorical"
+
+    defaults = {
+        "numeric": numeric_strategy,
+        "datetime": date_strategy,
+        "categorical": categorical_strategy,
+    }
+    custom_strategies = custom_strategies or {}
+    strategies = {}
+    for kind in ("numeric", "datetime", "categorical"):
+        for col in [c for c, k in kinds.items() if k == kind]:
+            is_custom = col in custom_strategies
+            strategy = custom_strategies[col] if is_custom else defaults[kind]
+            strategies[col] = (kind, strategy, is_custom)
+    return strategies
+
+
+def _aggregation_expr(
+    col: str, dtype: pl.DataType, kind: str, strategy: str, is_custom: bool
+) -> pl.Expr:
+    column = pl.col(col)
+    name, arg = parse_strategy(strategy)
+    stringified = is_stringified(kind, strategy, is_custom)
+    # Strings are reduced as strings (date strings of count_distinct_days are parsed)
+    if (stringified and not _is_datetime(dtype)) or dtype == pl.Null:
+        column = column.cast(pl.String)
+    if dtype == pl.Boolean and name == "sum":
+        # pandas counts the True values as int64
+        column = column.cast(pl.Int64)
+    elif dtype == pl.Boolean and name in _FLOAT_RESULTS:
+        column = column.cast(pl.Float64)
+    if name in _REDUCERS:
+        result = _REDUCERS[name](column, arg)
+        if stringified:
+            # As str() of the pandas result, "" when there is none
+            result = result.cast(pl.String).fill_null("")
+        return result.alias(col)
+    raise ValueError(
+        f"Column '{col}' ({kind}): strategy '{strategy}' is not supported by the "
+        "polars backend."
+    )
+
+
+def _prepare_rows(
+    lf: pl.LazyFrame,
+    user_id_col: str,
+    group_col: Optional[str],
+    handle_multi_group: str,
+    exclude_columns: Optional[List[str]],
+    datetime_formats: Optional[Dict[str, str]],
+) -> tuple:
+    """
+    Steps 0-2 of aggregate_user_data: drop excluded columns, parse date strings, drop
+    rows with missing group keys and resolve multi-group users.
+    Returns (lazy frame, group keys).
+    """
+    if handle_multi_group not in ("exclude", "first", "all"):
+        raise ValueError(f"Unsupported handle_multi_group: {handle_multi_group}")
+
+    schema = lf.collect_schema()
+    lf = lf.drop([c for c in exclude_columns or [] if c in schema])
+    for col, fmt in (datetime_formats or {}).items():
+        if col in schema and not _is_datetime(schema[col]):
+            lf = lf.with_columns(
+                pl.col(col)
+                .cast(pl.String)
+                .str.strptime(pl.Datetime("ns"), fmt, strict=False)
+            )
+
+    group_keys = [user_id_col]
+    if group_col and handle_multi_group == "all":
+        group_keys.append(group_col)
+    lf = lf.filter(pl.all_horizontal([pl.col(k).is_not_null() for k in group_keys]))
+
+    if group_col and handle_multi_group == "exclude":
+        n_groups = pl.col(group_col).drop_nulls().n_unique()
+        multi_group_users = (
+            lf.group_by(user_id_col).agg(n_groups.alias("_n")).filter(pl.col("_n") > 1)
+        )
+        lf = lf.join(
+            multi_group_users.select(user_id_col),
+            on=user_id_col,
+            how="anti",
+            maintain_order="left",
+        )
+    elif group_col and handle_multi_group == "first":
+        # Keep only the rows in the user's first group (in row order); a missing
+        # first group matches the user's rows without a group
+        first_group = pl.col(group_col).first().over(user_id_col)
+        lf = lf.filter(pl.col(group_col).eq_missing(first_group))
+    return lf, group_keys
+
+
+def _aggregate_rows(
+    lf: pl.LazyFrame,
+    group_keys: List[str],
+    strategies: Dict[str, tuple],
+    group_col: Optional[str],
+    handle_multi_group: str,
+) -> pl.LazyFrame:
+    schema = lf.collect_schema()
+    # Booleans and datetimes are joined into strings as pandas prints them
+    joined = [
+        col
+        for col, (_, strategy, _) in strategies.items()
+        if parse_strategy(strategy)[0] in _JOINED
+        and (schema[col] == pl.Boolean or _is_datetime(schema[col]))
+    ]
+    # Date strings of count_distinct_days are parsed over the whole column
+    dates = [
+        col
+        for col, (_, strategy, _) in strategies.items()
+        if parse_strategy(strategy)[0] == "count_distinct_days"
+        and not _is_datetime(schema[col])
+    ]
+    if joined or dates:
+        lf = lf.with_columns(
+            [_as_text(pl.col(c), schema[c]).alias(c) for c in joined]
+            + [_parse_dates(pl.col(c).cast(pl.String)).alias(c) for c in dates]
+        )
+        schema = lf.collect_schema()
+    aggs = [
+        _aggregation_expr(col, schema[col], kind, strategy, is_custom)
+        for col, (kind, strategy, is_custom) in strategies.items()
+    ]
+    # Each remaining user has a single group (the first non-missing one)
+    if group_col and handle_multi_group in ("exclude", "first"):
+        aggs.append(pl.col(group_col).drop_nulls().first())
+    return lf.group_by(group_keys).agg(aggs).sort(group_keys)
+
+
+def aggregate_user_lazy(
+    lf: pl.LazyFrame,
+    user_id_col: str,
+    group_col: Optional[str] = None,
+    handle_multi_group: str = "exclude",
+    numeric_strategy: str = "sum",
+    date_strategy: str = "min",
+    categorical_strategy: str = "majority",
+    custom_strategies: Optional[Dict[str, str]] = None,
+    exclude_columns: Optional[List[str]] = None,
+    datetime_formats: Optional[Dict[str, str]] = None,
+) -> pl.LazyFrame:
+    """
+    The aggregation of aggregate_user_data as a lazy query, with the same parameters
+    and output (one row per user, sorted by the group keys). Strategies must be
+    names: callables raise a ValueError.
+    """
+    lf, group_keys = _prepare_rows(
+        lf,
+        user_id_col,
+        group_col,
+        handle_multi_group,
+        exclude_columns,
+        datetime_formats,
+    )
+    strategies = _column_strategies(
+        lf.collect_schema(),
+        user_id_col,
+        group_col,
+        numeric_strategy,
+        date_strategy,
+        categorical_strategy,
+        custom_strategies,
+    )
+    for col, (_, strategy, _) in strategies.items():
+        if callable(strategy):
+            raise ValueError(
+                f"Column '{col}': callable strategies cannot run as a Polars query; "
+                "use aggregate_user_data_polars or a named strategy."
+            )
+    return _aggregate_rows(lf, group_keys, strategies, group_col, handle_multi_group)
+
+
+def aggregate_user_data_polars(
+    df: Union[pd.DataFrame, pl.DataFrame, pl.LazyFrame],
+    user_id_col: str,
+    group_col: Optional[str] = None,
+    handle_multi_group: str = "exclude",
+    numeric_strategy: Union[str, Callable] = "sum",
+    date_strategy: Union[str, Callable] = "min",
+    categorical_strategy: Union[str, Callable] = "majority",
+    custom_strategies: Optional[Dict[str, Union[str, Callable]]] = None,
+    exclude_columns: Optional[List[str]] = None,
+    datetime_formats: Optional[Dict[str, str]] = None,
+    engine: str = POLARS_ENGINE,
+) -> pd.DataFrame:
+    """
+    aggregate_user_data on the Polars engine; same parameters and result.
+
+    Named strategies run in the Polars query. Columns with callable strategies are
+    aggregated afterwards with pandas (one call per user, as in the pandas backend)
+    on the rows left after the multi-group handling, and joined in.
+    """
+    lf, group_keys = _prepare_rows(
+        _to_lazy(df),
+        user_id_col,
+        group_col,
+        handle_multi_group,
+        exclude_columns,
+        datetime_formats,
+    )
+    strategies = _column_strategies(
+        lf.collect_schema(),
+        user_id_col,
+        group_col,
+        numeric_strategy,
+        date_strategy,
+        categorical_strategy,
+        custom_strategies,
+    )
+    named = {c: s for c, s in strategies.items() if not callable(s[1])}
+    callables = {c: s[1] for c, s in strategies.items() if callable(s[1])}
+
+    if callables:
+        # Collect the prepared rows once; both parts aggregate them
+        lf = lf.collect(engine=engine).lazy()
+    user_df = (
+        _aggregate_rows(lf, group_keys, named, group_col, handle_multi_group)
+        .collect(engine=engine)
+        .to_pandas()
+    )
+
+    # Columns keep their input pandas dtype, unless parsed as dates here
+    dtypes = df.dtypes if isinstance(df, pd.DataFrame) else pd.Series(dtype=object)
+    dtypes = dtypes.drop(list(datetime_formats or {}), errors="ignore")
+    schema = lf.collect_schema()
+    preserved = [
+        c
+        for c, (kind, s, is_custom) in named.items()
+        if parse_strategy(s)[0] in _TYPE_PRESERVING
+        and not (s == "sum" and schema[c] == pl.Boolean)
+        and not is_stringified(kind, s, is_custom)
+    ]
+    # Strings keep the column's string dtype (object otherwise, as with pandas)
+    preserved += [
+        c
+        for c, (kind, s, is_custom) in named.items()
+        if is_stringified(kind, s, is_custom)
+        and isinstance(dtypes.get(c), pd.StringDtype)
+    ]
+    extra = [group_col] if group_col else []
+    user_df = _restore_dtypes(user_df, dtypes, group_keys + extra + preserved)
+    for col, (_, strategy, _) in named.items():
+        if col in dtypes:
+            nullable = _nullable_result_dtype(parse_strategy(strategy)[0], dtypes[col])
+            if nullable is not None:
+                user_df[col] = user_df[col].astype(nullable)
+
+    if callables:
+        rows = lf.select(group_keys + list(callables)).collect().to_pandas()
+        rows = _restore_dtypes(rows, dtypes, list(rows.columns))
+        custom = rows.groupby(group_keys, as_index=False).agg(callables)
+        user_df = user_df.merge(custom, on=group_keys, how="left")
+
+    # Column order of the pandas backend: keys, aggregated columns, then group_col
+    order = group_keys + list(strategies)
+    return user_df[order + [c for c in user_df.columns if c not in order]]
@@ -0,0 +1,674 @@
+# src/power_analysis.py
+
+"""
+Power analysis and sample-size planning for the tests implemented in ABTest.
+
+Given a historical user-level table (e.g. the output of aggregate_user_data), the
+functions below answer "how many users (and days) do we need to detect a lift of X?"
+and "what lift can we detect with N users per group?".
+
+- t_test / bayesian_means: analytic normal approximation on the transformed metric.
+- bayesian_conversions: analytic two-proportion formula on the conversion rate (x > 0).
+- mannwhitney, or any test with zero_inflation=True: Monte-Carlo simulation by
+  resampling the historical values. Simulations are batched in NumPy and can be
+  spread over several processes with n_jobs. bayesian_conversions is simulated as a
+  chi-square test on the conversion rate; with zero_inflation=True every non-zero
+  value converts, so only the zero-proportion part of the test has power.
+
+Usage Example:
+-------------
+from src.power_analysis import sample_size_curve, mde_curve
+
+curve = sample_size_curve(user_df, "totalTransactionRevenue", lifts=[0.05, 0.1, 0.2],
+                          test_type="mannwhitney", zero_inflation=True, n_jobs=4)
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.transforms import apply_transform, compute_cut_points, fit_boxcox
+from src.vectorized_stats import (
+    chi2_2x2_test,
+    mannwhitney_u_test,
+    student_t_test,
+    tie_correction_term,
+)
+
+ANALYTIC_TEST_TYPES = ("t_test", "bayesian_means", "bayesian_conversions")
+# Upper bound on values drawn per simulated group in one NumPy batch
+MAX_BATCH_ELEMENTS = 2_000_000
+
+
+def _fit_transform_params(
+    values: np.ndarray,
+    transform: str,
+    winsor_percentile: float,
+    trim_percentile: float,
+) -> Optional[Dict[str, float]]:
+    """Fit transform parameters once on the historical (baseline) values."""
+    if transform == "boxcox":
+        return fit_boxcox(values)
+    if transform in ("winsor", "trim"):
+        return compute_cut_points(values, transform, winsor_percentile, trim_percentile)
+    return None
+
+
+def _transform(
+    arr: np.ndarray,
+    transform: str,
+    add_constant: float,
+    params: Optional[Dict[str, float]],
+) -> np.ndarray:
+    """
+    Apply a transform with fixed baseline parameters. Works on 2-D batches; for
+    "trim", removed values become NaN instead of shrinking the array.
+    """
+    if transform == "trim":
+        return np.where(arr <= params["high"], arr, np.nan)
+    return apply_transform(arr, transform, add_constant, cut_points=params)
+
+
+def _apply_lift(
+    values: np.ndarray, lift: float, effect: str, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Apply a relative lift to resampled values.
+    effect="value": scale every value by (1 + lift) (zeros stay zero).
+    effect="conversion": turn zeros into non-zero draws so the share of non-zero
+    values grows by (1 + lift), leaving the non-zero distribution unchanged.
+    """
+    if effect == "value":
+        return values * (1 + lift)
+
+    if effect == "conversion":
+        nonzero = values != 0
+        p0 = nonzero.mean()
+        if p0 in (0.0, 1.0):
+            return values
+        # Probability of flipping a zero so that P(nonzero) becomes p0 * (1 + lift)
+        flip_p = np.clip((p0 * lift) / (1 - p0), 0, 1)
+        flip = (~nonzero) & (rng.random(values.shape) < flip_p)
+        pool = values[nonzero]
+        out = values.copy()
+        out[flip] = rng.choice(pool, size=int(flip.sum()))
+        return out
+
+    raise ValueError(f"Unsupported effect: {effect}")
+
+
+# ------------------------------------------------------------------
+# Analytic power
+# ------------------------------------------------------------------
+
+
+def analytic_power(
+    values: np.ndarray,
+    n_per_group: float,
+    lift: float,
+    test_type: str = "t_test",
+    transform: str = "none",
+    alpha: float = 0.05,
+    add_constant: float = 1.0,
+    winsor_percentile: float = 95.0,
+    trim_percentile: float = 95.0,
+) -> float:
+    """
+    Approximate power of a two-sided test with n_per_group users per group, when
+    the test group's metric is the baseline scaled by (1 + lift).
+    """
+    values = np.asarray(values, dtype=float)
+    z_alpha = stats.norm.ppf(1 - alpha / 2)
+
+    if test_type == "bayesian_conversions":
+        p0 = float(np.mean(values > 0))
+        p1 = min(p0 * (1 + lift), 1.0)
+        p_bar = (p0 + p1) / 2
+        se0 = np.sqrt(2 * p_bar * (1 - p_bar) / n_per_group)
+        se1 = np.sqrt((p0 * (1 - p0) + p1 * (1 - p1)) / n_per_group)
+        if se1 == 0:
+            return float("nan")
+        return float(stats.norm.cdf((abs(p1 - p0) - z_alpha * se0) / se1))
+
+    if test_type not in ("t_test", "bayesian_means"):
+        raise ValueError(f"No analytic power formula for test_type: {test_type}")
+
+    params = _fit_transform_params(
+        values, transform, winsor_percentile, trim_percentile
+    )
+    base = _transform(values, transform, add_constant, params)
+    lifted = _transform(values * (1 + lift), transform, add_constant, params)
+    delta = np.nanmean(lifted) - np.nanmean(base)
+    sd = np.nanstd(base, ddof=1)
+    if sd == 0:
+        return float("nan")
+    return float(stats.norm.cdf(abs(delta) / (sd * np.sqrt(2 / n_per_group)) - z_alpha))
+
+
+def analytic_sample_size(
+    values: np.ndarray,
+    lift: float,
+    test_type: str = "t_test",
+    transform: str = "none",
+    alpha: float = 0.05,
+    power: float = 0.8,
+    add_constant: float = 1.0,
+    winsor_percentile: float = 95.0,
+    trim_percentile: float = 95.0,
+) -> Optional[int]:
+    """
+    Users needed per group to detect a relative `lift` with the given power.
+    Returns None if the lift produces no detectable difference.
+    """
+    values = np.asarray(values, dtype=float)
+    z_alpha = stats.norm.ppf(1 - alpha / 2)
+    z_beta = stats.norm.ppf(power)
+
+    if test_type == "bayesian_conversions":
+        p0 = float(np.mean(values > 0))
+        p1 = min(p0 * (1 + lift), 1.0)
+        p_bar = (p0 + p1) / 2
+        if p1 == p0:
+            return None
+        n = (
+            z_alpha * np.sqrt(2 * p_bar * (1 - p_bar))
+            + z_beta * np.sqrt(p0 * (1 - p0) + p1 * (1 - p1))
+        ) ** 2 / (p1 - p0) ** 2
+        return int(np.ceil(n))
+
+    if test_type not in ("t_test", "bayesian_means"):
+        raise ValueError(f"No analytic sample size formula for test_type: {test_type}")
+
+    params = _fit_transform_params(
+        values, transform, winsor_percentile, trim_percentile
+    )
+    base = _transform(values, transform, add_constant, params)
+    lifted = _transform(values * (1 + lift), transform, add_constant, params)
+    delta = np.nanmean(lifted) - np.nanmean(base)
+    sd = np.nanstd(base, ddof=1)
+    if delta == 0:
+        return None
+    return int(np.ceil(2 * ((z_alpha + z_beta) * sd / delta) ** 2))
+
+
+# ------------------------------------------------------------------
+# Simulated power
+# ------------------------------------------------------------------
+
+
+def _batched_main_test(
+    control: np.ndarray, test: np.ndarray, test_type: str
+) -> np.ndarray:
+    """p-values of the main test for each row of two (batch, n) arrays (NaN = missing)."""
+    if test_type in ("t_test", "bayesian_means"):
+        _, p_val = student_t_test(
+            np.sum(~np.isnan(control), axis=1),
+            np.nansum(control, axis=1),
+            np.nansum(control**2, axis=1),
+            np.sum(~np.isnan(test), axis=1),
+            np.nansum(test, axis=1),
+            np.nansum(test**2, axis=1),
+        )
+        return p_val
+
+    if test_type == "mannwhitney":
+        pooled = np.concatenate([control, test], axis=1)
+        ranks = stats.rankdata(pooled, axis=1, nan_policy="omit")
+        n1 = np.sum(~np.isnan(control), axis=1)
+        n2 = np.sum(~np.isnan(test), axis=1)
+        rank_sum1 = np.nansum(ranks[:, : control.shape[1]], axis=1)
+        tie_term = tie_correction_term(np.sort(pooled, axis=1))
+        _, p_val = mannwhitney_u_test(rank_sum1, n1, n2, tie_term)
+        return p_val
+
+    if test_type == "bayesian_conversions":
+        # Conversion rate (share of values > 0), as in analytic_power
+        n1 = np.sum(~np.isnan(control), axis=1)
+        n2 = np.sum(~np.isnan(test), axis=1)
+        conv1 = np.sum(control > 0, axis=1)
+        conv2 = np.sum(test > 0, axis=1)
+        _, p_val = chi2_2x2_test(conv1, n1 - conv1, conv2, n2 - conv2)
+        return p_val
+
+    raise ValueError(f"Unsupported test_type for simulation: {test_type}")
+
+
+def _simulate_batch(
+    values: np.ndarray,
+    n_per_group: int,
+    lift: float,
+    n_sims: int,
+    test_type: str,
+    transform: str,
+    zero_inflation: bool,
+    alpha: float,
+    add_constant: float,
+    params: Optional[Dict[str, float]],
+    effect: str,
+    seed,
+) -> np.ndarray:
+    """
+    Run n_sims simulated experiments at once. Returns an (n_sims, 3) array of
+    significance flags: [any part, zero-proportion test, main test].
+    """
+    rng = np.random.default_rng(seed)
+    control = rng.choice(values, size=(n_sims, n_per_group))
+    test = _apply_lift(
+        rng.choice(values, size=(n_sims, n_per_group)), lift, effect, rng
+    )
+
+    zero_sig = np.zeros(n_sims, dtype=bool)
+    main_alpha = alpha
+    if zero_inflation:
+        control_zeros = np.sum(control == 0, axis=1)
+        test_zeros = np.sum(test == 0, axis=1)
+        _, zero_p = chi2_2x2_test(
+            control_zeros,
+            n_per_group - control_zeros,
+            test_zeros,
+            n_per_group - test_zeros,
+        )
+        # Two-part test: each part at alpha / 2 so the overall level stays at alpha
+        zero_sig = np.nan_to_num(zero_p, nan=1.0) < alpha / 2
+        main_alpha = alpha / 2
+        control = np.where(control > 0, control, np.nan)
+        test = np.where(test > 0, test, np.nan)
+
+    if test_type != "bayesian_conversions":
+        control = _transform(control, transform, add_constant, params)
+        test = _transform(test, transform, add_constant, params)
+    main_p = _batched_main_test(control, test, test_type)
+    main_sig = np.nan_to_num(main_p, nan=1.0) < main_alpha
+
+    return np.column_stack([zero_sig | main_sig, zero_sig, main_sig])
+
+
+def simulated_power(
+    values: np.ndarray,
+    n_per_group: int,
+    lift: float,
+    test_type: str = "mannwhitney",
+    transform: str = "none",
+    zero_inflation: bool = False,
+    alpha: float = 0.05,
+    add_constant: float = 1.0,
+    winsor_percentile: float = 95.0,
+    trim_percentile: float = 95.0,
+    effect: Optional[str] = None,
+    n_sims: int = 1000,
+    batch_size: int = 250,
+    n_jobs: int = 1,
+    seed: int = 0,
+    executor: Optional[Executor] = None,
+) -> Dict[str, float]:
+    """
+    Estimate power by resampling the historical values into simulated experiments.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Historical user-level metric values (baseline distribution).
+    n_per_group : int
+        Users per group in each simulated experiment.
+    lift : float
+        Relative lift applied to the test group (see effect).
+    test_type : {"t_test", "bayesian_means", "mannwhitney", "bayesian_conversions"}
+        Main test, as in ABTest.run_test. bayesian_conversions compares the share of
+        values > 0 with a chi-square test (untransformed).
+    zero_inflation : bool, default False
+        If True, run the two-part test (zero-proportion chi-square + main test on
+        non-zero values), each part at alpha / 2.
+    effect : {"value", "conversion"}, optional
+        Whether the lift scales the metric values or the share of non-zero users.
+        Defaults to "conversion" for bayesian_conversions (the lift of its analytic
+        formula) and "value" otherwise.
+    n_sims : int, default 1000
+        Number of simulated experiments.
+    batch_size : int, default 250
+        Simulations evaluated together in one NumPy batch. Reduced automatically for
+        large n_per_group so a batch holds at most MAX_BATCH_ELEMENTS values per group.
+    n_jobs : int, default 1
+        Number of worker processes. Batches are distributed over processes when > 1.
+    seed : int, default 0
+        Seed for reproducible simulations.
+    executor : concurrent.futures.Executor, optional
+        Existing pool to run batches on (used instead of creating one per call).
+
+    Returns
+    -------
+    dict
+        {"power", "zero_test_power", "main_test_power", "n_sims"}.
+    """
+    if effect is None:
+        effect = "conversion" if test_type == "bayesian_conversions" else "value"
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    params = _fit_transform_params(
+        values[values > 0] if zero_inflation else values,
+        transform,
+        winsor_percentile,
+        trim_percentile,
+    )
+
+    # Keep each (batch, n_per_group) draw around MAX_BATCH_ELEMENTS values
+    batch_size = int(max(1, min(batch_size, MAX_BATCH_ELEMENTS // max(n_per_group, 1))))
+    batch_sizes = [batch_size] * (n_sims // batch_size)
+    if n_sims % batch_size:
+        batch_sizes.append(n_sims % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+
+    args = [
+        (
+            values,
+            int(n_per_group),
+            lift,
+            size,
+            test_type,
+            transform,
+            zero_inflation,
+            alpha,
+            add_constant,
+            params,
+            effect,
+            batch_seed,
+        )
+        for size, batch_seed in zip(batch_sizes, seeds)
+    ]
+
+    if executor is not None:
+        flags = list(executor.map(_simulate_batch, *zip(*args)))
+    elif n_jobs > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            flags = list(pool.map(_simulate_batch, *zip(*args)))
+    else:
+        flags = [_simulate_batch(*a) for a in args]
+
+    rates = np.concatenate(flags).mean(axis=0)
+    return {
+        "power": float(rates[0]),
+        "zero_test_power": float(rates[1]) if zero_inflation else float("nan"),
+        "main_test_power": float(rates[2]),
+        "n_sims": n_sims,
+    }
+
+
+# ------------------------------------------------------------------
+# Planning curves
+# ------------------------------------------------------------------
+
+
+def _use_simulation(test_type: str, zero_inflation: bool, method: str) -> bool:
+    if method == "analytic":
+        if test_type not in ANALYTIC_TEST_TYPES or zero_inflation:
+            raise ValueError(
+                f"Analytic power is not available for test_type={test_type}, "
+                f"zero_inflation={zero_inflation}"
+            )
+        return False
+    if method == "simulation":
+        return True
+    # "auto"
+    return test_type not in ANALYTIC_TEST_TYPES or zero_inflation
+
+
+def _simulation_pool(simulate: bool, kwargs: dict):
+    """One process pool shared by all power evaluations of a curve (if n_jobs > 1)."""
+    n_jobs = kwargs.get("n_jobs", 1)
+    if simulate and n_jobs > 1:
+        return ProcessPoolExecutor(max_workers=n_jobs)
+    return nullcontext()
+
+
+def _power_fn(
+    values, test_type, transform, zero_inflation, alpha, simulate, kwargs, pool=None
+):
+    """Return power(n_per_group, lift) for the chosen method."""
+    analytic_keys = ("add_constant", "winsor_percentile", "trim_percentile")
+
+    def power(n: int, lift: float) -> float:
+        if simulate:
+            return simulated_power(
+                values,
+                n,
+                lift,
+                test_type=test_type,
+                transform=transform,
+                zero_inflation=zero_inflation,
+                alpha=alpha,
+                executor=pool,
+                **kwargs,
+            )["power"]
+        return analytic_power(
+            values,
+            n,
+            lift,
+            test_type=test_type,
+            transform=transform,
+            alpha=alpha,
+            **{k: v for k, v in kwargs.items() if k in analytic_keys},
+        )
+
+    return power
+
+
+def estimate_duration_days(
+    user_df: pd.DataFrame,
+    n_per_group: int,
+    date_col: str = "date",
+    n_groups: int = 2,
+    traffic_fraction: float = 1.0,
+) -> float:
+    """
+    Days needed to enrol n_per_group users in each of n_groups, assuming new users
+    keep arriving at the historical daily rate (users per distinct first-visit date).
+    """
+    if date_col not in user_df.columns:
+        return float("nan")
+    n_days = pd.to_datetime(user_df[date_col], errors="coerce").dt.normalize().nunique()
+    if n_days == 0:
+        return float("nan")
+    daily_users = len(user_df) / n_days * traffic_fraction
+    return float(n_per_group * n_groups / daily_users)
+
+
+def sample_size_curve(
+    user_df: pd.DataFrame,
+    column: str,
+    lifts: Iterable[float],
+    test_type: str = "t_test",
+    transform: str = "none",
+    zero_inflation: bool = False,
+    alpha: float = 0.05,
+    power: float = 0.8,
+    method: str = "auto",
+    date_col: str = "date",
+    max_n: int = 1_000_000,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Users per group (and estimated days) needed to detect each relative lift.
+
+    Parameters
+    ----------
+    user_df : pd.DataFrame
+        Historical user-level data (one row per user).
+    column : str
+        Metric to be tested.
+    lifts : iterable of float
+        Relative lifts, e.g. [0.05, 0.1] for +5% and +10%.
+    test_type, transform, zero_inflation, alpha :
+        Same meaning as in ABTest.run_test.
+    power : float, default 0.8
+        Target power.
+    method : {"auto", "analytic", "simulation"}, default "auto"
+        "auto" uses the analytic formulas where available and simulation otherwise.
+    date_col : str, default "date"
+        First-visit date column used to translate sample sizes into days.
+    max_n : int, default 1,000,000
+        Upper bound of the sample-size search for simulated tests.
+    **kwargs :
+        Passed to analytic_power / simulated_power (add_constant, winsor_percentile,
+        trim_percentile, effect, n_sims, batch_size, n_jobs, seed).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns: lift, n_per_group, days, method.
+    """
+    values = user_df[column].dropna().to_numpy(dtype=float)
+    simulate = _use_simulation(test_type, zero_inflation, method)
+
+    sizes = []
+    with _simulation_pool(simulate, kwargs) as pool:
+        power_at = _power_fn(
+            values, test_type, transform, zero_inflation, alpha, simulate, kwargs, pool
+        )
+        for lift in lifts:
+            if simulate:
+                n = _search_sample_size(power_at, lift, power, max_n)
+            else:
+                n = analytic_sample_size(
+                    values,
+                    lift,
+                    test_type=test_type,
+                    transform=transform,
+                    alpha=alpha,
+                    power=power,
+                    **{
+                        k: v
+                        for k, v in kwargs.items()
+                        if k in ("add_constant", "winsor_percentile", "trim_percentile")
+                    },
+                )
+            sizes.append((lift, n))
+
+    rows = []
+    for lift, n in sizes:
+        rows.append(
+            {
+                "lift": lift,
+                "n_per_group": n,
+                "days": estimate_duration_days(user_df, n, date_col=date_col)
+                if n is not None
+                else float("nan"),
+                "method": "simulation" if simulate else "analytic",
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def _search_sample_size(power_at, lift: float, target: float, max_n: int):
+    """Smallest n (to ~5%) with power_at(n, lift) >= target, or None if > max_n."""
+    lo, hi = 2, 16
+    while power_at(hi, lift) < target:
+        lo, hi = hi, hi * 4
+        if hi > max_n:
+            if power_at(max_n, lift) < target:
+                return None
+            hi = max_n
+            break
+    # Geometric bisection between lo (under-powered) and hi (powered)
+    while hi > lo * 1.05 and hi - lo > 1:
+        mid = int(np.sqrt(lo * hi))
+        if power_at(mid, lift) >= target:
+            hi = mid
+        else:
+            lo = mid
+    return int(hi)
+
+
+def mde_curve(
+    user_df: pd.DataFrame,
+    column: str,
+    sample_sizes: Iterable[int],
+    test_type: str = "t_test",
+    transform: str = "none",
+    zero_inflation: bool = False,
+    alpha: float = 0.05,
+    power: float = 0.8,
+    method: str = "auto",
+    date_col: str = "date",
+    max_lift: float = 10.0,
+    tol: float = 0.005,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Minimum detectable relative lift for each sample size (users per group).
+
+    Parameters are as in sample_size_curve; max_lift bounds the search and tol is the
+    absolute tolerance on the returned lift.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns: n_per_group, mde, days, method. mde is NaN if above max_lift.
+    """
+    values = user_df[column].dropna().to_numpy(dtype=float)
+    simulate = _use_simulation(test_type, zero_inflation, method)
+
+    mdes = []
+    with _simulation_pool(simulate, kwargs) as pool:
+        power_at = _power_fn(
+            values, test_type, transform, zero_inflation, alpha, simulate, kwargs, pool
+        )
+        for n in sample_sizes:
+            if power_at(n, max_lift) < power:
+                mde = float("nan")
+            else:
+                lo, hi = 0.0, max_lift
+                while hi - lo > tol:
+                    mid = (lo + hi) / 2
+                    if power_at(n, mid) >= power:
+                        hi = mid
+                    else:
+                        lo = mid
+                mde = hi
+            mdes.append((n, mde))
+
+    rows = []
+    for n, mde in mdes:
+        rows.append(
+            {
+                "n_per_group": n,
+                "mde": mde,
+                "days": estimate_duration_days(user_df, n, date_col=date_col),
+                "method": "simulation" if simulate else "analytic",
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def sample_size_table(
+    user_df: pd.DataFrame,
+    column: str,
+    lifts: Iterable[float],
+    test_types: Iterable[str] = ("t_test", "mannwhitney"),
+    transforms: Iterable[str] = ("none",),
+    zero_inflation: bool = False,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    sample_size_curve for every combination of test_type and transform, stacked into
+    one DataFrame with extra test_type and transform columns.
+    """
+    lifts = list(lifts)
+    curves = []
+    for test_type in test_types:
+        for transform in transforms:
+            curve = sample_size_curve(
+                user_df,
+                column,
+                lifts,
+                test_type=test_type,
+                transform=transform,
+                zero_inflation=zero_inflation,
+                **kwargs,
+            )
+            curve.insert(0, "transform", transform)
+            curve.insert(0, "test_type", test_type)
+            curves.append(curve)
+    return pd.concat(curves, ignore_index=True)
@@ -0,0 +1,61 @@
+# src/result_cache.py
+
+import copy
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ResultCache:
+    """
+    A small LRU cache for A/B test results.
+
+    Keys combine a content fingerprint of the tested data with every test parameter,
+    so a cached result is only reused when both the data and the configuration match.
+    Results are deep-copied on the way in and out, so callers can mutate them freely.
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of cached results; the least recently used entry is evicted.
+    hits, misses : int
+        Lookup statistics since creation (or the last clear()).
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(data_fingerprint: str, params: Dict[str, Any]) -> Tuple:
+        """Build a hashable key from a data fingerprint and test parameters."""
+        return (data_fingerprint, tuple(sorted(params.items())))
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for key, or None."""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return copy.deepcopy(self._entries[key])
+
+    def put(self, key: Hashable, result: Dict[str, Any]) -> None:
+        """Store a copy of result under key, evicting the oldest entry if full."""
+        self._entries[key] = copy.deepcopy(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache, e.g. shared across Streamlit reruns
+DEFAULT_RESULT_CACHE = ResultCache()
@@ -0,0 +1,284 @@
+# src/results_store.py
+
+"""
+Append-only columnar store for A/B test results.
+
+Each call to ABTest.run_test returns a nested dict. ResultsStore flattens it into one
+typed row and appends it to a Parquet dataset partitioned by experiment and run date:
+
+    <root>/experiment=<name>/run_date=<YYYY-MM-DD>/<uuid>-0.parquet
+
+Existing files are never rewritten, so past results can be queried, diffed and
+plotted without recomputing any test.
+
+Usage Example:
+-------------
+store = ResultsStore("data/ab_results")
+run_id = store.append(result, experiment="recommendation", params={"seed": 42})
+history = store.load(experiment="recommendation")
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config import RESULTS_STORE_PATH
+
+RESULTS_SCHEMA = pa.schema(
+    [
+        ("run_id", pa.string()),
+        ("run_timestamp", pa.timestamp("us", tz="UTC")),
+        ("column", pa.string()),
+        ("test_type", pa.string()),
+        ("transform", pa.string()),
+        ("zero_inflation", pa.bool_()),
+        ("alpha", pa.float64()),
+        ("control_n", pa.int64()),
+        ("test_n", pa.int64()),
+        ("statistic_kind", pa.string()),
+        ("control_value", pa.float64()),
+        ("test_value", pa.float64()),
+        ("test_statistic", pa.float64()),
+        ("p_value", pa.float64()),
+        ("significant", pa.bool_()),
+        ("zero_test_statistic", pa.float64()),
+        ("zero_test_p_value", pa.float64()),
+        ("control_zero_rate", pa.float64()),
+        ("test_zero_rate", pa.float64()),
+        ("error", pa.string()),
+        ("params", pa.string()),
+        ("experiment", pa.string()),
+        ("run_date", pa.string()),
+    ]
+)
+
+PARTITION_COLS = ["experiment", "run_date"]
+
+# Per test_type: (key in main_test for control, key for test, statistic_kind)
+_SUMMARY_KEYS = {
+    "t_test": ("control_mean", "test_mean", "mean"),
+    "mannwhitney": ("control_median", "test_median", "median"),
+    "bayesian_conversions": (
+        "control_posterior_mean",
+        "test_posterior_mean",
+        "posterior_mean",
+    ),
+    "bayesian_means": ("control_mean", "test_mean", "mean"),
+}
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert NumPy/Python scalars to float, keeping None for missing values."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_default(obj: Any) -> Any:
+    """Make NumPy scalars/arrays and tuples JSON-serializable."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+def flatten_result(
+    results: Dict[str, Any],
+    experiment: str,
+    params: Optional[Dict[str, Any]] = None,
+    run_id: Optional[str] = None,
+    run_timestamp: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Flatten a result dict from ABTest.run_test into one row matching RESULTS_SCHEMA.
+
+    Parameters
+    ----------
+    results : dict
+        Output of ABTest.run_test (or of a hypothesis runner).
+    experiment : str
+        Experiment name used for partitioning (e.g. "recommendation").
+    params : dict, optional
+        Extra run parameters to keep with the result (threshold, seed, ...). Stored as
+        JSON together with any transform parameters found in `results`.
+    run_id : str, optional
+        Identifier of the run. A random UUID is used if omitted.
+    run_timestamp : datetime, optional
+        Time of the run (UTC now by default).
+    """
+    run_timestamp = run_timestamp or datetime.now(timezone.utc)
+    test_type = results.get("test_type")
+    main_test = results.get("main_test", {}) or {}
+    zero_test = results.get("zero_test", {}) or {}
+    alpha = _to_float(results.get("alpha", 0.05))
+
+    control_key, test_key, statistic_kind = _SUMMARY_KEYS.get(
+        test_type, (None, None, None)
+    )
+
+    if "sample_sizes" in main_test:
+        control_n, test_n = main_test["sample_sizes"]
+    else:
+        control_n = main_test.get("control_n", main_test.get("control_total"))
+        test_n = main_test.get("test_n", main_test.get("test_total"))
+
+    p_value = _to_float(main_test.get("p_value"))
+    extra = dict(params or {})
+    if "transform_params" in results:
+        extra["transform_params"] = results["transform_params"]
+
+    return {
+        "run_id": run_id or uuid.uuid4().hex,
+        "run_timestamp": run_timestamp,
+        "column": results.get("column"),
+        "test_type": test_type,
+        "transform": results.get("transform"),
+        "zero_inflation": bool(results.get("zero_inflation", False)),
+        "alpha": alpha,
+        "control_n": _to_int(control_n),
+        "test_n": _to_int(test_n),
+        "statistic_kind": statistic_kind,
+        "control_value": _to_float(main_test.get(control_key)),
+        "test_value": _to_float(main_test.get(test_key)),
+        "test_statistic": _to_float(main_test.get("test_statistic")),
+        "p_value": p_value,
+        "significant": (
+            bool(p_value < alpha)
+            if p_value is not None and not np.isnan(p_value)
+            else None
+        ),
+        "zero_test_statistic": _to_float(zero_test.get("chi2_statistic")),
+        "zero_test_p_value": _to_float(zero_test.get("p_value")),
+        "control_zero_rate": _to_float(zero_test.get("control_zero_rate")),
+        "test_zero_rate": _to_float(zero_test.get("test_zero_rate")),
+        "error": main_test.get("error"),
+        "params": json.dumps(extra, default=_json_default, sort_keys=True),
+        "experiment": experiment,
+        "run_date": run_timestamp.strftime("%Y-%m-%d"),
+    }
+
+
+class ResultsStore:
+    """
+    Append-only Parquet dataset of flattened A/B test results, partitioned by
+    experiment and run date.
+    """
+
+    def __init__(self, root: str = RESULTS_STORE_PATH):
+        self.root = root
+
+    def append(
+        self,
+        results: Dict[str, Any],
+        experiment: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Append one result dict (as returned by ABTest.run_test). Returns its run_id.
+        """
+        row = flatten_result(results, experiment, params=params)
+        self.append_rows([row])
+        return row["run_id"]
+
+    def append_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Append already flattened rows (see flatten_result) as new Parquet files.
+        """
+        if not rows:
+            return
+        table = pa.Table.from_pylist(rows, schema=RESULTS_SCHEMA)
+        os.makedirs(self.root, exist_ok=True)
+        pq.write_to_dataset(
+            table,
+            self.root,
+            partition_cols=PARTITION_COLS,
+            # Unique file names so nothing written earlier is ever overwritten
+            basename_template=f"{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def load(
+        self,
+        experiment: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Load stored results, pruning partitions by experiment and run date.
+
+        Parameters
+        ----------
+        experiment : str, optional
+            Only return results of this experiment.
+        start_date, end_date : str, optional
+            Inclusive run-date bounds in 'YYYY-MM-DD' format.
+        columns : iterable of str, optional
+            Only read these columns.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per stored result, sorted by run_timestamp. Empty if nothing is
+            stored yet.
+        """
+        if not os.path.exists(self.root):
+            return RESULTS_SCHEMA.empty_table().to_pandas()
+
+        filters = []
+        if experiment is not None:
+            filters.append(("experiment", "=", experiment))
+        if start_date is not None:
+            filters.append(("run_date", ">=", start_date))
+        if end_date is not None:
+            filters.append(("run_date", "<=", end_date))
+
+        table = pq.read_table(
+            self.root,
+            columns=list(columns) if columns is not None else None,
+            filters=filters or None,
+            schema=RESULTS_SCHEMA,
+            partitioning="hive",
+        )
+        df = table.to_pandas()
+        if "run_timestamp" in df.columns:
+            df = df.sort_values("run_timestamp", kind="stable").reset_index(drop=True)
+        return df
+
+    def diff(self, run_id_a: str, run_id_b: str) -> pd.DataFrame:
+        """
+        Side-by-side comparison of two stored runs, showing only the fields that differ.
+        """
+        df = self.load()
+        runs = df[df["run_id"].isin([run_id_a, run_id_b])].set_index("run_id")
+        missing = {run_id_a, run_id_b} - set(runs.index)
+        if missing:
+            raise KeyError(f"Unknown run_id(s): {sorted(missing)}")
+
+        pair = runs.loc[[run_id_a, run_id_b]].T
+        pair.columns = ["a", "b"]
+        changed = pair.apply(
+            lambda r: not (r["a"] == r["b"] or (pd.isna(r["a"]) and pd.isna(r["b"]))),
+            axis=1,
+        )
+        return pair[changed]
@@ -0,0 +1,482 @@
+# src/synthetic_data.py
+
+"""
+Synthetic Google Analytics sessions for scale testing.
+
+Generates session-level data with the schema returned by
+BigQueryClient.get_sessions_data, fully vectorized and reproducible from a seed:
+
+  - visitors with a heavy-tailed number of sessions (Zipf), visitNumber and dates
+    increasing per visitor;
+  - zero-inflated transactions (most sessions have none, a few visitors buy often);
+  - log-normal revenue in micros (as totals.totalTransactionRevenue);
+  - skewed (Zipf) traffic source and country cardinalities.
+
+Data is produced in chunks of visitors, so 10M-100M sessions can be written without
+holding them in memory. Two on-disk layouts are supported:
+
+  - "ga":   daily ga_sessions_YYYYMMDD.parquet files with the nested BigQuery export
+            layout, readable by LocalSessionsClient (src/local_sessions.py);
+  - "flat": part-NNNNN.parquet files with the flat get_sessions_data columns.
+
+Usage Example:
+-------------
+python -m src.synthetic_data --sessions 10000000 --out data/ga_sessions --seed 0
+"""
+
+import argparse
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Most common values in the public GA sample, padded with synthetic ones to reach the
+# requested cardinality
+TRAFFIC_SOURCES = [
+    "(direct)",
+    "google",
+    "youtube.com",
+    "analytics.google.com",
+    "Partners",
+    "dfa",
+    "google.com",
+    "m.facebook.com",
+    "baidu",
+    "sites.google.com",
+]
+SOURCE_MEDIUM = {"(direct)": "(none)", "google": "organic", "Partners": "affiliate"}
+COUNTRIES = [
+    "United States",
+    "India",
+    "United Kingdom",
+    "Canada",
+    "Vietnam",
+    "Turkey",
+    "Thailand",
+    "Germany",
+    "Brazil",
+    "Japan",
+]
+CITIES = [
+    "not available in demo dataset",
+    "Mountain View",
+    "New York",
+    "San Francisco",
+    "London",
+    "Bangalore",
+]
+CAMPAIGNS = ["(not set)", "Data Share Promo", "AW - Dynamic Search Ads Whole Site"]
+
+# Arrow -> pandas dtypes matching SESSION_DTYPES in src/data_extraction.py
+_PANDAS_TYPES = {pa.string(): pd.StringDtype(), pa.int64(): pd.Int64Dtype()}
+
+# Share of single-pageview sessions (P(0) of the pageview distribution)
+BOUNCE_RATE = 0.25
+
+# Cap on sessions per visitor when drawing from the Zipf distribution
+MAX_VISITS_PER_VISITOR = 500
+
+_FLAT_SCHEMA = pa.schema(
+    [
+        ("fullVisitorId", pa.string()),
+        ("visitId", pa.string()),
+        ("visitNumber", pa.int64()),
+        ("date", pa.timestamp("ns")),
+        ("pageviews", pa.int64()),
+        ("timeOnSite", pa.int64()),
+        ("transactions", pa.int64()),
+        ("totalTransactionRevenue", pa.int64()),
+        ("trafficSource", pa.string()),
+        ("trafficMedium", pa.string()),
+        ("trafficCampaign", pa.string()),
+        ("country", pa.string()),
+        ("city", pa.string()),
+    ]
+)
+
+_GA_SCHEMA = pa.schema(
+    [
+        ("fullVisitorId", pa.string()),
+        ("visitId", pa.int64()),
+        ("visitNumber", pa.int64()),
+        ("visitStartTime", pa.int64()),
+        ("date", pa.string()),
+        (
+            "totals",
+            pa.struct(
+                [
+                    ("pageviews", pa.int64()),
+                    ("timeOnSite", pa.int64()),
+                    ("transactions", pa.int64()),
+                    ("totalTransactionRevenue", pa.int64()),
+                ]
+            ),
+        ),
+        (
+            "trafficSource",
+            pa.struct(
+                [
+                    ("source", pa.string()),
+                    ("medium", pa.string()),
+                    ("campaign", pa.string()),
+                ]
+            ),
+        ),
+        (
+            "geoNetwork",
+            pa.struct([("country", pa.string()), ("city", pa.string())]),
+        ),
+    ]
+)
+
+
+def _category_names(base: List[str], n: int, prefix: str) -> List[str]:
+    """First n of base, padded with synthetic names when n > len(base)."""
+    return base[:n] + [f"{prefix}-{i}" for i in range(len(base), n)]
+
+
+def _zipf_choice(rng: np.random.Generator, n_categories: int, s: float, size: int):
+    """Category codes 0..n_categories-1 with P(k) proportional to 1 / (k + 1) ** s."""
+    weights = 1.0 / np.arange(1, n_categories + 1) ** s
+    cdf = np.cumsum(weights / weights.sum())
+    codes = np.searchsorted(cdf, rng.random(size), side="right")
+    return np.minimum(codes, n_categories - 1)
+
+
+def _expected_visits(revisit_exponent: float) -> float:
+    k = np.arange(1, MAX_VISITS_PER_VISITOR + 1, dtype=float)
+    p = k**-revisit_exponent
+    return float((k * p).sum() / p.sum())
+
+
+def _generate_chunk(
+    rng: np.random.Generator,
+    first_visitor: int,
+    n_visitors: int,
+    start: datetime,
+    n_days: int,
+    revisit_exponent: float,
+    conversion_rate: float,
+    mean_revenue: float,
+    sources: List[str],
+    countries: List[str],
+    skew: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Sessions of visitors first_visitor .. first_visitor + n_visitors - 1, as numpy
+    arrays (string columns as category codes, missing values as masks).
+    """
+    # Sessions per visitor (heavy-tailed), then one row per session
+    visits = np.minimum(rng.zipf(revisit_exponent, n_visitors), MAX_VISITS_PER_VISITOR)
+    n = int(visits.sum())
+    visitor = np.repeat(np.arange(n_visitors), visits)
+    starts = np.cumsum(visits) - visits
+    visit_number = np.arange(n) - np.repeat(starts, visits) + 1
+
+    # Days: first visit uniform over the period, later visits after geometric gaps
+    gaps = rng.geometric(0.3, n) - 1
+    gaps[starts] = rng.integers(0, n_days, n_visitors)
+    day = np.cumsum(gaps)
+    day -= np.repeat(day[starts] - gaps[starts], visits)
+    day = np.minimum(day, n_days - 1)
+
+    start_ts = int(start.timestamp())
+    visit_start = start_ts + day * 86400 + rng.integers(0, 86400, n)
+
+    # Engagement: bounces (1 pageview) have no timeOnSite, like the GA export
+    pageviews = 1 + rng.negative_binomial(1, BOUNCE_RATE, n)
+    time_on_site = np.round(rng.lognormal(5.0, 1.2, n)).astype(np.int64) + 1
+    bounced = pageviews == 1
+
+    # Zero-inflated transactions: a per-visitor propensity (Beta) so that a small
+    # share of visitors accounts for most purchases
+    # (bounced sessions never convert, so non-bounced ones convert more often)
+    a = 0.2
+    rate = min(conversion_rate / (1 - BOUNCE_RATE), 0.99)
+    propensity = rng.beta(a, a * (1 - rate) / rate, n_visitors)
+    buys = (rng.random(n) < propensity[visitor]) & ~bounced
+    transactions = 1 + rng.poisson(0.15, n)
+    sigma = 1.1
+    revenue = (
+        rng.lognormal(np.log(mean_revenue) - sigma**2 / 2, sigma, n) * transactions
+    )
+    # Revenue in micros, rounded to whole cents
+    revenue_micros = np.round(revenue * 100).astype(np.int64) * 10_000
+
+    # Skewed categorical attributes; traffic source and country stick to the visitor
+    # for most sessions
+    visitor_source = _zipf_choice(rng, len(sources), skew, n_visitors)
+    source = np.where(
+        rng.random(n) < 0.8,
+        visitor_source[visitor],
+        _zipf_choice(rng, len(sources), skew, n),
+    )
+    country = _zipf_choice(rng, len(countries), skew, n_visitors)[visitor]
+    city = _zipf_choice(rng, len(CITIES), 2.0, n)
+    campaign = _zipf_choice(rng, len(CAMPAIGNS), 3.0, n)
+
+    # Stable, GA-looking numeric visitor ids (a bijection on [0, 10**19))
+    global_visitor = (first_visitor + visitor).astype(np.uint64)
+    visitor_id = global_visitor * np.uint64(6364136223846793005) % np.uint64(10**19)
+
+    return {
+        "visitor_id": visitor_id,
+        "visitId": visit_start - rng.integers(0, 3, n),
+        "visitNumber": visit_number,
+        "visitStartTime": visit_start,
+        "day": day,
+        "pageviews": pageviews,
+        "timeOnSite": time_on_site,
+        "timeOnSite_null": bounced,
+        "transactions": transactions,
+        "revenue": revenue_micros,
+        "transactions_null": ~buys,
+        "source": source,
+        "country": country,
+        "city": city,
+        "campaign": campaign,
+    }
+
+
+def _take(names: List[str], codes: np.ndarray) -> pa.Array:
+    return pa.array(names, pa.string()).take(pa.array(codes))
+
+
+def _to_table(
+    chunk: Dict[str, np.ndarray],
+    start: datetime,
+    sources: List[str],
+    countries: List[str],
+    layout: str,
+) -> pa.Table:
+    """Build an Arrow table in the flat or nested GA layout from a generated chunk."""
+    if layout != "flat":
+        # Like the daily export tables, rows are ordered by date. Reorder the whole
+        # chunk before building any column, so every row stays one session.
+        order = np.argsort(chunk["day"], kind="stable")
+        chunk = {k: v[order] for k, v in chunk.items()}
+    mediums = [SOURCE_MEDIUM.get(s, "referral") for s in sources]
+    visitor_id = pa.array(chunk["visitor_id"]).cast(pa.string())
+    pageviews = pa.array(chunk["pageviews"])
+    time_on_site = pa.array(chunk["timeOnSite"], mask=chunk["timeOnSite_null"])
+    transactions = pa.array(chunk["transactions"], mask=chunk["transactions_null"])
+    revenue = pa.array(chunk["revenue"], mask=chunk["transactions_null"])
+    source = _take(sources, chunk["source"])
+    medium = _take(mediums, chunk["source"])
+    campaign = _take(CAMPAIGNS, chunk["campaign"])
+    country = _take(countries, chunk["country"])
+    city = _take(CITIES, chunk["city"])
+
+    if layout == "flat":
+        start_ns = np.datetime64(start.strftime("%Y-%m-%d"), "ns")
+        dates = start_ns + chunk["day"].astype("timedelta64[D]")
+        return pa.Table.from_arrays(
+            [
+                visitor_id,
+                pa.array(chunk["visitId"]).cast(pa.string()),
+                pa.array(chunk["visitNumber"]),
+                pa.array(dates),
+                pageviews,
+                time_on_site,
+                transactions,
+                revenue,
+                source,
+                medium,
+                campaign,
+                country,
+                city,
+            ],
+            schema=_FLAT_SCHEMA,
+        )
+
+    day_names = [
+        (start + timedelta(days=d)).strftime("%Y%m%d")
+        for d in range(int(chunk["day"].max()) + 1)
+    ]
+    return pa.Table.from_arrays(
+        [
+            visitor_id,
+            pa.array(chunk["visitId"]),
+            pa.array(chunk["visitNumber"]),
+            pa.array(chunk["visitStartTime"]),
+            _take(day_names, chunk["day"]),
+            pa.StructArray.from_arrays(
+                [pageviews, time_on_site, transactions, revenue],
+                fields=list(_GA_SCHEMA.field("totals").type),
+            ),
+            pa.StructArray.from_arrays(
+                [source, medium, campaign],
+                fields=list(_GA_SCHEMA.field("trafficSource").type),
+            ),
+            pa.StructArray.from_arrays(
+                [country, city], fields=list(_GA_SCHEMA.field("geoNetwork").type)
+            ),
+        ],
+        schema=_GA_SCHEMA,
+    )
+
+
+def iter_session_tables(
+    n_sessions: int,
+    start_date: str = "20170101",
+    n_days: int = 90,
+    seed: int = 0,
+    chunk_size: int = 1_000_000,
+    layout: str = "flat",
+    revisit_exponent: float = 3.0,
+    conversion_rate: float = 0.015,
+    mean_revenue: float = 120.0,
+    n_sources: int = 200,
+    n_countries: int = 200,
+    skew: float = 1.3,
+) -> Iterator[pa.Table]:
+    """
+    Yield Arrow tables of about chunk_size sessions each, n_sessions in total.
+
+    Parameters
+    ----------
+    n_sessions : int
+        Total number of sessions.
+    start_date : str
+        First day ('YYYYMMDD'); sessions span n_days days.
+    seed : int
+        Random seed. The output only depends on the seed and the parameters
+        (including chunk_size).
+    chunk_size : int
+        Approximate number of sessions per chunk (bounds memory use).
+    layout : {"flat", "ga"}
+        Flat get_sessions_data columns, or the nested BigQuery export layout.
+    revisit_exponent : float
+        Zipf exponent of sessions per visitor (3.0 gives about 1.4 sessions/visitor).
+    conversion_rate : float
+        Average share of sessions with a transaction.
+    mean_revenue : float
+        Mean revenue per transaction, in currency units.
+    n_sources, n_countries : int
+        Cardinality of traffic sources and countries.
+    skew : float
+        Zipf exponent of the source/country frequencies.
+    """
+    if layout not in ("flat", "ga"):
+        raise ValueError(f"Unsupported layout: {layout}")
+    start = datetime.strptime(str(start_date), "%Y%m%d")
+    sources = _category_names(TRAFFIC_SOURCES, n_sources, "source")
+    countries = _category_names(COUNTRIES, n_countries, "country")
+    visitors_per_chunk = max(
+        1, math.ceil(chunk_size / _expected_visits(revisit_exponent))
+    )
+
+    produced = 0
+    chunk_index = 0
+    while produced < n_sessions:
+        rng = np.random.default_rng([seed, chunk_index])
+        chunk = _generate_chunk(
+            rng,
+            chunk_index * visitors_per_chunk,
+            visitors_per_chunk,
+            start,
+            n_days,
+            revisit_exponent,
+            conversion_rate,
+            mean_revenue,
+            sources,
+            countries,
+            skew,
+        )
+        # The last chunk drops its trailing visitors' sessions to hit n_sessions
+        remaining = n_sessions - produced
+        chunk = {k: v[:remaining] for k, v in chunk.items()}
+        table = _to_table(chunk, start, sources, countries, layout)
+        produced += table.num_rows
+        chunk_index += 1
+        yield table
+
+
+def generate_sessions(n_sessions: int, seed: int = 0, **kwargs) -> pd.DataFrame:
+    """
+    Generate n_sessions synthetic sessions in memory, with the same columns and
+    dtypes as BigQueryClient.get_sessions_data. See iter_session_tables for options.
+    """
+    tables = list(iter_session_tables(n_sessions, seed=seed, layout="flat", **kwargs))
+    return pa.concat_tables(tables).to_pandas(types_mapper=_PANDAS_TYPES.get)
+
+
+def write_sessions_parquet(
+    out_dir: str,
+    n_sessions: int,
+    seed: int = 0,
+    layout: str = "ga",
+    **kwargs,
+) -> List[str]:
+    """
+    Write n_sessions synthetic sessions as Parquet, chunk by chunk.
+
+    layout="ga" writes one ga_sessions_YYYYMMDD.parquet per day (each chunk becomes
+    one row group per day), layout="flat" writes one part-NNNNN.parquet per chunk.
+    Returns the written paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tables = iter_session_tables(n_sessions, seed=seed, layout=layout, **kwargs)
+
+    if layout == "flat":
+        paths = []
+        for i, table in enumerate(tables):
+            path = os.path.join(out_dir, f"part-{i:05d}.parquet")
+            pq.write_table(table, path)
+            paths.append(path)
+        print(f"Wrote {n_sessions} sessions to {len(paths)} files in {out_dir}.")
+        return paths
+
+    writers: Dict[str, pq.ParquetWriter] = {}
+    paths = []
+    try:
+        for table in tables:
+            # Rows are ordered by date: append one row group per daily file
+            encoded = table.column("date").combine_chunks().dictionary_encode()
+            codes = encoded.indices.to_numpy()
+            days = encoded.dictionary.to_pylist()
+            bounds = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+            for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(codes)]):
+                day = days[codes[lo]]
+                if day not in writers:
+                    path = os.path.join(out_dir, f"ga_sessions_{day}.parquet")
+                    writers[day] = pq.ParquetWriter(path, _GA_SCHEMA)
+                    paths.append(path)
+                writers[day].write_table(table.slice(lo, hi - lo))
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    print(f"Wrote {n_sessions} sessions to {len(paths)} daily files in {out_dir}.")
+    return sorted(paths)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic GA sessions.")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--out", default="data/ga_sessions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--layout", choices=["ga", "flat"], default="ga")
+    parser.add_argument("--start-date", default="20170101")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    write_sessions_parquet(
+        args.out,
+        args.sessions,
+        seed=args.seed,
+        layout=args.layout,
+        start_date=args.start_date,
+        n_days=args.days,
+        chunk_size=args.chunk_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
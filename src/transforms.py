@@ -0,0 +1,309 @@
+# src/transforms.py
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import special, stats
+
+from src.fingerprint import fingerprint_array
+
+# Fitted Box-Cox parameters, keyed by (cache_key, data fingerprint, sample size, seed)
+_BOXCOX_CACHE: "OrderedDict[Tuple, Dict[str, float]]" = OrderedDict()
+BOXCOX_CACHE_SIZE = 128
+
+
+def partition_percentiles(arr: np.ndarray, percentiles: Iterable[float]) -> np.ndarray:
+    """
+    Compute several percentiles of `arr` with a single np.partition pass.
+
+    Uses the same "linear" interpolation as np.percentile, but instead of one
+    sort-equivalent pass per percentile, all required order statistics are
+    selected at once.
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        1-D numeric array without NaN values.
+    percentiles : iterable of float
+        Percentiles in [0, 100].
+
+    Returns
+    -------
+    np.ndarray
+        One value per requested percentile (NaN for an empty input).
+    """
+    arr = np.asarray(arr, dtype=float)
+    q = np.asarray(list(percentiles), dtype=float) / 100.0
+    n = arr.size
+    if n == 0:
+        return np.full(q.shape, np.nan)
+
+    pos = q * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    part = np.partition(arr, np.unique(np.concatenate([lo, hi])))
+
+    # Same lerp formulation as numpy's linear method
+    a = part[lo]
+    b = part[hi]
+    t = pos - lo
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def compute_cut_points(
+    arr: np.ndarray,
+    transform: str,
+    winsor_p: float = 95.0,
+    trim_p: float = 95.0,
+) -> Dict[str, float]:
+    """
+    Compute the clipping/trimming thresholds needed by "winsor" or "trim".
+
+    Returns {"low": ..., "high": ...} for "winsor", {"high": ...} for "trim",
+    and an empty dict for any other transform.
+    """
+    if transform == "winsor":
+        # Lower bound mirrors the upper one only when winsor_p < 50, otherwise min
+        low_p = 100 - winsor_p if winsor_p < 50 else 0.0
+        low, high = partition_percentiles(arr, [low_p, winsor_p])
+        return {"low": float(low), "high": float(high)}
+
+    if transform == "trim":
+        (high,) = partition_percentiles(arr, [trim_p])
+        return {"high": float(high)}
+
+    return {}
+
+
+def fit_boxcox(
+    arr: np.ndarray, sample_size: Optional[int] = None, seed: int = 0
+) -> Dict[str, float]:
+    """
+    Fit Box-Cox parameters on `arr` (or a random subsample of it).
+
+    Returns {"shift": ..., "lambda": ...}, where shift makes the data strictly
+    positive and lambda is the maximum-likelihood estimate, as in stats.boxcox.
+    """
+    arr = np.asarray(arr, dtype=float)
+    shift = 0.0
+    if arr.min() <= 0:
+        shift = abs(arr.min()) + 1e-9
+
+    if sample_size is not None and arr.size > sample_size:
+        rng = np.random.default_rng(seed)
+        arr = rng.choice(arr, size=sample_size, replace=False)
+
+    lmbda = stats.boxcox_normmax(arr + shift, method="mle")
+    return {"shift": float(shift), "lambda": float(lmbda)}
+
+
+def fit_boxcox_cached(
+    arr: np.ndarray,
+    cache_key: Hashable = None,
+    sample_size: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Like fit_boxcox, but reuse a previous fit for the same data and cache_key
+    (typically the column name). The cache is bounded to BOXCOX_CACHE_SIZE entries.
+    Callers get a copy, so modifying the result does not change the cache.
+    """
+    key = (cache_key, fingerprint_array(arr), sample_size, seed)
+    if key in _BOXCOX_CACHE:
+        _BOXCOX_CACHE.move_to_end(key)
+        return dict(_BOXCOX_CACHE[key])
+
+    params = fit_boxcox(arr, sample_size=sample_size, seed=seed)
+    _BOXCOX_CACHE[key] = dict(params)
+    if len(_BOXCOX_CACHE) > BOXCOX_CACHE_SIZE:
+        _BOXCOX_CACHE.popitem(last=False)
+    return params
+
+
+def apply_boxcox(arr: np.ndarray, params: Dict[str, float]) -> np.ndarray:
+    """Apply previously fitted Box-Cox parameters (see fit_boxcox) to `arr`."""
+    return special.boxcox(arr + params["shift"], params["lambda"])
+
+
+def apply_transform(
+    arr: np.ndarray,
+    transform: str,
+    add_constant: float = 1.0,
+    winsor_p: float = 95.0,
+    trim_p: float = 95.0,
+    cut_points: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Apply a chosen transformation to a numeric array.
+    transform: "none", "log", "winsor", "trim" or "boxcox".
+
+    For "winsor"/"trim", precomputed `cut_points` (see compute_cut_points) can be
+    passed in, e.g. to clip several groups at the same pooled thresholds.
+    For "boxcox", `cut_points` holds the fitted {"shift", "lambda"}; if omitted,
+    the parameters are fitted on `arr` itself.
+    """
+    if transform == "none":
+        return arr
+
+    elif transform == "log":
+        return np.log(arr + add_constant)
+
+    elif transform in ("winsor", "trim"):
+        if len(arr) == 0:
+            return arr
+        if cut_points is None:
+            cut_points = compute_cut_points(arr, transform, winsor_p, trim_p)
+
+        if transform == "winsor":
+            return np.clip(arr, cut_points["low"], cut_points["high"])
+        return arr[arr <= cut_points["high"]]
+
+    elif transform == "boxcox":
+        if len(arr) == 0:
+            return arr
+        if cut_points is None:
+            cut_points = fit_boxcox(arr)
+        return apply_boxcox(arr, cut_points)
+
+    return arr
+
+
+def transform_arms(
+    arrays: List[np.ndarray],
+    transform: str,
+    add_constant: float = 1.0,
+    winsor_p: float = 95.0,
+    trim_p: float = 95.0,
+    pooled_thresholds: bool = False,
+    boxcox_sample_size: Optional[int] = None,
+    cache_key: Hashable = None,
+) -> Tuple[List[np.ndarray], Optional[Dict[str, float]], List[Dict[str, float]]]:
+    """
+    Transform any number of arrays (experiment arms) together; see transform_groups.
+
+    Returns
+    -------
+    transformed, pooled_params, arm_params
+        pooled_params is the shared parameter dict when pooled_thresholds is True
+        (else None); arm_params has the parameters used for each array. Both are
+        empty when the transform has no fitted parameters.
+    """
+    if transform not in ("winsor", "trim", "boxcox"):
+        transformed = [
+            apply_transform(arr, transform, add_constant, winsor_p, trim_p)
+            for arr in arrays
+        ]
+        return transformed, None, [{} for _ in arrays]
+
+    def _fit(arr: np.ndarray, pooled: bool) -> Dict[str, float]:
+        if transform == "boxcox":
+            if pooled:
+                return fit_boxcox_cached(
+                    arr, cache_key=cache_key, sample_size=boxcox_sample_size
+                )
+            return fit_boxcox(arr)
+        return compute_cut_points(arr, transform, winsor_p, trim_p)
+
+    pooled = None
+    if pooled_thresholds:
+        pooled_vals = np.concatenate(arrays)
+        pooled = _fit(pooled_vals, pooled=True) if len(pooled_vals) else {}
+        arm_params = [pooled for _ in arrays]
+    else:
+        arm_params = [_fit(arr, pooled=False) if len(arr) else {} for arr in arrays]
+
+    transformed = [
+        apply_transform(arr, transform, add_constant, winsor_p, trim_p, cut_points=p)
+        for arr, p in zip(arrays, arm_params)
+    ]
+    return transformed, pooled, arm_params
+
+
+def transform_pooled(
+    values: np.ndarray,
+    valid: np.ndarray,
+    transform: str,
+    add_constant: float = 1.0,
+    winsor_p: float = 95.0,
+    trim_p: float = 95.0,
+    boxcox_sample_size: Optional[int] = None,
+    cache_key: Hashable = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform values[valid] with parameters fitted on all of them, keeping the
+    positions of the rows. For analyses where every split of the rows into groups
+    pools to the same population (threshold sweeps, item screens), these equal the
+    pooled parameters of every split.
+
+    Returns (valid, transformed): valid with rows dropped by "trim" switched off,
+    and a full-length array with the transformed values at valid rows and 0
+    elsewhere (so it can be summed directly).
+    """
+    valid = valid.copy()
+    x = values[valid]
+    if transform == "trim":
+        cut = compute_cut_points(x, "trim", trim_p=trim_p) if x.size else {}
+        if x.size:
+            valid[np.flatnonzero(valid)[x > cut["high"]]] = False
+            x = x[x <= cut["high"]]
+    else:
+        (x,), _, _ = transform_arms(
+            [x],
+            transform,
+            add_constant,
+            winsor_p,
+            trim_p,
+            pooled_thresholds=True,
+            boxcox_sample_size=boxcox_sample_size,
+            cache_key=cache_key,
+        )
+    transformed = np.zeros(len(values))
+    transformed[valid] = x
+    return valid, transformed
+
+
+def transform_groups(
+    control: np.ndarray,
+    test: np.ndarray,
+    transform: str,
+    add_constant: float = 1.0,
+    winsor_p: float = 95.0,
+    trim_p: float = 95.0,
+    pooled_thresholds: bool = False,
+    boxcox_sample_size: Optional[int] = None,
+    cache_key: Hashable = None,
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, Dict[str, float]]]:
+    """
+    Transform control and test arrays together.
+
+    If pooled_thresholds is True, "winsor"/"trim" cut points (or the Box-Cox
+    lambda) are computed once on the pooled data so both groups end up on the
+    same scale. Otherwise each group gets its own parameters (the historical
+    behaviour). Pooled Box-Cox fits can use a random subsample of
+    `boxcox_sample_size` values and are cached under `cache_key`.
+
+    Returns
+    -------
+    control_vals, test_vals, params
+        params is {"pooled": {...}} or {"control": {...}, "test": {...}}, or
+        empty when the transform has no fitted parameters.
+    """
+    (control_vals, test_vals), pooled, (control_params, test_params) = transform_arms(
+        [control, test],
+        transform,
+        add_constant,
+        winsor_p,
+        trim_p,
+        pooled_thresholds=pooled_thresholds,
+        boxcox_sample_size=boxcox_sample_size,
+        cache_key=cache_key,
+    )
+    if transform not in ("winsor", "trim", "boxcox"):
+        params = {}
+    elif pooled is not None:
+        params = {"pooled": pooled}
+    else:
+        params = {"control": control_params, "test": test_params}
+    return control_vals, test_vals, params
@@ -7,12 +7,18 @@ while intelligently handling numeric, date/time, and categorical columns.
 Author: [Your Name]
 """
 
+import json
+import os
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
+from src.data_io import load_frame, save_frame
+from src.instrumentation import instrumented, stage
 
+
+@instrumented()
 def aggregate_user_data(
     df: pd.DataFrame,
     user_id_col: str,
@@ -24,6 +30,8 @@ def aggregate_user_data(
     custom_strategies: Optional[Dict[str, Callable[[pd.Series], any]]] = None,
     exclude_columns: Optional[List[str]] = None,
     datetime_formats: Optional[Dict[str, str]] = None,
+    backend: str = "pandas",
+    presorted: Optional[bool] = None,
 ) -> pd.DataFrame:
     """
     Aggregate a session/visit-level DataFrame to one row per user, including all columns.
@@ -40,6 +48,13 @@ def aggregate_user_data(
     If you want a **column-specific** aggregator that differs from the default, define it in
     custom_strategies={ col_name: callable }, which overrides the default for that column.
 
+    Any strategy can also be a named reducer from REDUCERS, which runs vectorized over the
+    whole column: "mode", "unique", "nunique", "last", "quantile:q", "topk:k",
+    "count_distinct_days" (add more with register_reducer). Other names ("sum", "std", ...)
+    go to pandas' groupby. Callables are called once per user in Python, which is much
+    slower; with instrumentation on, they are timed as a separate stage flagged
+    slow_path=True.
+
     Optionally, handle a `group_col` that indicates user group assignment:
       - If a user appears in multiple groups, handle_multi_group = {"exclude", "first", "all"}.
 
@@ -70,7 +85,7 @@ def aggregate_user_data(
         - "first": take the first encountered non-null value in df order.
     custom_strategies : dict, optional
         A dictionary {column_name: aggregator} for column-specific logic, e.g.:
-          { "deviceCategory": lambda s: s.mode()[0] }
+          { "deviceCategory": "mode", "city": "topk:3" }
         This overrides the default numeric/date/categorical strategy for that column.
     exclude_columns : list of str, optional
         List of columns to exclude entirely from the aggregation.
@@ -78,6 +93,19 @@ def aggregate_user_data(
         For columns that are object/string but actually contain dates, you can specify
         {col_name: format_string} to parse them as datetime before aggregation.
         e.g. { "InvoiceDate": "%Y-%m-%d %H:%M:%S" }
+    backend : {"pandas", "polars"}, default "pandas"
+        Execution engine. "polars" runs the same aggregation as a multithreaded Polars
+        query (see src/polars_backend.py), which is much faster for the named
+        strategies; callable strategies still run in Python, once per user.
+    presorted : bool, optional
+        (pandas backend) Whether df is sorted by the grouping keys (user_id_col, plus group_col with
+        handle_multi_group="all"), e.g. sessions queried ORDER BY fullVisitorId, visitNumber.
+        Sorted data is aggregated over runs of equal keys (np.add.reduceat and friends)
+        instead of hashing the keys, which is several times faster for "sum", "mean",
+        "count", "min", "max", "first" and "last". None (default) checks the order and
+        uses the sorted path if it holds; True raises a ValueError if df is not sorted;
+        False always hashes. Float sums can differ from the hashed path in the last
+        digits, as pandas uses compensated summation.
 
     Returns
     -------
@@ -88,20 +116,25 @@ def aggregate_user_data(
           - If handle_multi_group="exclude" or "first", user_df has exactly one group per user.
           - If handle_multi_group="all", some users may appear in multiple rows with different groups.
     """
+    if backend == "polars":
+        from src.polars_backend import aggregate_user_data_polars
 
-    df_work = df.copy()
-
-    # 2) Identify columns to exclude
-    if exclude_columns:
-        df_work.drop(
-            columns=[c for c in exclude_columns if c in df_work.columns], inplace=True
+        return aggregate_user_data_polars(
+            df,
+            user_id_col,
+            group_col=group_col,
+            handle_multi_group=handle_multi_group,
+            numeric_strategy=numeric_strategy,
+            date_strategy=date_strategy,
+            categorical_strategy=categorical_strategy,
+            custom_strategies=custom_strategies,
+            exclude_columns=exclude_columns,
+            datetime_formats=datetime_formats,
         )
+    elif backend != "pandas":
+        raise ValueError(f"Unsupported backend: {backend}")
 
-    # 0) Parse datetime columns if specified in datetime_formats
-    if datetime_formats:
-        for col, fmt in datetime_formats.items():
-            if col in df_work.columns:
-                df_work[col] = pd.to_datetime(df_work[col], format=fmt, errors="coerce")
+    df_work = _prepare_columns(df, exclude_columns, datetime_formats)
 
     # 1) If group_col is provided, handle multi-group users first
     if group_col and handle_multi_group in ("exclude", "first"):
@@ -130,7 +163,96 @@ def aggregate_user_data(
 
             df_work = df_work[df_work.apply(_matches_first_group, axis=1)]
 
-    # 3) Determine column types for the remaining columns (besides user_id_col, group_col)
+    # 2) Determine column types and build an aggregation dictionary
+    # If handle_multi_group="all" and group_col is not None, we want to group by [user_id_col, group_col].
+    # Otherwise, just group by user_id_col.
+    group_keys = [user_id_col]
+    if group_col and handle_multi_group == "all":
+        group_keys.append(group_col)
+
+    agg_functions, stringify = _resolve_strategies(
+        df_work,
+        user_id_col,
+        group_col,
+        numeric_strategy,
+        date_strategy,
+        categorical_strategy,
+        custom_strategies,
+    )
+
+    # 3) Perform the groupby aggregation, over runs of equal keys if df is sorted
+    starts = None
+    if presorted or presorted is None:
+        if df_work[group_keys].isna().any(axis=None):
+            df_work = df_work.dropna(subset=group_keys)
+        starts = _run_starts(df_work, group_keys)
+        if starts is None and presorted:
+            raise ValueError(f"df is not sorted by {group_keys} (presorted=True).")
+    if starts is not None:
+        user_df = _sorted_aggregate(
+            df_work, group_keys, agg_functions, stringify, starts
+        )
+    else:
+        user_df = _groupby_aggregate(df_work, group_keys, agg_functions, stringify)
+
+    # 4) Re-incorporate the group_col if handle_multi_group != "all"
+    #    For "exclude" or "first", each user has at most one group, so we can just pick it.
+    if group_col and handle_multi_group in ("exclude", "first"):
+        # Each user is now unique, so let's get the group from the original df_work
+        # after filtering multi-group. We'll just pick the first or unique group
+        # for that user
+        if starts is not None:
+            user_df[group_col] = _reduce_runs(df_work[group_col], "first", starts)
+        else:
+            group_map = (
+                df_work.groupby(user_id_col)[group_col].first().to_frame(group_col)
+            )
+            user_df = user_df.merge(group_map, on=user_id_col, how="left")
+
+    return user_df
+
+
+# ------------------------------------------------------------------
+# Internal helpers to create aggregator functions dynamically
+# ------------------------------------------------------------------
+
+
+def _prepare_columns(
+    df: pd.DataFrame,
+    exclude_columns: Optional[List[str]],
+    datetime_formats: Optional[Dict[str, str]],
+) -> pd.DataFrame:
+    """A copy of df without the excluded columns, with date strings parsed."""
+    df_work = df.copy()
+
+    # Identify columns to exclude
+    if exclude_columns:
+        df_work.drop(
+            columns=[c for c in exclude_columns if c in df_work.columns], inplace=True
+        )
+
+    # Parse datetime columns if specified in datetime_formats
+    if datetime_formats:
+        for col, fmt in datetime_formats.items():
+            if col in df_work.columns:
+                df_work[col] = pd.to_datetime(df_work[col], format=fmt, errors="coerce")
+    return df_work
+
+
+def _resolve_strategies(
+    df_work: pd.DataFrame,
+    user_id_col: str,
+    group_col: Optional[str],
+    numeric_strategy: Union[str, Callable],
+    date_strategy: Union[str, Callable],
+    categorical_strategy: Union[str, Callable],
+    custom_strategies: Optional[Dict[str, Union[str, Callable]]],
+) -> Tuple[Dict[str, Union[str, Callable]], List[str]]:
+    """
+    The strategy of every column except the user and group columns, ordered numeric,
+    datetime, then categorical columns, and the columns whose results are converted
+    to strings (those on a default categorical strategy).
+    """
     candidate_cols = [c for c in df_work.columns if c not in [user_id_col]]
     if group_col and (group_col in candidate_cols):
         # We handle group_col after numeric/categorical/datetime are aggregated
@@ -149,47 +271,37 @@ def aggregate_user_data(
         else:
             categorical_cols.append(col)
 
-    # 4) Build an aggregation dictionary
-    # If handle_multi_group="all" and group_col is not None, we want to group by [user_id_col, group_col].
-    # Otherwise, just group by user_id_col.
-    group_keys = [user_id_col]
-    if group_col and handle_multi_group == "all":
-        group_keys.append(group_col)
-
-    # We'll create an agg_dict per column based on strategies
-    # But we rely on a fallback aggregator function that calls the right approach
-    all_cols = numeric_cols + datetime_cols + categorical_cols
+    defaults = {
+        "numeric": _make_numeric_aggregator(numeric_strategy),
+        "datetime": _make_date_aggregator(date_strategy),
+        "categorical": _make_categorical_aggregator(categorical_strategy),
+    }
     agg_functions = {}
+    # Columns on a default categorical strategy: results are strings, "" if empty
+    stringify = []
 
-    for col in all_cols:
-        if custom_strategies and col in custom_strategies:
-            agg_functions[col] = custom_strategies[col]
-        else:
-            if col in numeric_cols:
-                agg_functions[col] = _make_numeric_aggregator(numeric_strategy)
-            elif col in datetime_cols:
-                agg_functions[col] = _make_date_aggregator(date_strategy)
-            else:  # categorical
-                agg_functions[col] = _make_categorical_aggregator(categorical_strategy)
-
-    # 5) Perform the groupby aggregation
-    user_df = df_work.groupby(group_keys, as_index=False).agg(agg_functions)
-
-    # 6) Re-incorporate the group_col if handle_multi_group != "all"
-    #    For "exclude" or "first", each user has at most one group, so we can just pick it.
-    if group_col and handle_multi_group in ("exclude", "first"):
-        # Each user is now unique, so let's get the group from the original df_work
-        # after filtering multi-group. We'll just pick the first or unique group
-        # for that user
-        group_map = df_work.groupby(user_id_col)[group_col].first().to_frame(group_col)
-        user_df = user_df.merge(group_map, on=user_id_col, how="left")
-
-    return user_df
+    for kind, cols in [
+        ("numeric", numeric_cols),
+        ("datetime", datetime_cols),
+        ("categorical", categorical_cols),
+    ]:
+        for col in cols:
+            is_custom = bool(custom_strategies) and col in custom_strategies
+            strategy = custom_strategies[col] if is_custom else defaults[kind]
+            agg_functions[col] = strategy
+            if is_stringified(kind, strategy, is_custom):
+                stringify.append(col)
+    return agg_functions, stringify
 
 
-# ------------------------------------------------------------------
-# Internal helpers to create aggregator functions dynamically
-# ------------------------------------------------------------------
+def is_stringified(kind: str, strategy: Union[str, Callable], is_custom: bool) -> bool:
+    """
+    Whether the results of a column of kind ("numeric", "datetime", "categorical")
+    aggregated with strategy are converted to strings (str() of each value, "" if
+    missing): those of categorical columns on a named default strategy. Shared by
+    the pandas and Polars backends.
+    """
+    return kind == "categorical" and not is_custom and not callable(strategy)
 
 
 def _make_numeric_aggregator(
@@ -237,38 +349,760 @@ def _make_date_aggregator(
 
 def _make_categorical_aggregator(
     strategy: Union[str, Callable]
-) -> Callable[[pd.Series], str]:
+) -> Union[str, Callable[[pd.Series], str]]:
     """
-    Returns a function that aggregates categorical/string data:
+    Returns the reducer for categorical/string data:
       - "majority" : most frequent value
       - "unique"   : sorted unique values joined by '|'
       - "first"    : first non-null value
-    or a custom callable.
+    or a custom callable. aggregate_user_data converts the results to strings.
     """
-    if callable(strategy):
-        return strategy
+    return strategy
+
+
+# ------------------------------------------------------------------
+# Named reducers
+# ------------------------------------------------------------------
+
+# name -> reducer(values, codes, n_groups, arg) returning one value per group as a
+# Series indexed 0..n_groups-1. values holds the rows of one column and codes their
+# group number (groups are numbered in sorted key order); arg is the part after ":"
+# in strategies such as "quantile:0.9" (None if absent). Reducers work on the whole
+# column at once, so they cost about as much as pandas' built-in reducers.
+REDUCERS: Dict[str, Callable[..., pd.Series]] = {}
+
+
+def register_reducer(name: str) -> Callable:
+    """Decorator adding a vectorized reducer to REDUCERS under name."""
+
+    def decorator(func: Callable[..., pd.Series]) -> Callable[..., pd.Series]:
+        REDUCERS[name] = func
+        return func
+
+    return decorator
+
+
+def parse_strategy(strategy: str) -> Tuple[str, Optional[str]]:
+    """Split a strategy such as "topk:3" into its name and argument ("topk", "3")."""
+    name, _, arg = strategy.partition(":")
+    return name, (arg or None)
+
+
+def _value_counts(values: pd.Series, codes: np.ndarray) -> tuple:
+    """
+    Distinct non-missing values of each group with their counts, as arrays
+    (group, value, count) sorted by group, then value.
+    """
+    keep = values.notna().to_numpy()
+    pairs = pd.DataFrame(
+        {"group": codes[keep], "value": values[keep].reset_index(drop=True)}
+    )
+    counts = pairs.groupby(["group", "value"], sort=True, observed=True).size()
+    return (
+        counts.index.get_level_values(0).to_numpy(),
+        counts.index.get_level_values(1),
+        counts.to_numpy(),
+    )
+
+
+def _by_frequency(group: np.ndarray, value: pd.Index, count: np.ndarray) -> tuple:
+    """
+    Reorder _value_counts output most frequent first within each group (ties keep
+    value order, as Series.mode), and add the rank of each value within its group.
+    """
+    order = np.lexsort((-count, group))  # stable: equal counts stay in value order
+    group, value = group[order], value[order]
+    starts = np.r_[True, group[1:] != group[:-1]] if len(group) else np.array([], bool)
+    start_pos = np.maximum.accumulate(np.where(starts, np.arange(len(group)), 0))
+    return group, value, np.arange(len(group)) - start_pos
+
+
+def _join_per_group(
+    group: np.ndarray, value: pd.Index, n_groups: int, sep: str = "|"
+) -> pd.Series:
+    """Join the (group-contiguous) values of each group into one string."""
+    out = np.full(n_groups, "", dtype=object)
+    if len(group):
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        ends = np.r_[starts[1:], len(group)]
+        strings = list(value.astype(str))
+        out[group[starts]] = [sep.join(strings[a:b]) for a, b in zip(starts, ends)]
+    return pd.Series(out)
+
+
+# Reducers that only need each group's value counts, called with the arrays of
+# _value_counts: reducer(group, value, count, n_groups, arg). UserAggregateState keeps
+# these counts, so the strategies below can be maintained incrementally.
+
+
+def _mode_of_counts(group, value, count, n_groups, arg=None) -> pd.Series:
+    """Most frequent non-missing value; ties go to the smallest value."""
+    group, value, rank = _by_frequency(group, value, count)
+    top = rank == 0
+    return pd.Series(value[top], index=group[top]).reindex(range(n_groups))
+
 
-    def majority_value(s: pd.Series) -> str:
-        # mode could have multiple values, pick the first
-        mode_vals = s.mode(dropna=True)
-        return str(mode_vals.iloc[0]) if not mode_vals.empty else ""
-
-    def unique_values(s: pd.Series) -> str:
-        unique_set = sorted(s.dropna().unique())
-        return "|".join(str(x) for x in unique_set)
-
-    def first_value(s: pd.Series) -> str:
-        for val in s:
-            if pd.notnull(val):
-                return str(val)
-        return ""
-
-    if strategy == "majority":
-        return majority_value
-    elif strategy == "unique":
-        return unique_values
-    elif strategy == "first":
-        return first_value
+def _topk_of_counts(group, value, count, n_groups, arg=None) -> pd.Series:
+    """The k (default 3) most frequent values, joined by '|', most frequent first."""
+    k = int(arg) if arg else 3
+    group, value, rank = _by_frequency(group, value, count)
+    top = rank < k
+    return _join_per_group(group[top], value[top], n_groups)
+
+
+def _unique_of_counts(group, value, count, n_groups, arg=None) -> pd.Series:
+    """Sorted distinct values joined by '|' ("" if none)."""
+    return _join_per_group(group, value, n_groups)
+
+
+def _nunique_of_counts(group, value, count, n_groups, arg=None) -> pd.Series:
+    """Number of distinct non-missing values."""
+    return pd.Series(np.bincount(group, minlength=n_groups))
+
+
+_COUNT_REDUCERS = {
+    "mode": _mode_of_counts,
+    "majority": _mode_of_counts,
+    "topk": _topk_of_counts,
+    "unique": _unique_of_counts,
+    "nunique": _nunique_of_counts,
+    # counts of calendar days (see _days)
+    "count_distinct_days": _nunique_of_counts,
+}
+
+
+def _days(values: pd.Series) -> pd.Series:
+    """Calendar day of datetimes or date strings."""
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values, errors="coerce")
+    return values.dt.normalize()
+
+
+def _counted(name: str) -> Callable[..., pd.Series]:
+    """REDUCERS entry computing the value counts, then the _COUNT_REDUCERS reducer."""
+    reduce_counts = _COUNT_REDUCERS[name]
+
+    def reducer(values, codes, n_groups, arg=None) -> pd.Series:
+        if name == "count_distinct_days":
+            values = _days(values)
+        return reduce_counts(*_value_counts(values, codes), n_groups, arg)
+
+    reducer.__doc__ = reduce_counts.__doc__
+    return reducer
+
+
+for _name in _COUNT_REDUCERS:
+    register_reducer(_name)(_counted(_name))
+
+
+@register_reducer("last")
+def _last(values, codes, n_groups, arg=None) -> pd.Series:
+    """Last non-missing value in row order."""
+    return values.groupby(codes).last().reindex(range(n_groups))
+
+
+@register_reducer("quantile")
+def _quantile(values, codes, n_groups, arg=None) -> pd.Series:
+    """Quantile q (default 0.5), with linear interpolation."""
+    q = float(arg) if arg else 0.5
+    if values.dtype.kind == "b":
+        # Booleans as 0/1 (pandas deprecates quantiles of booleans)
+        masked = pd.api.types.is_extension_array_dtype(values.dtype)
+        values = values.astype("Float64" if masked else np.float64)
+    return values.groupby(codes).quantile(q).reindex(range(n_groups))
+
+
+def _as_strings(result: pd.Series, dtype) -> pd.Series:
+    """str() of every value, "" for missing ones; in the column's string dtype."""
+    strings = result.astype(object).where(result.notna(), "").astype(str)
+    return strings.astype(dtype) if isinstance(dtype, pd.StringDtype) else strings
+
+
+def _groupby_aggregate(
+    df: pd.DataFrame,
+    group_keys: List[str],
+    agg_functions: Dict[str, Union[str, Callable]],
+    stringify: List[str],
+) -> pd.DataFrame:
+    """
+    Aggregate df to one row per group (sorted by group_keys, rows with missing keys
+    dropped). Strategies in REDUCERS run vectorized over each column, other names
+    ("sum", "mean", ...) in pandas' groupby, and callables once per group; the
+    latter are recorded as a separate "slow_path" instrumentation stage.
+    """
+    grouped = df.groupby(group_keys, sort=True)
+    user_df = grouped.size().index.to_frame(index=False)
+
+    callables = {c: f for c, f in agg_functions.items() if callable(f)}
+    reducers = {
+        c: parse_strategy(f)
+        for c, f in agg_functions.items()
+        if not callable(f) and parse_strategy(f)[0] in REDUCERS
+    }
+    builtin = {
+        c: f
+        for c, f in agg_functions.items()
+        if c not in callables and c not in reducers
+    }
+
+    results = {}
+    if builtin:
+        results.update(grouped.agg(builtin).reset_index(drop=True).items())
+    if reducers:
+        group_codes = grouped.ngroup()
+        valid = group_codes.notna().to_numpy()
+        codes = group_codes.to_numpy()[valid].astype(np.int64)
+        for col, (name, arg) in reducers.items():
+            values = df[col] if valid.all() else df[col][valid]
+            results[col] = REDUCERS[name](values, codes, grouped.ngroups, arg)
+    if callables:
+        with stage(
+            "aggregate_callable_strategies",
+            rows_in=len(df),
+            slow_path=True,
+            columns=list(callables),
+        ):
+            slow = grouped.agg(callables).reset_index(drop=True)
+        results.update(slow.items())
+
+    for col in agg_functions:
+        result = results[col].reset_index(drop=True)
+        user_df[col] = (
+            _as_strings(result, df[col].dtype) if col in stringify else result
+        )
+    return user_df
+
+
+# ------------------------------------------------------------------
+# Aggregation of data sorted by the group keys
+# ------------------------------------------------------------------
+
+
+def _run_starts(df: pd.DataFrame, group_keys: List[str]) -> Optional[np.ndarray]:
+    """
+    Start positions of the runs of equal keys if df (without missing keys) is sorted
+    by group_keys, else None.
+    """
+    # Cheap early exit for unsorted data (stops at the first decrease)
+    if len(df) == 0 or not df[group_keys[0]].is_monotonic_increasing:
+        return None
+    # Integer keys (e.g. encoded visitor IDs, see src/visitor_ids.py) compare natively
+    keys = [
+        df[k].to_numpy()
+        if isinstance(df[k].dtype, np.dtype)
+        else df[k].to_numpy(object)
+        for k in group_keys
+    ]
+    changed = np.zeros(len(df) - 1, dtype=bool)
+    try:
+        for key in keys:
+            # Sorted: at each row the first differing key (if any) increases
+            if (key[1:][~changed] < key[:-1][~changed]).any():
+                return None
+            changed |= key[1:] != key[:-1]
+    except TypeError:
+        # Keys that cannot be compared (e.g. mixed str/int) are not sorted
+        return None
+    return np.concatenate([[0], np.flatnonzero(changed) + 1])
+
+
+def _reduce_runs(
+    values: pd.Series, name: str, starts: np.ndarray
+) -> Optional[pd.Series]:
+    """
+    values reduced over the runs beginning at starts with "sum", "mean", "count", "min",
+    "max", "first" or "last", matching pandas' groupby (missing values skipped). None
+    for other strategies and for dtypes without a run reduction (strings for
+    "sum"/"mean"/"min"/"max", ...).
+    """
+    present = values.notna().to_numpy()
+    n_present = np.add.reduceat(present.astype(np.int64), starts)
+    # Nullable integer/float columns: pandas returns nullable results for them
+    masked = isinstance(values.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray))
+    if name == "count":
+        return pd.Series(n_present, dtype="Int64" if masked else None)
+    if name in ("first", "last"):
+        # Position of the first/last present value in each run
+        pos = np.arange(len(values))
+        if name == "first":
+            pick = np.minimum.reduceat(np.where(present, pos, len(values)), starts)
+        else:
+            pick = np.maximum.reduceat(np.where(present, pos, -1), starts)
+        found = n_present > 0
+        result = values.iloc[np.where(found, pick, 0)].reset_index(drop=True)
+        return result if found.all() else result.where(found)
+    if name not in ("sum", "mean", "min", "max"):
+        return None
+
+    dtype = values.dtype
+    if dtype.kind == "M" and not masked and name in ("min", "max"):
+        if getattr(dtype, "tz", None) is not None:
+            return None
+        # NaT is the smallest int64; replace it by the identity of the reduction
+        data = values.to_numpy().view(np.int64)
+        fill = np.iinfo(np.int64).max if name == "min" else np.iinfo(np.int64).min
+        ufunc = np.minimum if name == "min" else np.maximum
+        out = ufunc.reduceat(np.where(present, data, fill), starts)
+        out[n_present == 0] = np.iinfo(np.int64).min
+        return pd.Series(out.view(dtype))
+    if dtype.kind not in "biuf" or (
+        isinstance(dtype, pd.api.extensions.ExtensionDtype) and not masked
+    ):
+        return None
+
+    if name in ("sum", "mean"):
+        if masked or dtype.kind in "biu":
+            data = values.to_numpy(
+                dtype=np.float64 if dtype.kind == "f" else np.int64, na_value=0
+            )
+        else:
+            data = np.where(present, values.to_numpy(), 0.0)
+        total = np.add.reduceat(data, starts)
+        if name == "sum":
+            return pd.Series(total, dtype=dtype if masked else None)
+        mean = np.where(n_present > 0, total / np.maximum(n_present, 1), np.nan)
+        return pd.Series(mean, dtype="Float64" if masked else np.float64)
+
+    # min / max
+    ufunc = np.minimum if name == "min" else np.maximum
+    if dtype.kind == "b":
+        return pd.Series(ufunc.reduceat(values.to_numpy(), starts))
+    if dtype.kind == "f":
+        fill = np.inf if name == "min" else -np.inf
+        target = np.float64
     else:
-        # fallback
-        return strategy
+        info = np.iinfo(np.int64)
+        fill = info.max if name == "min" else info.min
+        target = np.int64
+    data = values.to_numpy(dtype=target, na_value=fill) if masked else values.to_numpy()
+    out = pd.Series(ufunc.reduceat(np.where(present, data, fill), starts))
+    if masked:
+        return pd.Series(pd.array(out, dtype=dtype)).where(n_present > 0)
+    return out.where(n_present > 0) if dtype.kind == "f" else out
+
+
+def _sorted_aggregate(
+    df: pd.DataFrame,
+    group_keys: List[str],
+    agg_functions: Dict[str, Union[str, Callable]],
+    stringify: List[str],
+    starts: np.ndarray,
+) -> pd.DataFrame:
+    """
+    _groupby_aggregate for df sorted by group_keys without missing keys, whose runs of
+    equal keys begin at starts. REDUCERS get the run numbers as group codes; other
+    strategies without a run reduction are aggregated by _groupby_aggregate over them.
+    """
+    user_df = df[group_keys].iloc[starts].reset_index(drop=True)
+    runs = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(df))))
+    results = {}
+    rest = {}
+    for col, strategy in agg_functions.items():
+        result = None
+        if not callable(strategy):
+            result = _reduce_runs(df[col], strategy, starts)
+            name, arg = parse_strategy(strategy)
+            if result is None and name in REDUCERS:
+                result = REDUCERS[name](df[col], runs, len(starts), arg)
+        if result is None:
+            rest[col] = strategy
+        else:
+            results[col] = result
+    if rest:
+        by_run = df[list(rest)].assign(_run=runs)
+        slow = _groupby_aggregate(by_run, ["_run"], rest, [])
+        results.update(slow.drop(columns="_run").items())
+
+    for col in agg_functions:
+        result = results[col].reset_index(drop=True)
+        user_df[col] = (
+            _as_strings(result, df[col].dtype) if col in stringify else result
+        )
+    return user_df
+
+
+# ------------------------------------------------------------------
+# Incremental aggregation
+# ------------------------------------------------------------------
+
+# Mergeable per-key statistics kept for each strategy; the strategies in
+# _COUNT_REDUCERS keep value counts instead
+_STATE_STATS = {
+    "sum": ("sum",),
+    "mean": ("sum", "count"),
+    "count": ("count",),
+    "min": ("min",),
+    "max": ("max",),
+    "first": ("first", "first_seq"),
+    "last": ("last", "last_seq"),
+}
+# How two partial values of a statistic combine
+_COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+# Sequence number (position in the order sessions were added) of a key's first session
+_FIRST_SEEN = "_first_seen"
+
+
+def _upsert(old, new, combine: Callable):
+    """
+    old (DataFrame or Series indexed by key) with new's rows folded in: rows of keys
+    already in old are replaced by combine(both rows), other rows are appended.
+    Only the rows of new's keys are recomputed.
+    """
+    if old is None or len(old) == 0:
+        return new
+    pos = old.index.get_indexer(new.index)
+    hit = pos >= 0
+    if hit.any():
+        both = combine(pd.concat([old.iloc[pos[hit]], new[hit]]))
+        both = both.reindex(new.index[hit])
+        if isinstance(old, pd.Series):
+            old.iloc[pos[hit]] = both.array
+        else:
+            for j, col in enumerate(old.columns):
+                old.iloc[pos[hit], j] = both[col].array
+    return pd.concat([old, new[~hit]]) if not hit.all() else old
+
+
+def _sum_counts(counts: pd.Series) -> pd.Series:
+    levels = list(range(counts.index.nlevels))
+    return counts.groupby(level=levels, sort=False, dropna=False).sum()
+
+
+class UserAggregateState:
+    """
+    Incrementally maintained aggregate_user_data output.
+
+    Instead of the sessions, the state keeps mergeable statistics per user (and group):
+    sums, counts, minima/maxima, first/last values with their position, and value
+    counts for the frequency-based strategies ("majority", "unique", "nunique", "topk",
+    "count_distinct_days"). update() folds in new sessions, touching only the users that
+    appear in them, and to_user_df() rebuilds exactly what aggregate_user_data returns
+    for all sessions added so far (in the order they were added). The state can be
+    saved to and loaded from a directory of Parquet files.
+
+    Strategies that need all of a user's values ("median", "quantile:q", "std",
+    callables, ...) cannot be maintained this way and raise a ValueError.
+
+    Usage Example:
+    -------------
+    state = UserAggregateState("fullVisitorId", numeric_strategy="mean",
+                               custom_strategies={"transactions": "sum"})
+    state.update(history_df)
+    state.save("data/user_state")
+
+    # next day
+    state = UserAggregateState.load("data/user_state")
+    state.update(new_sessions_df)
+    state.save("data/user_state")
+    user_df = state.to_user_df()
+    """
+
+    def __init__(
+        self,
+        user_id_col: str,
+        group_col: Optional[str] = None,
+        handle_multi_group: str = "exclude",
+        numeric_strategy: str = "sum",
+        date_strategy: str = "min",
+        categorical_strategy: str = "majority",
+        custom_strategies: Optional[Dict[str, str]] = None,
+        exclude_columns: Optional[List[str]] = None,
+        datetime_formats: Optional[Dict[str, str]] = None,
+    ):
+        """Same parameters as aggregate_user_data (strategies must be names)."""
+        if handle_multi_group not in ("exclude", "first", "all"):
+            raise ValueError(f"Unsupported handle_multi_group: {handle_multi_group}")
+        self.params = {
+            "user_id_col": user_id_col,
+            "group_col": group_col,
+            "handle_multi_group": handle_multi_group,
+            "numeric_strategy": numeric_strategy,
+            "date_strategy": date_strategy,
+            "categorical_strategy": categorical_strategy,
+            "custom_strategies": dict(custom_strategies or {}),
+            "exclude_columns": list(exclude_columns or []),
+            "datetime_formats": dict(datetime_formats or {}),
+        }
+        # State is kept per (user, group) so multi-group users can be resolved at the end
+        self.keys = [user_id_col] + ([group_col] if group_col else [])
+        self.n_rows = 0
+        # column -> strategy; set from the first sessions added
+        self.strategies: Optional[Dict[str, str]] = None
+        self.stringify: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.stats: Optional[pd.DataFrame] = None
+        self.counts: Dict[str, pd.Series] = {}
+
+    # --------------------------------------------------------------
+    # Building and merging state
+    # --------------------------------------------------------------
+
+    def _init_columns(self, df_work: pd.DataFrame) -> None:
+        p = self.params
+        strategies, self.stringify = _resolve_strategies(
+            df_work,
+            p["user_id_col"],
+            p["group_col"],
+            p["numeric_strategy"],
+            p["date_strategy"],
+            p["categorical_strategy"],
+            p["custom_strategies"],
+        )
+        for col, strategy in strategies.items():
+            name = None if callable(strategy) else parse_strategy(strategy)[0]
+            if name not in _STATE_STATS and name not in _COUNT_REDUCERS:
+                raise ValueError(
+                    f"Column '{col}': strategy {strategy!r} cannot be maintained "
+                    "incrementally; supported are "
+                    f"{sorted(set(_STATE_STATS) | set(_COUNT_REDUCERS))}."
+                )
+        self.strategies = strategies
+        self.dtypes = {col: str(dtype) for col, dtype in df_work.dtypes.items()}
+
+    def _batch_state(self, df: pd.DataFrame, offset: int) -> tuple:
+        """Statistics and value counts of df's sessions, numbered from offset."""
+        p = self.params
+        df_work = _prepare_columns(df, p["exclude_columns"], p["datetime_formats"])
+        if self.strategies is None:
+            self._init_columns(df_work)
+        missing = set(self.strategies) - set(df_work.columns)
+        if missing:
+            raise ValueError(f"Sessions are missing columns {sorted(missing)}.")
+
+        keys = self.keys
+        # Rows without a user (or, with "all", without a group) are never aggregated
+        valid = df_work[p["user_id_col"]].notna().to_numpy()
+        if p["group_col"] and p["handle_multi_group"] == "all":
+            valid &= df_work[p["group_col"]].notna().to_numpy()
+        frame = df_work.loc[valid, keys + list(self.strategies)]
+        seq = pd.Series(offset + np.flatnonzero(valid), index=frame.index, dtype=float)
+        grouped = frame.groupby(keys, sort=False, dropna=False)
+
+        stats = {_FIRST_SEEN: seq.groupby([frame[k] for k in keys], dropna=False).min()}
+        counts = {}
+        for col, strategy in self.strategies.items():
+            name = parse_strategy(strategy)[0]
+            if name in _COUNT_REDUCERS:
+                values = (
+                    _days(frame[col]) if name == "count_distinct_days" else frame[col]
+                )
+                present = values.notna()
+                counts[col] = (
+                    pd.DataFrame(
+                        {
+                            **{k: frame.loc[present, k] for k in keys},
+                            "_value": values[present],
+                        }
+                    )
+                    .groupby(keys + ["_value"], sort=False, dropna=False, observed=True)
+                    .size()
+                    .rename("count")
+                )
+                continue
+            for stat in _STATE_STATS[name]:
+                if stat in ("sum", "count", "min", "max"):
+                    stats[f"{col}:{stat}"] = grouped[col].agg(stat)
+                elif stat in ("first", "last"):
+                    # Value and sequence number of the first/last non-missing value
+                    present = frame[col].notna()
+                    pick = (
+                        pd.DataFrame(
+                            {col: frame.loc[present, col], "seq": seq[present]}
+                        )
+                        .groupby([frame.loc[present, k] for k in keys], dropna=False)
+                        .agg(stat)
+                    )
+                    stats[f"{col}:{stat}"] = pick[col]
+                    stats[f"{col}:{stat}_seq"] = pick["seq"]
+        stats = pd.concat(stats, axis=1, sort=False)
+        stats.index.names = keys
+        return stats, counts, len(df_work)
+
+    def _combine_stats(self, stats: pd.DataFrame) -> pd.DataFrame:
+        """Combine rows of stats with the same key."""
+        levels = list(range(stats.index.nlevels))
+        combine = {_FIRST_SEEN: "min"}
+        ordered = []
+        for col in stats.columns:
+            stat = col.rsplit(":", 1)[-1]
+            if stat in _COMBINE:
+                combine[col] = _COMBINE[stat]
+            elif stat in ("first", "last"):
+                ordered.append((col, stat))
+        out = stats.groupby(level=levels, sort=False, dropna=False).agg(combine)
+        for col, stat in ordered:
+            # The value with the smallest (first) or largest (last) sequence number
+            pair = stats[[col, f"{col}_seq"]].sort_values(f"{col}_seq")
+            picked = pair.groupby(level=levels, sort=False, dropna=False).agg(stat)
+            out[col] = picked[col]
+            out[f"{col}_seq"] = picked[f"{col}_seq"]
+        return out[stats.columns]
+
+    def _fold(self, stats: pd.DataFrame, counts: Dict[str, pd.Series], n_rows: int):
+        self.stats = _upsert(self.stats, stats, self._combine_stats)
+        for col, col_counts in counts.items():
+            self.counts[col] = _upsert(self.counts.get(col), col_counts, _sum_counts)
+        self.n_rows += n_rows
+
+    def update(self, sessions: pd.DataFrame) -> "UserAggregateState":
+        """
+        Add sessions that come after all sessions added so far (e.g. a new day).
+        Returns self.
+        """
+        self._fold(*self._batch_state(sessions, self.n_rows))
+        return self
+
+    def merge(self, other: "UserAggregateState") -> "UserAggregateState":
+        """
+        Fold in another state built with the same parameters, whose sessions come
+        after this state's sessions. Returns self.
+        """
+        if other.params != self.params:
+            raise ValueError("Only states with the same parameters can be merged.")
+        if other.stats is None:
+            return self
+        if self.strategies is None:
+            self.strategies, self.stringify = other.strategies, other.stringify
+            self.dtypes = other.dtypes
+        stats = other.stats.copy()
+        seq_cols = [_FIRST_SEEN] + [c for c in stats.columns if c.endswith("_seq")]
+        stats[seq_cols] += self.n_rows
+        counts = {col: c.copy() for col, c in other.counts.items()}
+        self._fold(stats, counts, other.n_rows)
+        return self
+
+    # --------------------------------------------------------------
+    # Output
+    # --------------------------------------------------------------
+
+    def _resolve_groups(self) -> tuple:
+        """
+        Statistics and value counts per output key, after the multi-group handling,
+        plus the group of each user (for "exclude" and "first").
+        """
+        p = self.params
+        stats, counts = self.stats, self.counts
+        if not (p["group_col"] and p["handle_multi_group"] in ("exclude", "first")):
+            return stats, counts, None
+
+        # Missing groups are matched by position/user, not by label, as None and NaN
+        # (e.g. after a save/load round trip) do not reliably compare equal in an index
+        users = stats.index.get_level_values(0)
+        groups = pd.Series(stats.index.get_level_values(1), index=users)
+        if p["handle_multi_group"] == "exclude":
+            # Drop users seen in more than one (non-missing) group; merge the rest
+            n_groups = groups.groupby(level=0).nunique()
+            keep = ~users.isin(n_groups.index[n_groups > 1])
+            stats = self._combine_stats(stats[keep].droplevel(1))
+            group = groups[keep].groupby(level=0, sort=False).first()
+            counts = {
+                col: _sum_counts(
+                    c[c.index.get_level_values(0).isin(stats.index)].droplevel(1)
+                )
+                for col, c in counts.items()
+            }
+        else:
+            # Keep only each user's first group (the one of the user's first session)
+            first_seen = pd.Series(stats[_FIRST_SEEN].to_numpy())
+            keep = np.zeros(len(stats), dtype=bool)
+            keep[first_seen.groupby(users.to_numpy()).idxmin().to_numpy()] = True
+            stats = stats[keep].droplevel(1)
+            group = groups[keep]
+            counts = {col: self._in_groups(c, group) for col, c in counts.items()}
+        return stats, counts, group
+
+    @staticmethod
+    def _in_groups(counts: pd.Series, group: pd.Series) -> pd.Series:
+        """The value counts of each user's group in group (indexed by user)."""
+        users = counts.index.get_level_values(0)
+        actual = np.asarray(counts.index.get_level_values(1), dtype=object)
+        wanted = np.asarray(group.reindex(users), dtype=object)
+        match = (actual == wanted) | (pd.isna(actual) & pd.isna(wanted))
+        return counts[match].droplevel(1)
+
+    def to_user_df(self) -> pd.DataFrame:
+        """
+        One row per user (and group with handle_multi_group="all"), identical to
+        aggregate_user_data over all sessions added so far.
+        """
+        if self.stats is None:
+            raise ValueError("No sessions have been added yet.")
+        p = self.params
+        stats, counts, group = self._resolve_groups()
+        stats = stats.sort_index()
+        user_df = stats.index.to_frame(index=False)
+        n_groups = len(stats)
+
+        for col, strategy in self.strategies.items():
+            name, arg = parse_strategy(strategy)
+            if name in _COUNT_REDUCERS:
+                col_counts = counts[col].sort_index()
+                codes = stats.index.get_indexer(col_counts.index.droplevel(-1))
+                result = _COUNT_REDUCERS[name](
+                    codes,
+                    col_counts.index.get_level_values(-1),
+                    col_counts.to_numpy(),
+                    n_groups,
+                    arg,
+                )
+            elif name == "mean":
+                n = stats[f"{col}:count"]
+                result = (stats[f"{col}:sum"] / n.where(n > 0)).where(n > 0)
+            else:
+                result = stats[f"{col}:{name}"]
+            result = result.reset_index(drop=True)
+            if col in self.stringify:
+                result = _as_strings(
+                    result, pd.api.types.pandas_dtype(self.dtypes[col])
+                )
+            user_df[col] = result
+
+        if group is not None:
+            user_df[p["group_col"]] = group.reindex(stats.index).to_numpy()
+        return user_df
+
+    # --------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write the state to directory path (Parquet files plus state.json)."""
+        os.makedirs(path, exist_ok=True)
+        count_files = {}
+        if self.stats is not None:
+            save_frame(self.stats.reset_index(), os.path.join(path, "stats.parquet"))
+            for i, (col, c) in enumerate(self.counts.items()):
+                count_files[col] = f"counts_{i}.parquet"
+                save_frame(c.reset_index(), os.path.join(path, count_files[col]))
+        meta = {
+            "params": self.params,
+            "n_rows": self.n_rows,
+            "strategies": self.strategies,
+            "stringify": self.stringify,
+            "dtypes": self.dtypes,
+            "count_files": count_files,
+        }
+        # Written last, so an interrupted save never pairs new metadata with old data
+        tmp = os.path.join(path, "state.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(path, "state.json"))
+
+    @classmethod
+    def load(cls, path: str) -> "UserAggregateState":
+        """Read a state written by save()."""
+        with open(os.path.join(path, "state.json")) as f:
+            meta = json.load(f)
+        state = cls(**meta["params"])
+        state.n_rows = meta["n_rows"]
+        state.strategies = meta["strategies"]
+        state.stringify = meta["stringify"]
+        state.dtypes = meta["dtypes"]
+        if meta["strategies"] is not None:
+            state.stats = load_frame(os.path.join(path, "stats.parquet")).set_index(
+                state.keys
+            )
+            for col, name in meta["count_files"].items():
+                c = load_frame(os.path.join(path, name))
+                state.counts[col] = c.set_index(state.keys + ["_value"])["count"]
+        return state
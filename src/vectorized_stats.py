@@ -0,0 +1,200 @@
+# src/vectorized_stats.py
+
+"""
+Vectorized versions of the two-sample statistics used by ABTest.
+
+Each function evaluates many independent comparisons at once from sufficient
+statistics (counts, sums, sums of squares, rank sums), and matches the
+corresponding SciPy call used in ABTest._run_stat_test:
+  - student_t_test      <-> stats.ttest_ind (equal variances)
+  - mannwhitney_u_test  <-> stats.mannwhitneyu (asymptotic, continuity-corrected)
+  - chi2_2x2_test       <-> stats.chi2_contingency on a 2x2 table (Yates-corrected)
+  - chi2_goodness_of_fit <-> stats.chisquare (one row of counts per test)
+
+adjust_p_values applies multiple-comparison corrections (Holm, Bonferroni, BH).
+"""
+
+from typing import Tuple
+
+import numpy as np
+from scipy import stats
+
+
+def student_t_test(
+    n1: np.ndarray,
+    sum1: np.ndarray,
+    sumsq1: np.ndarray,
+    n2: np.ndarray,
+    sum2: np.ndarray,
+    sumsq2: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sample Student t-test from counts, sums and sums of squares.
+
+    Returns (t_statistic, p_value) arrays; NaN where either group has < 2 values
+    or the pooled variance is zero.
+    """
+    n1 = np.asarray(n1, dtype=float)
+    n2 = np.asarray(n2, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean1 = sum1 / n1
+        mean2 = sum2 / n2
+        ss1 = np.maximum(sumsq1 - n1 * mean1**2, 0.0)
+        ss2 = np.maximum(sumsq2 - n2 * mean2**2, 0.0)
+        dof = n1 + n2 - 2
+        pooled_var = (ss1 + ss2) / dof
+        se = np.sqrt(pooled_var * (1.0 / n1 + 1.0 / n2))
+        t_stat = (mean1 - mean2) / se
+        t_stat = np.where((n1 < 2) | (n2 < 2) | (se == 0), np.nan, t_stat)
+    p_val = 2 * stats.t.sf(np.abs(t_stat), dof)
+    return t_stat, p_val
+
+
+def tie_correction_term(sorted_values: np.ndarray) -> np.ndarray:
+    """
+    Sum of (t^3 - t) over tie groups, per row of a row-wise sorted 2-D array.
+    NaN values (sorted to the end of each row) are ignored.
+    """
+    x = np.atleast_2d(sorted_values)
+    n_rows, n_cols = x.shape
+    if n_cols == 0:
+        return np.zeros(n_rows)
+
+    valid = ~np.isnan(x)
+    # A new run starts at column 0 or wherever the value changes
+    starts = np.ones_like(valid)
+    starts[:, 1:] = x[:, 1:] != x[:, :-1]
+    starts &= valid
+
+    flat_starts = np.flatnonzero(starts.ravel())
+    run_rows = flat_starts // n_cols
+    # Runs end at the next start or at the row's last valid value
+    row_ends = np.arange(n_rows) * n_cols + valid.sum(axis=1)
+    next_start = np.append(flat_starts[1:], n_rows * n_cols)
+    run_ends = np.minimum(next_start, row_ends[run_rows])
+    lengths = (run_ends - flat_starts).astype(float)
+
+    return np.bincount(run_rows, weights=lengths**3 - lengths, minlength=n_rows)
+
+
+def mannwhitney_u_test(
+    rank_sum1: np.ndarray,
+    n1: np.ndarray,
+    n2: np.ndarray,
+    tie_term: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sided Mann-Whitney U test from the rank sum of the first sample.
+
+    Parameters
+    ----------
+    rank_sum1 : array
+        Sum of the pooled (average) ranks of the first sample.
+    n1, n2 : array
+        Sample sizes.
+    tie_term : array
+        Sum of (t^3 - t) over tie groups of the pooled sample (see tie_correction_term).
+
+    Returns
+    -------
+    (u_statistic, p_value)
+        u_statistic is U for the first sample, as returned by stats.mannwhitneyu.
+    """
+    n1 = np.asarray(n1, dtype=float)
+    n2 = np.asarray(n2, dtype=float)
+    n = n1 + n2
+    u1 = rank_sum1 - n1 * (n1 + 1) / 2
+    u = np.maximum(u1, n1 * n2 - u1)
+    mu = n1 * n2 / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        z = (u - mu - 0.5) / sigma
+    p_val = np.clip(2 * stats.norm.sf(z), 0, 1)
+    p_val = np.where((n1 < 1) | (n2 < 1), np.nan, p_val)
+    return u1, p_val
+
+
+def chi2_2x2_test(
+    a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Chi-square test with Yates' continuity correction for many 2x2 tables
+    [[a, b], [c, d]]. Returns (chi2_statistic, p_value).
+    """
+    obs = np.stack(np.broadcast_arrays(a, b, c, d), axis=-1).astype(float)
+    row1 = obs[..., 0] + obs[..., 1]
+    row2 = obs[..., 2] + obs[..., 3]
+    col1 = obs[..., 0] + obs[..., 2]
+    col2 = obs[..., 1] + obs[..., 3]
+    total = row1 + row2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = (
+            np.stack([row1 * col1, row1 * col2, row2 * col1, row2 * col2], axis=-1)
+            / total[..., None]
+        )
+        diff = expected - obs
+        corrected = obs + np.minimum(0.5, np.abs(diff)) * np.sign(diff)
+        chi2 = np.sum((corrected - expected) ** 2 / expected, axis=-1)
+    chi2 = np.where(np.any(expected == 0, axis=-1), np.nan, chi2)
+    return chi2, stats.chi2.sf(chi2, 1)
+
+
+def chi2_goodness_of_fit(
+    observed: np.ndarray, expected_props: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson chi-square goodness-of-fit test for many rows of category counts at once.
+
+    observed is (n_tests, k); expected_props is (k,) or (n_tests, k) and is
+    normalized per row. Returns (chi2_statistic, p_value) with k - 1 degrees of
+    freedom; NaN for rows without observations.
+    """
+    obs = np.atleast_2d(np.asarray(observed, dtype=float))
+    props = np.broadcast_to(np.asarray(expected_props, dtype=float), obs.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = props / props.sum(axis=1, keepdims=True) * obs.sum(axis=1)[:, None]
+        terms = np.where(
+            expected > 0,
+            (obs - expected) ** 2 / expected,
+            # Counts in a category expected to be empty are an infinite mismatch
+            np.where(obs > 0, np.inf, 0.0),
+        )
+    chi2 = np.where(obs.sum(axis=1) > 0, terms.sum(axis=1), np.nan)
+    return chi2, stats.chi2.sf(chi2, obs.shape[1] - 1)
+
+
+def adjust_p_values(p_values: np.ndarray, method: str = "holm") -> np.ndarray:
+    """
+    Adjust p-values for multiple comparisons.
+
+    method is one of "bonferroni", "holm" (step-down, controls FWER), "fdr_bh"
+    (Benjamini-Hochberg, controls FDR) or "none". NaN p-values are left as NaN and
+    do not count towards the number of comparisons.
+    """
+    p = np.asarray(p_values, dtype=float)
+    adjusted = np.full_like(p, np.nan)
+    valid = ~np.isnan(p)
+    pv = p[valid]
+    m = len(pv)
+    if m == 0 or method == "none":
+        adjusted[valid] = pv
+        return adjusted
+
+    if method == "bonferroni":
+        adj = pv * m
+    elif method == "holm":
+        order = np.argsort(pv)
+        stepped = np.maximum.accumulate(pv[order] * (m - np.arange(m)))
+        adj = np.empty(m)
+        adj[order] = stepped
+    elif method == "fdr_bh":
+        order = np.argsort(pv)[::-1]
+        ranks = m - np.arange(m)
+        stepped = np.minimum.accumulate(pv[order] * m / ranks)
+        adj = np.empty(m)
+        adj[order] = stepped
+    else:
+        raise ValueError(f"Unsupported correction method: {method}")
+
+    adjusted[valid] = np.minimum(adj, 1.0)
+    return adjusted
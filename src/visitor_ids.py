@@ -0,0 +1,144 @@
+# src/visitor_ids.py
+
+"""
+Dictionary encoding of visitor IDs as dense integer codes.
+
+fullVisitorId is a 19-digit string. Grouping, joining and hashing on it means hashing
+and comparing Python strings millions of times. VisitorIdEncoder replaces each ID by
+a dense int32/int64 code (0, 1, 2, ... in order of first appearance) once, right after
+extraction, so everything downstream works on integers.
+
+The mapping is persistent and append-only: codes of known IDs never change, and new
+IDs get the next free codes. It is stored as a directory of Parquet files, one per
+batch of new IDs, named after the first code in it:
+
+    <root>/ids-000000000000.parquet
+    <root>/ids-000001843211.parquet
+    ...
+
+Existing files are never rewritten, so codes stay valid in every table encoded
+with an older state of the mapping. decode() turns codes back into the original IDs.
+
+Usage Example:
+-------------
+encoder = VisitorIdEncoder.load("data/visitor_ids")
+sessions["fullVisitorId"] = encoder.encode(sessions["fullVisitorId"])
+encoder.save()                                    # appends the new IDs only
+
+user_df["fullVisitorId"] = encoder.decode(user_df["fullVisitorId"])
+"""
+
+import glob
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.config import VISITOR_ID_MAPPING_PATH
+
+ID_COLUMN = "visitor_id"
+_FILE_PATTERN = "ids-{:012d}.parquet"
+
+
+class VisitorIdEncoder:
+    """
+    Persistent, append-only mapping between visitor IDs (as strings) and dense
+    integer codes.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        An empty mapping. root is the directory it is saved to (None: in memory only);
+        use load() to continue an existing mapping.
+        """
+        self.root = root
+        # Known IDs in code order
+        self._ids = pd.Index([], dtype=object)
+        # Number of IDs already saved under root
+        self._n_saved = 0
+
+    @classmethod
+    def load(cls, root: str = VISITOR_ID_MAPPING_PATH) -> "VisitorIdEncoder":
+        """Read the mapping saved under root (an empty mapping if there is none)."""
+        parts = []
+        for path in sorted(glob.glob(os.path.join(root, "ids-*.parquet"))):
+            start = int(os.path.basename(path)[4:-8])
+            if start != sum(len(p) for p in parts):
+                raise ValueError(
+                    f"Visitor ID mapping {root} is missing codes before {path}."
+                )
+            parts.append(
+                pd.read_parquet(path, columns=[ID_COLUMN])[ID_COLUMN].to_numpy(object)
+            )
+        encoder = cls(root)
+        if parts:
+            encoder._ids = pd.Index(np.concatenate(parts), dtype=object)
+            encoder._n_saved = len(encoder._ids)
+        return encoder
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """int32 while the codes fit, int64 beyond."""
+        return np.dtype(
+            np.int32 if len(self._ids) <= np.iinfo(np.int32).max else np.int64
+        )
+
+    def encode(self, ids: pd.Series) -> pd.Series:
+        """
+        Codes of ids (same index), adding unknown IDs to the mapping. IDs are compared
+        as strings. Missing IDs stay missing (the codes then use the nullable Int32/Int64
+        dtype); otherwise the result is a plain int32/int64 column.
+        """
+        ids = pd.Series(ids)
+        row_codes, uniques = pd.factorize(ids)
+        uniques = np.asarray(uniques, dtype=object).astype(str).astype(object)
+        codes = self._ids.get_indexer(uniques)
+        new = codes < 0
+        if new.any():
+            codes[new] = len(self._ids) + np.arange(new.sum())
+            self._ids = self._ids.append(pd.Index(uniques[new], dtype=object))
+
+        missing = row_codes < 0
+        values = np.zeros(len(ids), dtype=self.dtype)
+        values[~missing] = codes[row_codes[~missing]]
+        if missing.any():
+            values = pd.array(
+                values,
+                dtype=pd.Int32Dtype() if self.dtype == np.int32 else pd.Int64Dtype(),
+            )
+            values[missing] = pd.NA
+        return pd.Series(values, index=ids.index, name=ids.name)
+
+    def decode(self, codes: pd.Series) -> pd.Series:
+        """The visitor IDs (string dtype) of codes, keeping missing codes missing."""
+        codes = pd.Series(codes)
+        missing = codes.isna().to_numpy()
+        positions = codes.to_numpy(dtype=np.int64, na_value=0)
+        if len(positions) and (
+            positions.min() < 0 or positions.max() >= len(self._ids)
+        ):
+            raise ValueError("Codes outside the visitor ID mapping.")
+        ids = self._ids.to_numpy()[positions]
+        if missing.any():
+            ids[missing] = None
+        return pd.Series(ids, index=codes.index, name=codes.name, dtype="string")
+
+    def save(self) -> None:
+        """Append the IDs added since the last save/load to the mapping under root."""
+        if self.root is None:
+            raise ValueError("This encoder has no root directory to save to.")
+        if self._n_saved == len(self._ids):
+            return
+        os.makedirs(self.root, exist_ok=True)
+        start = self._n_saved
+        new_ids = pd.DataFrame({ID_COLUMN: self._ids[start:].to_numpy(object)})
+        path = os.path.join(self.root, _FILE_PATTERN.format(start))
+        # Written to a temporary file and renamed, so a file that exists is complete
+        tmp = path + ".tmp"
+        new_ids.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        self._n_saved = len(self._ids)
@@ -1,4 +1,7 @@
+import hashlib
+import io
 import os
+from typing import Dict, Tuple
 
 import numpy as np
 import pandas as pd
@@ -6,9 +9,14 @@ import plotly.express as px
 import streamlit as st
 
 from src.ab_test_reporting import interpret_ab_results
-from src.hypothesis_pricing import run_pricing_test
+from src.assignment_health import format_health_report
+from src.data_io import FORMATS, find_data_file, load_frame, read_schema
+from src.hypothesis_pricing import run_pricing_test, sweep_pricing_thresholds
+
 # Hypothesis modules & reporting
 from src.hypothesis_recommendation import run_recommendation_test
+from src.result_cache import DEFAULT_RESULT_CACHE
+from src.results_store import ResultsStore
 
 ###############################################################################
 #  Utility Functions for Interactive Plots (Funnel, Campaign, Country, etc.)
@@ -105,6 +113,96 @@ def plot_country_bar(country_df: pd.DataFrame):
     return fig
 
 
+def show_assignment_health(result: dict):
+    """
+    Show the assignment-health report attached by a hypothesis runner, with the
+    segments that failed the SRM test.
+    """
+    health = result.get("assignment_health")
+    if health is None:
+        return
+    st.subheader("Assignment Health")
+    if health["healthy"]:
+        st.success("No sample ratio mismatch or multi-group users found.")
+    else:
+        st.warning("Assignment problems found: treat the results below with care.")
+    st.text(format_health_report(health))
+    failed = health["segments"][health["segments"]["srm"]]
+    if not failed.empty:
+        st.dataframe(failed)
+
+
+###############################################################################
+#        Cached Loading & Derived Frames (reused across Streamlit reruns)
+###############################################################################
+
+# Maximum number of datasets / derived-frame sets kept in the caches
+CACHE_MAX_ENTRIES = 4
+
+# data/user_agg_cleaned.feather, .parquet or .csv (first one found, see find_data_file)
+LOCAL_DATA_BASE = "data/user_agg_cleaned"
+
+# Non-numeric columns the app displays or tests; numeric columns are always offered
+APP_DIMENSION_COLUMNS = ["fullVisitorId", "trafficSource", "country"]
+
+
+def _format_from_name(name: str) -> str:
+    """Parquet/Feather if the file name says so, otherwise CSV."""
+    ext = os.path.splitext(name)[1].lower()
+    return FORMATS.get(ext, "csv")
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def load_local_schema(path: str, mtime: float) -> Dict[str, str]:
+    """Column names and dtypes of a local data file, without loading it."""
+    return read_schema(path)
+
+
+# cache_resource (not cache_data) so a large frame is not pickled/copied on every
+# rerun; the app never modifies the loaded frame in place.
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner="Loading data...")
+def load_local_data(path: str, mtime: float, columns: Tuple[str, ...]) -> pd.DataFrame:
+    """
+    Load the selected columns of a local data file. mtime is part of the cache key,
+    so edits to the file reload it.
+    """
+    return load_frame(path, columns=columns)
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner="Loading data...")
+def load_uploaded_data(content_hash: str, _content: bytes, name: str) -> pd.DataFrame:
+    """Parse an uploaded file once per distinct content (keyed on its hash)."""
+    return load_frame(io.BytesIO(_content), fmt=_format_from_name(name))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def compute_derived_frames(data_key: str, _df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the funnel, campaign and country aggregations once per dataset.
+    data_key identifies the dataset content; the frame itself is not hashed.
+    """
+    return {
+        "funnel": compute_funnel_data(_df),
+        "campaign": campaign_effectiveness(_df),
+        "country": country_conversion(_df),
+    }
+
+
+@st.cache_data(show_spinner=False)
+def load_history(root: str) -> pd.DataFrame:
+    """
+    All stored test results, read once and reused across reruns. save_to_history
+    clears the cache when it adds a result.
+    """
+    return ResultsStore(root).load()
+
+
+def save_to_history(store: ResultsStore, result: dict, **kwargs) -> None:
+    """Append a test result to the store and invalidate the cached history."""
+    store.append(result, **kwargs)
+    load_history.clear()
+
+
 ###############################################################################
 #                                Streamlit App
 ###############################################################################
@@ -121,21 +219,45 @@ def main():
 
     # Step 1: Load Data
     if data_choice == "Upload CSV":
-        uploaded_file = st.sidebar.file_uploader("Upload your user-level CSV")
+        uploaded_file = st.sidebar.file_uploader(
+            "Upload your user-level CSV (or Parquet)"
+        )
         if not uploaded_file:
             st.warning("Please upload a CSV to proceed.")
             st.stop()
-        df = pd.read_csv(uploaded_file)
+        content = uploaded_file.getvalue()
+        data_key = hashlib.sha1(content).hexdigest()
+        df = load_uploaded_data(data_key, content, uploaded_file.name)
         st.sidebar.success("CSV loaded successfully.")
     else:
-        local_path = "data/user_agg_cleaned.csv"
-        st.sidebar.write(f"Using local CSV: `{local_path}`")
+        # Prefer the binary (Feather/Parquet) copies when present, fall back to CSV
+        local_path = find_data_file(LOCAL_DATA_BASE) or LOCAL_DATA_BASE + ".csv"
+        st.sidebar.write(f"Using local file: `{local_path}`")
         if not os.path.exists(local_path):
             st.error(
                 f"No local file found at {local_path}. Please place user_level.csv in data/ folder."
             )
             st.stop()
-        df = pd.read_csv(local_path)
+        mtime = os.path.getmtime(local_path)
+
+        # Only read the columns the app actually displays or tests
+        schema = load_local_schema(local_path, mtime)
+        default_cols = [
+            c
+            for c, dtype in schema.items()
+            if c in APP_DIMENSION_COLUMNS
+            or pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+        ]
+        columns = st.sidebar.multiselect(
+            "Columns to load", list(schema), default=default_cols or list(schema)
+        )
+        if not columns:
+            st.warning("Please select at least one column to load.")
+            st.stop()
+        data_key = f"{local_path}:{mtime}:{'|'.join(columns)}"
+        df = load_local_data(local_path, mtime, tuple(columns))
+
+    derived = compute_derived_frames(data_key, df)
 
     st.write("## Data Preview")
     st.write(df.head(10))
@@ -158,7 +280,7 @@ def main():
 
     st.markdown("---")
     st.header("Conversion Funnel")
-    funnel_data = compute_funnel_data(df)
+    funnel_data = derived["funnel"]
     if st.button("Show Funnel"):
         funnel_fig = plot_funnel(funnel_data)
         st.plotly_chart(funnel_fig, use_container_width=True)
@@ -168,7 +290,7 @@ def main():
     st.header("Campaign Effectiveness")
     # If trafficSource exists, we show bar chart
     if "trafficSource" in df.columns and "transactions" in df.columns:
-        campaign_df = campaign_effectiveness(df)
+        campaign_df = derived["campaign"]
         if not campaign_df.empty:
             if st.button("Show Campaign Chart"):
                 camp_fig = plot_campaign_bar(campaign_df)
@@ -186,7 +308,7 @@ def main():
     st.markdown("---")
     st.header("Country-wise Conversion")
     if "country" in df.columns and "transactions" in df.columns:
-        country_df = country_conversion(df)
+        country_df = derived["country"]
         if not country_df.empty:
             if st.button("Show Country Chart"):
                 # Plot top 5
@@ -221,6 +343,16 @@ def main():
         "Transformation", ["none", "log", "winsor", "trim", "boxcox"], index=0
     )
     zero_inflation = st.checkbox("Zero Inflation?", value=False)
+    save_results = st.checkbox("Save results to history", value=False)
+    # Only the recommendation split is randomized; the pricing split follows revenue,
+    # so a "sample ratio mismatch" there says nothing about the assignment
+    check_assignment = st.checkbox(
+        "Check assignment health (SRM)",
+        value=hypothesis_choice == "Product Recommendation",
+        help="Test the split for sample ratio mismatch, overall and per segment, "
+        "before trusting the metric results. Only meaningful for randomized splits.",
+    )
+    store = ResultsStore()
 
     # Product Recommendation Hypothesis
     if hypothesis_choice == "Product Recommendation":
@@ -235,6 +367,17 @@ def main():
             else 0,
         )
 
+        assignment_method = st.radio(
+            "Assignment",
+            ["random", "hash"],
+            horizontal=True,
+            help="'hash' assigns each user by a salted hash of fullVisitorId, so groups "
+            "stay the same across runs and data refreshes.",
+        )
+        salt = "recommendation"
+        if assignment_method == "hash":
+            salt = st.text_input("Experiment salt", value="recommendation")
+
         if st.button("Run Product Recommendation Test"):
             result = run_recommendation_test(
                 user_df=df,
@@ -243,9 +386,16 @@ def main():
                 test_type=test_type,
                 transform=transform,
                 zero_inflation=zero_inflation,
+                cache=DEFAULT_RESULT_CACHE,
+                method=assignment_method,
+                salt=salt,
+                check_assignment=check_assignment,
             )
+            show_assignment_health(result)
             st.subheader("Test Results")
             st.text(interpret_ab_results(result))
+            if save_results:
+                save_to_history(store, result, experiment="recommendation")
 
     # Dynamic Pricing Hypothesis
     elif hypothesis_choice == "Dynamic Pricing":
@@ -271,11 +421,92 @@ def main():
                 test_type=test_type,
                 transform=transform,
                 zero_inflation=zero_inflation,
+                cache=DEFAULT_RESULT_CACHE,
+                check_assignment=check_assignment,
             )
+            show_assignment_health(result)
             st.subheader("Test Results")
             st.text(interpret_ab_results(result))
+            if save_results:
+                save_to_history(
+                    store,
+                    result,
+                    experiment="pricing",
+                    params={"threshold": threshold_val},
+                )
+
+        st.markdown("**Threshold sweep**")
+        n_thresholds = st.slider(
+            "Number of thresholds (revenue quantiles)", 20, 500, 200, step=20
+        )
+        if st.button("Sweep Revenue Thresholds"):
+            sweep = sweep_pricing_thresholds(
+                df,
+                n_thresholds=n_thresholds,
+                metric_col=metric_col,
+                test_type=test_type,
+                transform=transform,
+                zero_inflation=zero_inflation,
+            )
+            if sweep.empty:
+                st.write("No positive revenue values to sweep over.")
+            else:
+                if "p_value" in sweep:
+                    fig = px.line(
+                        sweep,
+                        x="threshold",
+                        y="p_value",
+                        log_y=True,
+                        title=f"p-value of '{metric_col}' by revenue threshold",
+                    )
+                    fig.add_hline(y=0.05, line_dash="dash", annotation_text="alpha")
+                    st.plotly_chart(fig, use_container_width=True)
+                fig = px.line(
+                    sweep,
+                    x="threshold",
+                    y=["control_mean", "test_mean"],
+                    title=f"Mean '{metric_col}' per group by revenue threshold",
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(sweep)
 
         # ...
+
+    st.markdown("---")
+    st.header("Past Test Results")
+    history = load_history(store.root)
+    if history.empty:
+        st.write("No stored test results yet.")
+    else:
+        experiments = sorted(history["experiment"].unique())
+        exp_choice = st.selectbox("Experiment", experiments)
+        exp_history = history[history["experiment"] == exp_choice]
+        st.dataframe(
+            exp_history[
+                [
+                    "run_timestamp",
+                    "column",
+                    "test_type",
+                    "transform",
+                    "zero_inflation",
+                    "control_value",
+                    "test_value",
+                    "p_value",
+                    "significant",
+                    "params",
+                ]
+            ]
+        )
+        if st.button("Plot p-values over time"):
+            fig = px.scatter(
+                exp_history,
+                x="run_timestamp",
+                y="p_value",
+                color="test_type",
+                symbol="column",
+                title=f"p-values of past '{exp_choice}' runs",
+            )
+            st.plotly_chart(fig, use_container_width=True)
     st.markdown("---")
     st.markdown(
         """